@@ -0,0 +1,112 @@
+"""
+[ fast read path benchmark ]
+rows per second of the post listing, `databases` path vs `socialapi.fastread`
+    (1) row handling only (always): asyncpg-like rows -> response models
+        - before: `databases` Record per row -> Pydantic `from_attributes`
+        - after: zip each row into a dict -> Pydantic validates the dicts
+    (2) end-to-end (if BENCH_DATABASE_URL is a migrated PostgreSQL database w/ posts in it):
+        `GET /post` query + response models
+
+usage:
+    ENV_STATE=test python -m benchmarks.bench_fastread [rows]
+    ENV_STATE=test BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_fastread
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+from databases import Database
+from databases.backends.common.records import Record, create_column_maps
+from databases.backends.postgres import PostgresBackend
+from pydantic import TypeAdapter
+
+from socialapi import fastread
+from socialapi.models.post import UserPostWithLikes
+from socialapi.replicas import ReplicaRouter
+from socialapi.routers.post import PostSorting, query_all_posts
+
+posts_adapter = TypeAdapter(list[UserPostWithLikes])
+query = query_all_posts[PostSorting.new]
+
+
+def fake_rows(count: int) -> list[tuple]:
+    return [
+        (
+            i,
+            f"post body {i}",
+            i % 100,
+            f"https://example.net/{i}.png",
+            None,
+            i % 7,
+            None,
+        )
+        for i in range(count)
+    ]
+
+
+def rows_per_second(func, rows: int, repeat: int = 5) -> float:
+    best = min(_timed(func) for _ in range(repeat))
+    return rows / best
+
+
+def _timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def bench_row_handling(count: int) -> None:
+    rows = fake_rows(count)
+    connection = PostgresBackend("postgresql://localhost/db").connection()
+    _, _, result_columns = connection._compile(query())
+    column_maps = create_column_maps(result_columns)
+    dialect = connection._dialect
+    columns = fastread.prepare(query).columns
+
+    def before():
+        records = [Record(row, result_columns, dialect, column_maps) for row in rows]
+        posts_adapter.validate_python(records, from_attributes=True)
+
+    def after():
+        posts_adapter.validate_python([fastread.as_dict(row, columns) for row in rows])
+
+    print(f"row handling ({count} rows)")
+    print(
+        f"  databases + from_attributes : {rows_per_second(before, count):>12,.0f} rows/s"
+    )
+    print(
+        f"  fastread dicts              : {rows_per_second(after, count):>12,.0f} rows/s"
+    )
+
+
+async def bench_end_to_end(url: str) -> None:
+    database = Database(url, min_size=1, max_size=1)
+    await database.connect()
+    router = ReplicaRouter(database, [])
+    try:
+        count = len(await router.fetch_all(query()))
+
+        async def timed(read) -> float:
+            best = float("inf")
+            for _ in range(5):
+                start = time.perf_counter()
+                posts_adapter.validate_python(await read(), from_attributes=True)
+                best = min(best, time.perf_counter() - start)
+            return count / best
+
+        before = await timed(lambda: router.fetch_all(query()))
+        after = await timed(lambda: fastread.fetch_all(router, query))
+    finally:
+        await database.disconnect()
+
+    print(f"end-to-end GET /post ({count} rows)")
+    print(f"  databases : {before:>12,.0f} rows/s")
+    print(f"  fastread  : {after:>12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    bench_row_handling(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
+    if (url := os.environ.get("BENCH_DATABASE_URL", "")).startswith("postgres"):
+        asyncio.run(bench_end_to_end(url))
@@ -0,0 +1,88 @@
+"""
+[ import time benchmark ]
+cold start of a worker = importing `socialapi.main` (before the lifespan even starts)
+    - `python -X importtime` in a fresh interpreter, best of a few runs (imports are cached by the OS after the first)
+    - largest packages by cumulative import time (nested ones included) -> what to make lazy next
+    - heavy optional subsystems must not be imported at startup (see DEFERRED_MODULES)
+    - over the budget (IMPORT_BUDGET_MS) -> exit code 1
+
+usage:
+    ENV_STATE=test python -m benchmarks.bench_importtime [runs]
+    ENV_STATE=test IMPORT_BUDGET_MS=800 python -m benchmarks.bench_importtime
+"""
+
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+MODULE = "socialapi.main"
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", 1000))
+
+# imported on first use -> never by `import socialapi.main`
+DEFERRED_MODULES = (
+    "sentry_sdk",  # only w/ SENTRY_DSN
+    "b2sdk",  # first upload / B2 authorization
+    "PIL",  # image processing pool
+    "jose",  # first token
+    "passlib",  # first password hash / check
+    "opentelemetry",  # only w/ TRACING_ENABLED
+    "httpx",  # first background task
+    "sqlalchemy.dialects.postgresql",  # fast read path on PostgreSQL
+)
+
+
+def import_once() -> tuple[dict[str, int], list[str]]:
+    """cumulative microseconds per module & modules that shouldn't have been imported"""
+    check = f"import sys; print(' '.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULE}; {check}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "ENV_STATE": os.environ.get("ENV_STATE", "test")},
+    )
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        if cumulative_us.strip().isdigit():
+            # NOTE: the indentation of the name is the nesting -> keep the top-level entries
+            cumulative.setdefault(name.strip(), int(cumulative_us))
+    return cumulative, result.stdout.split()
+
+
+def top_level_packages(cumulative: dict[str, int], count: int = 10) -> list:
+    packages = defaultdict(int)
+    for name, microseconds in cumulative.items():
+        if "." not in name:
+            packages[name] += microseconds
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+def main(runs: int) -> int:
+    best = min((import_once() for _ in range(runs)), key=lambda run: run[0][MODULE])
+    cumulative, imported = best
+    total_ms = cumulative[MODULE] / 1000
+
+    print(f"import {MODULE} (best of {runs} runs)")
+    print(
+        f"  total               : {total_ms:>8.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
+    )
+    for name, microseconds in top_level_packages(cumulative):
+        print(f"  {name:<20}: {microseconds / 1000:>8.1f} ms")
+
+    failed = False
+    if imported:
+        print(f"  NOT DEFERRED        : {', '.join(imported)}")
+        failed = True
+    if total_ms > IMPORT_BUDGET_MS:
+        print("  OVER BUDGET")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
@@ -0,0 +1,97 @@
+"""
+[ like throughput benchmark ]
+likes per second on ONE (viral) post, each like from another user
+    - before: `POST /like` path -> one transaction per like (INSERT + hot_score UPDATE of the same row)
+    - after: `LikeBuffer` -> likes are buffered & written by the periodic flush
+      (measured until every like is in the database)
+
+usage:
+    ENV_STATE=test python -m benchmarks.bench_likes [likes] [concurrency]
+    ENV_STATE=test BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_likes 20000 50
+        - NOTE: BENCH_DATABASE_URL must be a migrated database (rows are added to it)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from databases import Database
+from sqlalchemy import create_engine
+
+from socialapi.database import like_table, metadata, post_table, user_table
+from socialapi.likebuffer import LikeBuffer
+from socialapi.ranking import LIKE_WEIGHT, bump_hot_score
+
+
+async def like_directly(database: Database, user_id: int, post_id: int) -> None:
+    async with database.transaction():
+        await database.execute(
+            like_table.insert().values(user_id=user_id, post_id=post_id)
+        )
+        await database.execute(bump_hot_score(post_id, LIKE_WEIGHT))
+
+
+async def run_workers(likes: int, concurrency: int, like) -> None:
+    async def worker(offset: int) -> None:
+        for user_id in range(offset, likes, concurrency):
+            await like(user_id + 1)
+
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+
+
+async def bench(url: str, likes: int, concurrency: int) -> None:
+    database = Database(url)
+    await database.connect()
+    try:
+        user_id = await database.execute(
+            user_table.insert().values(
+                email=f"bench{time.time_ns()}@example.net", password="x"
+            )
+        )
+        post_id = await database.execute(
+            post_table.insert().values(body="viral", user_id=user_id)
+        )
+
+        start = time.perf_counter()
+        await run_workers(
+            likes,
+            concurrency,
+            lambda user_id: like_directly(database, user_id, post_id),
+        )
+        before = likes / (time.perf_counter() - start)
+
+        buffer = LikeBuffer(database)
+        buffer.start()
+        start = time.perf_counter()
+
+        async def like(user_id: int) -> None:
+            buffer.add(user_id, post_id)
+            if buffer.full:
+                await buffer.flush()
+            await asyncio.sleep(0)  # other requests run in between
+
+        await run_workers(likes, concurrency, like)
+        await buffer.stop()
+        after = likes / (time.perf_counter() - start)
+    finally:
+        await database.disconnect()
+
+    print(f"likes of one post ({likes} likes, concurrency {concurrency})")
+    print(f"  transaction per like : {before:>10,.0f} likes/s")
+    print(f"  like buffer          : {after:>10,.0f} likes/s")
+
+
+if __name__ == "__main__":
+    likes = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    if url := os.environ.get("BENCH_DATABASE_URL"):
+        asyncio.run(bench(url, likes, concurrency))
+    else:
+        # NOTE: SQLite has a single writer -> run w/ concurrency 1
+        with tempfile.TemporaryDirectory() as directory:
+            url = f"sqlite:///{directory}/bench.db"
+            metadata.create_all(create_engine(url))
+            asyncio.run(bench(url, likes, concurrency))
@@ -0,0 +1,84 @@
+"""
+[ log rotation benchmark ]
+lines per second & the slowest single record (stall), writing JSON-sized lines to a rotating file
+    - RotatingFileHandler, 1MB x 5 (before): renames every backup on each rotation, no compression
+    - RotatingFileHandler + gzip rotator: the stdlib way to compress -> done inside the rotating record
+    - SharedRotatingFileHandler (after): one rename under a lock, gzip in a background thread
+NOTE: all rotate at 1MB here (to compare the rotations); the app rotates at LOG_FILE_MAX_BYTES
+
+usage:
+    ENV_STATE=test python -m benchmarks.bench_logrotation [lines]
+"""
+
+import gzip
+import logging
+import logging.handlers
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from socialapi.logrotation import SharedRotatingFileHandler
+
+MAX_BYTES = 1024 * 1024
+LINE = '{"asctime": "2026-10-19T12:00:00", "levelname": "INFO", "message": "%s"}'
+
+
+def gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def rotating(path: str) -> logging.Handler:
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=MAX_BYTES, backupCount=5, encoding="utf8"
+    )
+
+
+def rotating_gzip(path: str) -> logging.Handler:
+    handler = rotating(path)
+    handler.namer = lambda name: name + ".gz"
+    handler.rotator = gzip_rotator
+    return handler
+
+
+def shared(path: str) -> logging.Handler:
+    return SharedRotatingFileHandler(
+        path, max_bytes=MAX_BYTES, backup_count=5, encoding="utf8"
+    )
+
+
+def run(make_handler, lines: int) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        handler = make_handler(os.path.join(directory, "socialapi.log"))
+        worst = 0.0
+        start = time.perf_counter()
+        for i in range(lines):
+            record = logging.LogRecord(
+                "socialapi", logging.INFO, "", 0, LINE, (f"request {i} done",), None
+            )
+            before = time.perf_counter()
+            handler.handle(record)
+            worst = max(worst, time.perf_counter() - before)
+        elapsed = time.perf_counter() - start
+        handler.close()
+    return lines / elapsed, worst
+
+
+def main() -> None:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    cases = {
+        "RotatingFileHandler (before)": rotating,
+        "RotatingFileHandler + gzip rotator": rotating_gzip,
+        "SharedRotatingFileHandler (after)": shared,
+    }
+    print(f"{lines} lines, rotating at {MAX_BYTES // 1024} KB")
+    for name, make_handler in cases.items():
+        rate, worst = run(make_handler, lines)
+        print(f"{name:<38}{rate:>10,.0f} lines/s   slowest line {worst * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
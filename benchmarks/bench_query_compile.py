@@ -0,0 +1,94 @@
+"""
+[ query compilation benchmark ]
+CPU time that one request spends building & compiling its SQL, the way the `databases` backends do it
+    - before: build the statement with the request's values, then `.compile()` it (every request)
+    - after: `CachedQuery` -> the compiled statement is reused, only the values are bound
+
+usage:
+    ENV_STATE=test python -m benchmarks.bench_query_compile [iterations]
+"""
+
+import sys
+import time
+
+from databases.backends.postgres import PostgresBackend
+from databases.backends.sqlite import SQLiteBackend
+from sqlalchemy import desc, select
+
+from socialapi.database import comment_table, post_table, user_table
+from socialapi.routers.post import (
+    query_all_posts,
+    query_comments_on_post,
+    query_post_and_likes_by_id,
+    query_post_by_id,
+    query_post_image_status,
+    select_post_and_likes,
+)
+from socialapi.security import query_user_by_email
+
+# (name, per-request statement before, per-request statement after)
+QUERIES = [
+    (
+        "get_user",
+        lambda: user_table.select().where(user_table.c.email == "a@example.net"),
+        lambda: query_user_by_email(email="a@example.net"),
+    ),
+    (
+        "find_post",
+        lambda: post_table.select().where(post_table.c.id == 1),
+        lambda: query_post_by_id(post_id=1),
+    ),
+    (
+        "get_all_posts",
+        lambda: select_post_and_likes.order_by(desc("likes")),
+        lambda: query_all_posts["most_likes"](),
+    ),
+    (
+        "get_post_with_comments",
+        lambda: select_post_and_likes.where(post_table.c.id == 1),
+        lambda: query_post_and_likes_by_id(post_id=1),
+    ),
+    (
+        "get_comments_on_post",
+        lambda: comment_table.select().where(comment_table.c.post_id == 1),
+        lambda: query_comments_on_post(post_id=1),
+    ),
+    (
+        "get_post_image_status",
+        lambda: select(
+            post_table.c.id, post_table.c.image_url, post_table.c.image_status
+        ).where(post_table.c.id == 1),
+        lambda: query_post_image_status(post_id=1),
+    ),
+]
+
+CONNECTIONS = {
+    "postgresql": PostgresBackend("postgresql://localhost/db").connection(),
+    "sqlite": SQLiteBackend("sqlite:///bench.db").connection(),
+}
+
+
+def cpu_per_call(connection, build, iterations: int) -> float:
+    connection._compile(build())  # warm up (+ fill the cache)
+    start = time.process_time()
+    for _ in range(iterations):
+        connection._compile(build())
+    return (time.process_time() - start) / iterations
+
+
+def main(iterations: int) -> None:
+    print(
+        f"{'query':<24}{'dialect':<12}{'before (us)':>12}{'after (us)':>12}{'speedup':>9}"
+    )
+    for dialect, connection in CONNECTIONS.items():
+        for name, before, after in QUERIES:
+            before_us = cpu_per_call(connection, before, iterations) * 1e6
+            after_us = cpu_per_call(connection, after, iterations) * 1e6
+            print(
+                f"{name:<24}{dialect:<12}{before_us:>12.1f}{after_us:>12.1f}"
+                f"{before_us / after_us:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
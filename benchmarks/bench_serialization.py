@@ -0,0 +1,75 @@
+"""
+[ response serialization benchmark ]
+per-request CPU to turn the rows of `GET /post` into the response body
+    - response_model + JSONResponse: FastAPI validates every row, then serializes w/ the json module (before)
+    - response_model + ORJSONResponse: validation as before, orjson serialization
+    - trusted output: pick the model's fields from each row, orjson serialization (after)
+
+usage:
+    ENV_STATE=test python -m benchmarks.bench_serialization
+"""
+
+import asyncio
+import time
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from socialapi.models.post import UserPostWithLikes
+from socialapi.responses import rows_as
+
+ROW_COUNTS = (1_000, 10_000)
+REPEAT = 5
+
+response_field = create_response_field("response", list[UserPostWithLikes])
+
+
+def fake_rows(count: int) -> list[dict]:
+    # NOTE: like `fastread` rows (w/ the extra `image_status` column of the table)
+    return [
+        {
+            "id": i,
+            "body": f"post body {i}",
+            "user_id": i % 100,
+            "image_url": f"https://example.net/{i}.png",
+            "image_status": "completed",
+            "likes": i % 7,
+            "thumbnail_url": None,
+        }
+        for i in range(count)
+    ]
+
+
+async def validated(rows: list[dict], response_class) -> bytes:
+    content = await serialize_response(field=response_field, response_content=rows)
+    return response_class(content).body
+
+
+async def trusted(rows: list[dict]) -> bytes:
+    return ORJSONResponse(rows_as(UserPostWithLikes, rows)).body
+
+
+async def milliseconds(func, rows: list[dict]) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.process_time()
+        await func(rows)
+        best = min(best, time.process_time() - start)
+    return best * 1000
+
+
+async def main() -> None:
+    cases = {
+        "response_model + JSONResponse": lambda rows: validated(rows, JSONResponse),
+        "response_model + ORJSONResponse": lambda rows: validated(rows, ORJSONResponse),
+        "trusted output (orjson)": trusted,
+    }
+    print(f"{'per request (ms)':<34}" + "".join(f"{n:>10} rows" for n in ROW_COUNTS))
+    for name, func in cases.items():
+        results = [await milliseconds(func, fake_rows(n)) for n in ROW_COUNTS]
+        print(f"{name:<34}" + "".join(f"{ms:>15.1f}" for ms in results))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,3 @@
+from socialapi.cli import main
+
+main()
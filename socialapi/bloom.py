@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import logging
+import math
+
+from databases import Database
+from sqlalchemy import func, select
+
+from socialapi.database import user_table
+from socialapi.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+"""
+[ bloom filter of registered emails ]
+- `POST /register` w/ a new email (the common case) -> no "does this email exist?" query at all
+    - not in the filter -> the email is certainly not registered (no false negatives)
+    - in the filter -> maybe registered (~1% false positives) -> check the database
+- built from the users table in the background after startup, emails registered by this process are added
+    - NOTE: startup doesn't wait for a scan of the whole table; until then, every email is "maybe"
+    - NOTE: per process -> registrations of other workers / bulk loads are missing,
+      the conflict-aware INSERT still rejects those duplicates (only costs a password hash)
+- full (more emails than it was sized for) -> more false positives, never wrong answers;
+  `rebuild()` sizes it for the current number of users again
+"""
+
+MIN_CAPACITY = 100_000
+
+email_checks = Counter(
+    "socialapi_register_email_checks_total",
+    "Duplicate email checks of registrations by the filter's answer",
+    ("result",),  # absent (no query) / maybe (queried)
+)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        # NOTE: optimal number of bits & hash functions for `capacity` items at `error_rate`
+        self.capacity = capacity
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # NOTE: double hashing -> k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class EmailFilter:
+    def __init__(self, error_rate: float = 0.01) -> None:
+        self.error_rate = error_rate
+        # None until built -> every email is "maybe"
+        self._filter: BloomFilter | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def might_exist(self, email: str) -> bool:
+        exists = self._filter is None or email in self._filter
+        email_checks.inc(result="maybe" if exists else "absent")
+        return exists
+
+    def add(self, email: str) -> None:
+        if self._filter is not None:
+            self._filter.add(email)
+
+    async def rebuild(self, database: Database) -> None:
+        users = await database.fetch_val(select(func.count()).select_from(user_table))
+        # NOTE: room to grow -> stays accurate until the users table doubles
+        bloom = BloomFilter(max(users * 2, MIN_CAPACITY), self.error_rate)
+        async for row in database.iterate(select(user_table.c.email)):
+            bloom.add(row.email)
+        # NOTE: swapped at once -> registrations during the rebuild use the old filter
+        # (& may be missing from the new one, which the conflict-aware INSERT covers)
+        self._filter = bloom
+        logger.info(f"Built the registered emails filter ({bloom.count} emails)")
+
+    async def _build(self, database: Database) -> None:
+        try:
+            await self.rebuild(database)
+        except Exception:
+            logger.exception("Building the registered emails filter failed")
+
+    def start(self, database: Database) -> None:
+        self._task = asyncio.create_task(self._build(database), name="email-filter")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+registered_emails = EmailFilter()
@@ -0,0 +1,391 @@
+import array
+import csv
+import itertools
+import json
+import logging
+import pathlib
+import random
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from databases import DatabaseURL
+from sqlalchemy import Boolean, Float, Integer, Table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+from socialapi.database import (
+    comment_path,
+    comment_table,
+    like_table,
+    post_table,
+    user_table,
+)
+from socialapi.userstats import rebuild_user_stats
+
+logger = logging.getLogger(__name__)
+
+"""
+[ bulk load ]
+load (generated / exported) rows straight into the tables, w/o going through the API
+    - PostgreSQL: binary `COPY` (asyncpg `copy_records_to_table`), one COPY per batch
+    - SQLite: `executemany` per batch, one transaction per batch
+    - indexes of the table (except primary key / unique constraints) are dropped before the load
+      and built once afterwards -> much cheaper than updating them row by row
+    - rows are generated / read lazily & loaded in batches -> memory stays bounded
+    - the `user_stats` rollup is recounted afterwards (the API isn't there to keep it up to date)
+"""
+
+DEFAULT_BATCH_SIZE = 50_000
+SEED_PASSWORD = "password"  # of every seeded user
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua cute creature cat dog fastapi python"
+).split()
+
+
+@dataclass(frozen=True)
+class LoadResult:
+    table: str
+    rows: int
+    seconds: float  # loading the rows
+    index_seconds: float = 0.0  # building the deferred indexes afterwards
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else float("inf")
+
+    def __str__(self) -> str:
+        return (
+            f"{self.table}: {self.rows:,} rows in {self.seconds:.2f}s "
+            f"({self.rows_per_second:,.0f} rows/s), indexes rebuilt in {self.index_seconds:.2f}s"
+        )
+
+
+def batched(rows: Iterable[tuple], size: int) -> Iterator[list[tuple]]:
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+# ===== loaders ===== #
+class SQLiteLoader:
+    dialect = sqlite.dialect()
+
+    def __init__(self, path: str) -> None:
+        # NOTE: autocommit mode -> transactions are started explicitly per batch
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        # NOTE: no fsync per transaction -> a crash during the load can lose the loaded rows (not older ones)
+        self.connection.execute("PRAGMA synchronous = OFF")
+
+    async def execute(self, sql: str) -> None:
+        self.connection.execute(sql)
+
+    async def fetch_ids(self, table: Table) -> array.array:
+        cursor = self.connection.execute(f"SELECT id FROM {table.name} ORDER BY id")
+        return array.array("q", (row[0] for row in cursor))
+
+    async def max_id(self, table: Table) -> int:
+        row = self.connection.execute(f"SELECT MAX(id) FROM {table.name}").fetchone()
+        return row[0] or 0
+
+    async def copy(self, table: Table, columns: tuple[str, ...], rows: list) -> None:
+        sql = (
+            f"INSERT INTO {table.name} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+        self.connection.execute("BEGIN")
+        try:
+            self.connection.executemany(sql, rows)
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    async def finish(self, table: Table) -> None:
+        self.connection.execute(f"ANALYZE {table.name}")
+
+    async def close(self) -> None:
+        self.connection.close()
+
+
+class PostgresLoader:
+    dialect = postgresql.dialect()
+
+    def __init__(self, connection) -> None:
+        self.connection = connection
+
+    @classmethod
+    async def connect(cls, url: str) -> "PostgresLoader":
+        import asyncpg
+
+        return cls(await asyncpg.connect(url))
+
+    async def execute(self, sql: str) -> None:
+        await self.connection.execute(sql)
+
+    async def fetch_ids(self, table: Table) -> array.array:
+        rows = await self.connection.fetch(f"SELECT id FROM {table.name} ORDER BY id")
+        return array.array("q", (row[0] for row in rows))
+
+    async def max_id(self, table: Table) -> int:
+        return await self.connection.fetchval(
+            f"SELECT COALESCE(MAX(id), 0) FROM {table.name}"
+        )
+
+    async def copy(self, table: Table, columns: tuple[str, ...], rows: list) -> None:
+        await self.connection.copy_records_to_table(
+            table.name, records=rows, columns=columns
+        )
+
+    async def finish(self, table: Table) -> None:
+        # NOTE: COPY w/ explicit ids doesn't advance the id sequence -> next INSERT would conflict
+        if "id" in table.c:
+            await self.connection.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE(MAX(id), 0) + 1, false) FROM {table.name}"
+            )
+        await self.connection.execute(f"ANALYZE {table.name}")
+
+    async def close(self) -> None:
+        await self.connection.close()
+
+
+async def connect_loader(database_url: str) -> SQLiteLoader | PostgresLoader:
+    url = DatabaseURL(database_url)
+    if url.dialect == "postgresql":
+        return await PostgresLoader.connect(str(url.replace(driver="")))
+    if url.dialect == "sqlite":
+        return SQLiteLoader(url.database)
+    raise ValueError(f"Bulk load doesn't support {url.dialect} databases")
+
+
+async def load(
+    loader: SQLiteLoader | PostgresLoader,
+    table: Table,
+    columns: tuple[str, ...],
+    rows: Iterable[tuple],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    defer_indexes: bool = True,
+) -> LoadResult:
+    indexes = list(table.indexes) if defer_indexes else []
+    for index in indexes:
+        logger.info(f"Dropping index {index.name} until {table.name} is loaded")
+        await loader.execute(
+            str(DropIndex(index, if_exists=True).compile(dialect=loader.dialect))
+        )
+
+    count = 0
+    start = time.perf_counter()
+    try:
+        for batch in batched(rows, batch_size):
+            await loader.copy(table, columns, batch)
+            count += len(batch)
+            logger.info(f"Loaded {count:,} rows into {table.name}")
+    finally:
+        seconds = time.perf_counter() - start
+
+        # NOTE: even if the load failed -> never leave the table w/o its indexes
+        start = time.perf_counter()
+        for index in indexes:
+            logger.info(f"Building index {index.name}")
+            await loader.execute(
+                str(
+                    CreateIndex(index, if_not_exists=True).compile(
+                        dialect=loader.dialect
+                    )
+                )
+            )
+        index_seconds = time.perf_counter() - start
+    # NOTE: not part of `index_seconds` (sequence & ANALYZE)
+    await loader.finish(table)
+
+    return LoadResult(table.name, count, seconds, index_seconds)
+
+
+async def refresh_user_stats(loader: SQLiteLoader | PostgresLoader) -> None:
+    logger.info("Recounting user_stats")
+    await loader.execute("BEGIN")
+    try:
+        for statement in rebuild_user_stats():
+            await loader.execute(
+                str(
+                    statement.compile(
+                        dialect=loader.dialect, compile_kwargs={"literal_binds": True}
+                    )
+                )
+            )
+    except BaseException:
+        await loader.execute("ROLLBACK")
+        raise
+    await loader.execute("COMMIT")
+
+
+# ===== generated rows ===== #
+def _text(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(3, 12)))
+
+
+def generate_users(start_id: int, count: int, password_hash: str) -> Iterator[tuple]:
+    for user_id in range(start_id, start_id + count):
+        yield user_id, f"user{user_id}@seed.example.net", password_hash, True
+
+
+def generate_posts(
+    rng: random.Random, start_id: int, count: int, user_ids: array.array
+) -> Iterator[tuple]:
+    for post_id in range(start_id, start_id + count):
+        yield post_id, _text(rng), rng.choice(user_ids)
+
+
+def generate_comments(
+    rng: random.Random,
+    start_id: int,
+    count: int,
+    post_ids: array.array,
+    user_ids: array.array,
+) -> Iterator[tuple]:
+    # NOTE: top-level comments only (no replies)
+    for comment_id in range(start_id, start_id + count):
+        yield (
+            comment_id,
+            _text(rng),
+            rng.choice(post_ids),
+            rng.choice(user_ids),
+            comment_path(comment_id),
+        )
+
+
+def generate_likes(
+    rng: random.Random,
+    start_id: int,
+    count: int,
+    post_ids: array.array,
+    user_ids: array.array,
+) -> Iterator[tuple]:
+    for like_id in range(start_id, start_id + count):
+        yield like_id, rng.choice(post_ids), rng.choice(user_ids)
+
+
+async def seed(
+    loader: SQLiteLoader | PostgresLoader,
+    users: int = 0,
+    posts: int = 0,
+    comments: int = 0,
+    likes: int = 0,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    defer_indexes: bool = True,
+    random_seed: int | None = None,
+) -> list[LoadResult]:
+    """generate rows in FK order (users -> posts -> comments / likes), referencing existing rows as well"""
+    rng = random.Random(random_seed)
+    options = {"batch_size": batch_size, "defer_indexes": defer_indexes}
+    results = []
+
+    async def next_id(table: Table) -> int:
+        return await loader.max_id(table) + 1
+
+    if users:
+        from socialapi.security import get_password_hash
+
+        # NOTE: bcrypt is slow on purpose -> hash once, every seeded user shares the password
+        rows = generate_users(
+            await next_id(user_table), users, get_password_hash(SEED_PASSWORD)
+        )
+        columns = ("id", "email", "password", "confirmed")
+        results.append(await load(loader, user_table, columns, rows, **options))
+
+    if not (posts or comments or likes):
+        return results
+    user_ids = await loader.fetch_ids(user_table)
+    if not user_ids:
+        raise ValueError("Seed users first, posts / comments / likes need users")
+
+    if posts:
+        rows = generate_posts(rng, await next_id(post_table), posts, user_ids)
+        columns = ("id", "body", "user_id")
+        results.append(await load(loader, post_table, columns, rows, **options))
+
+    if not (comments or likes):
+        return results
+    post_ids = await loader.fetch_ids(post_table)
+    if not post_ids:
+        raise ValueError("Seed posts first, comments / likes need posts")
+
+    if comments:
+        rows = generate_comments(
+            rng, await next_id(comment_table), comments, post_ids, user_ids
+        )
+        columns = ("id", "body", "post_id", "user_id", "path")
+        results.append(await load(loader, comment_table, columns, rows, **options))
+
+    if likes:
+        rows = generate_likes(rng, await next_id(like_table), likes, post_ids, user_ids)
+        columns = ("id", "post_id", "user_id")
+        results.append(await load(loader, like_table, columns, rows, **options))
+
+    return results
+
+
+# ===== rows from files ===== #
+def _type_converter(column_type):
+    if isinstance(column_type, Boolean):
+        return lambda value: (
+            value
+            if value is None or isinstance(value, bool)
+            else str(value).lower() in ("1", "true", "t", "yes")
+        )
+    if isinstance(column_type, Integer):
+        return lambda value: None if value is None else int(value)
+    # NOTE: binary COPY (PostgreSQL) needs a float, not the CSV's str (ex. `posts.hot_score`)
+    if isinstance(column_type, Float):
+        return lambda value: None if value is None else float(value)
+    return lambda value: value
+
+
+def _converter(table: Table, column: str):
+    if column not in table.c:
+        raise ValueError(f"{table.name} has no column {column!r}")
+    convert = _type_converter(table.c[column].type)
+    if not table.c[column].nullable:
+        return convert
+    # NOTE: CSV has no NULL -> an empty cell of a nullable column is NULL (ex. `posts.image_url`)
+    return lambda value: None if value == "" else convert(value)
+
+
+def read_rows(path: pathlib.Path, table: Table) -> tuple[tuple[str, ...], Iterator]:
+    """columns & (lazy) rows of an NDJSON (ex. `GET /export/posts.ndjson`) or CSV (w/ header) file"""
+    if path.suffix not in (".csv", ".ndjson", ".jsonl"):
+        raise ValueError(f"Unsupported file type {path.suffix!r} (use .ndjson or .csv)")
+    file = path.open(newline="" if path.suffix == ".csv" else None)
+
+    # NOTE: the file is closed by `rows()` -> until then, any error (ex. unknown column) closes it here
+    try:
+        if path.suffix == ".csv":
+            reader = csv.reader(file)
+            columns = tuple(next(reader))
+            records = reader
+        else:
+            lines = (json.loads(line) for line in file if line.strip())
+            first = next(lines, None)
+            columns = tuple(first) if first else ()
+            records = (
+                tuple(record.get(column) for column in columns)
+                for record in itertools.chain([first] if first else [], lines)
+            )
+
+        converters = [_converter(table, column) for column in columns]
+    except BaseException:
+        file.close()
+        raise
+
+    def rows() -> Iterator[tuple]:
+        with file:
+            for record in records:
+                yield tuple(
+                    convert(value) for convert, value in zip(converters, record)
+                )
+
+    return columns, rows()
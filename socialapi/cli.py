@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import logging
+import pathlib
+
+from socialapi.bulkload import (
+    DEFAULT_BATCH_SIZE,
+    SEED_PASSWORD,
+    connect_loader,
+    load,
+    read_rows,
+    refresh_user_stats,
+    seed,
+)
+from socialapi.database import metadata
+
+"""
+[ socialapi CLI ]
+python -m socialapi seed --users 1000 --posts 1000000 --comments 2000000 --likes 5000000
+python -m socialapi import posts posts.ndjson   (ex. from `GET /export/posts.ndjson`)
+python -m socialapi import likes likes.csv      (CSV w/ a header line of column names)
+
+- uses DATABASE_URL of the current ENV_STATE (or --database-url), tables must exist (alembic upgrade head)
+"""
+
+# tables the `user_stats` rollup is counted from
+USER_STATS_SOURCES = {"users", "posts", "likes"}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m socialapi")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--database-url", help="defaults to the configured DATABASE_URL"
+    )
+    common.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    common.add_argument(
+        "--keep-indexes",
+        action="store_true",
+        help="update indexes while loading, instead of rebuilding them afterwards",
+    )
+
+    seed_parser = commands.add_parser(
+        "seed", parents=[common], help="generate random users, posts, comments & likes"
+    )
+    for table in ("users", "posts", "comments", "likes"):
+        seed_parser.add_argument(f"--{table}", type=int, default=0)
+    seed_parser.add_argument("--random-seed", type=int, help="for reproducible data")
+
+    import_parser = commands.add_parser(
+        "import", parents=[common], help="load an NDJSON / CSV file into a table"
+    )
+    import_parser.add_argument("table", choices=sorted(metadata.tables))
+    import_parser.add_argument("file", type=pathlib.Path)
+
+    return parser
+
+
+async def run(args: argparse.Namespace) -> None:
+    if args.database_url is None:
+        from socialapi.config import config
+
+        args.database_url = config.DATABASE_URL
+
+    loader = await connect_loader(args.database_url)
+    options = {"batch_size": args.batch_size, "defer_indexes": not args.keep_indexes}
+    try:
+        if args.command == "seed":
+            results = await seed(
+                loader,
+                users=args.users,
+                posts=args.posts,
+                comments=args.comments,
+                likes=args.likes,
+                random_seed=args.random_seed,
+                **options,
+            )
+            if args.users:
+                print(f"Seeded users can log in with the password {SEED_PASSWORD!r}")
+        else:
+            table = metadata.tables[args.table]
+            columns, rows = read_rows(args.file, table)
+            results = [await load(loader, table, columns, rows, **options)]
+
+        if {result.table for result in results} & USER_STATS_SOURCES:
+            await refresh_user_stats(loader)
+    finally:
+        await loader.close()
+
+    for result in results:
+        print(result)
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    asyncio.run(run(build_parser().parse_args(argv)))
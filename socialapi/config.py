@@ -15,9 +15,63 @@ class GlobalConfig(BaseConfig):
     # Database
     DATABASE_URL: str | None = None
     DB_FORCE_ROLL_BACK: bool = False
+    # ex. '["postgresql://replica1/db", "postgresql://replica2/db"]' (JSON list)
+    READ_REPLICA_URLS: list[str] = []
+    READ_YOUR_WRITES_SECONDS: float = 5.0  # reads go to the primary after a write
+    # asyncpg server-side prepared statements kept per connection (0 = off, ex. behind pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # connections to each database server, summed over all workers (0 = pools of DB_POOL_SIZE)
+    DB_MAX_CONNECTIONS: int = 0
+    DB_POOL_SIZE: int = 3  # per worker, if there is no DB_MAX_CONNECTIONS
+    WORKERS: int = 1  # set for every worker by `python -m socialapi.serve`
+    # query stats (see socialapi.querystats)
+    DB_SLOW_QUERY_SECONDS: float = 0.2  # slower statements are logged w/ their SQL
+    # the same statement this often in a request -> N+1
+    DB_REPEATED_QUERY_WARNING: int = 10
+    # Server-Timing header w/ DB time & query count (public -> dev / test only)
+    DB_SERVER_TIMING: bool = False
+
+    # Responses
+    TRUSTED_RESPONSES: bool = True  # DB rows are serialized w/o re-validation (orjson)
+    # bulk exports streamed at once per worker, more get 503 (see routers.export)
+    EXPORT_MAX_CONCURRENT: int = 2
+
+    # Ranking (hot feed)
+    HOT_SCORE_HALF_LIFE_HOURS: float = 12.0
+    HOT_SCORE_DECAY_INTERVAL_SECONDS: float = 600.0
+
+    # Likes (write-behind buffer, see socialapi.likebuffer)
+    LIKE_BUFFER_ENABLED: bool = False
+    LIKE_BUFFER_FLUSH_SECONDS: float = 0.25
+    LIKE_BUFFER_MAX_PENDING: int = 10_000  # a full buffer is flushed by the request
+
+    # Live events (GET /events, see socialapi.events)
+    # per client, a client that falls behind more is dropped
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    # per worker, more clients get 503 (& reconnect later)
+    EVENTS_MAX_SUBSCRIBERS: int = 1000
+    # PostgreSQL LISTEN / NOTIFY -> events reach every worker
+    EVENTS_BACKPLANE: bool = False
 
     # Logging
     LOGTAIL_API_KEY: str | None = None
+    # log file shared by the workers (see socialapi.logrotation)
+    LOG_FILE: str = "socialapi.log"
+    LOG_FILE_MAX_BYTES: int = 50 * 1024 * 1024  # rotate at this size (0 = no limit)
+    LOG_FILE_ROTATE_SECONDS: int = 24 * 60 * 60  # and/or this often (0 = never)
+    LOG_FILE_BACKUPS: int = 30  # gzip-compressed segments kept (0 = all)
+    LOG_FILE_RETENTION_DAYS: float = 0  # older segments are deleted (0 = no limit)
+
+    # Event loop watchdog (lag histogram & blocking call stacks, see socialapi.loopwatch)
+    LOOP_WATCHDOG_ENABLED: bool = False
+    LOOP_WATCHDOG_INTERVAL_SECONDS: float = 0.05
+    # a longer stall is logged w/ its stack
+    LOOP_WATCHDOG_THRESHOLD_SECONDS: float = 0.1
+
+    # Rate limiting (in-memory per process if no Redis URL is set)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REDIS_URL: str | None = None
 
     # Security
     JWT_SECRET_KEY: str | None = None
@@ -31,6 +85,7 @@ class GlobalConfig(BaseConfig):
     B2_KEY_ID: str | None = None
     B2_APPLICATION_KEY: str | None = None
     B2_BUCKET_NAME: str | None = None
+    B2_UPLOAD_THREADS: int = 4  # shared thread pool for (blocking) b2sdk calls
 
     # DeepAI Image Generator
     DEEPAI_API_KEY: str | None = None
@@ -38,8 +93,19 @@ class GlobalConfig(BaseConfig):
     # Sentry
     SENTRY_DSN: str | None = None
 
+    # Tracing (OpenTelemetry, `poetry install -E tracing`, see socialapi.tracing)
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "otlp"  # otlp (OTLP/HTTP) / file (JSON lines)
+    TRACING_OTLP_ENDPOINT: str | None = None  # default: OTEL_EXPORTER_OTLP_* env vars
+    TRACING_FILE: str = "traces.jsonl"
+    # tail sampling: slow or failed traces are always kept, the others at this rate
+    TRACING_SLOW_TRACE_SECONDS: float = 1.0
+    TRACING_SAMPLE_RATE: float = 0.01
+
 
 class DevConfig(GlobalConfig):
+    DB_SERVER_TIMING: bool = True
+
     model_config = SettingsConfigDict(env_prefix="DEV_")
 
 
@@ -52,6 +118,7 @@ class TestConfig(GlobalConfig):
     # hardcoded, but are defaults that can be overwritten
     DATABASE_URL: str = "sqlite:///test.db"
     DB_FORCE_ROLL_BACK: bool = True  # -- important!
+    DB_SERVER_TIMING: bool = True
     JWT_SECRET_KEY: str = "163a30ff9545d7790e7e64077f4a12aaa46194f95feb02c6e9f53a650d4b62b3ec83929597a2f1f608e02686c1aceff16eda5c0bb8056c8b0a54367ca933d2b0"
 
     model_config = SettingsConfigDict(env_prefix="TEST_")
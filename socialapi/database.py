@@ -1,16 +1,19 @@
-import databases
 from sqlalchemy import (
     Boolean,
     Column,
+    Float,
     ForeignKey,
+    Index,
     Integer,
     MetaData,
     String,
     Table,
-    create_engine,
+    UniqueConstraint,
 )
 
 from socialapi.config import config
+from socialapi.querystats import InstrumentedDatabase
+from socialapi.replicas import ReplicaRouter
 
 # NOTE: Python에서는 module이 import 될 때 해당 코드가 실행됨 -> config가 생성됨
 
@@ -25,8 +28,18 @@ post_table = Table(
     Column("body", String),
     Column("user_id", ForeignKey("users.id"), nullable=False),
     Column("image_url", String),
+    # status of the image generation requested with the post (null if none was requested)
+    Column("image_status", String),
+    # time-decayed likes & comments (see socialapi.ranking) -> `hot` feed reads the index in order
+    Column("hot_score", Float, nullable=False, server_default="0"),
+    Index("ix_posts_hot_score_id", "hot_score", "id"),
+    # posts of a user, newest first (keyset pagination) -> index range scan, no sorting
+    Index("ix_posts_user_id_id", "user_id", "id"),
 )
 
+# NOTE: threads -> a reply has `parent_id` (the comment it replies to) & `root_id` (top-level comment of the thread)
+# `path` = materialized path of zero-padded ids ("0000000001.0000000004.0000000007")
+#   -> ORDER BY path == depth-first order of a thread, subtree == paths w/ the prefix of its root
 comment_table = Table(
     "comments",
     metadata,
@@ -34,6 +47,11 @@ comment_table = Table(
     Column("body", String),
     Column("post_id", ForeignKey("posts.id"), nullable=False),
     Column("user_id", ForeignKey("users.id"), nullable=False),
+    Column("parent_id", ForeignKey("comments.id")),  # null for top-level comments
+    Column("root_id", ForeignKey("comments.id")),  # null for top-level comments
+    Column("path", String),
+    Index("ix_comments_post_id_id", "post_id", "id"),  # top-level comments of a post
+    Index("ix_comments_root_id_path", "root_id", "path"),  # replies of a thread
 )
 
 user_table = Table(
@@ -53,22 +71,153 @@ like_table = Table(
     Column("user_id", ForeignKey("users.id"), nullable=False),
 )
 
-# <3> engine allows SQLAlchemy to connect to a specific type of database
-connect_args = {"check_same_thread": False} if "sqlite" in config.DATABASE_URL else {}
-engine = create_engine(config.DATABASE_URL, connect_args=connect_args)
+# per-user counts, updated in the same transaction as the writes (see socialapi.userstats)
+# -> profiles don't count all posts / likes of the user on every request
+user_stats_table = Table(
+    "user_stats",
+    metadata,
+    Column("user_id", ForeignKey("users.id"), primary_key=True),
+    Column("posts", Integer, nullable=False, server_default="0"),
+    Column("likes_received", Integer, nullable=False, server_default="0"),
+)
 
-# <4> actually create tables (that metadata object stores) in database server
-# (update) comment out for alembic migration
-# metadata.create_all(engine)
+# cache of generated images -> identical prompts reuse the stored output_url
+image_generation_table = Table(
+    "image_generations",
+    metadata,
+    Column("prompt_hash", String, primary_key=True),  # sha256 of the normalized prompt
+    Column("prompt", String, nullable=False),
+    Column("output_url", String, nullable=False),
+)
 
-# <5> get database object with which we can interact
+# resized / re-encoded copies of an image (keyed by the original URL, so that posts sharing an image share variants)
+post_image_table = Table(
+    "post_images",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("source_url", String, nullable=False),  # == posts.image_url
+    Column("variant", String, nullable=False),  # thumbnail / medium
+    Column("format", String, nullable=False),  # webp / avif
+    Column("width", Integer, nullable=False),
+    Column("height", Integer, nullable=False),
+    Column("url", String, nullable=False),
+    UniqueConstraint("source_url", "variant", "format"),
+)
+
+# uploaded files by content -> identical files are stored (and uploaded to B2) only once
+upload_table = Table(
+    "uploads",
+    metadata,
+    Column("sha256", String, primary_key=True),
+    Column("file_name", String, nullable=False),  # object name in the bucket
+    Column("file_url", String, nullable=False),
+    Column("size", Integer, nullable=False),
+)
+
+# last run of periodic jobs -> with several workers, only one of them runs each job per interval
+scheduled_job_table = Table(
+    "scheduled_jobs",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("last_run_at", Float, nullable=False),  # unix timestamp
+)
+
+# <3> tables are created by Alembic migrations (tests: `metadata.create_all` in tests/conftest.py)
+# NOTE: no SQLAlchemy engine here -> queries go through `databases` below (an unused engine only slowed down startup)
+
+# <4> get database object with which we can interact
 """
 - databases module -> creates connection pool in background
 - grab one from the connection pool
 - but databases module works in an async fashion -> multiple different connections are in use -> can work async
 - ElephantSQL has a limitation on the number of connections that we can have open simultaneously (= 5)
+  -> DB_MAX_CONNECTIONS = that limit, shared by all workers (see `pool_size`)
+- asyncpg prepares each distinct SQL string on the server (statement cache per connection)
+  -> queries of `socialapi.querycache` always render the same SQL, so they are parsed & planned once
 """
-db_args = {"min_size": 1, "max_size": 3} if "postgres" in config.DATABASE_URL else {}
-database = databases.Database(
+
+
+def _connections_outside_pool() -> int:
+    # NOTE: the events backplane holds one connection per worker (LISTEN)
+    return 1 if config.EVENTS_BACKPLANE else 0
+
+
+def max_workers() -> int | None:
+    """most workers DB_MAX_CONNECTIONS allows (a pool of one each), None if there is no budget"""
+    if not config.DB_MAX_CONNECTIONS:
+        return None
+    return max(config.DB_MAX_CONNECTIONS // (1 + _connections_outside_pool()), 1)
+
+
+def pool_size() -> int:
+    """
+    connections per worker
+        - w/ DB_MAX_CONNECTIONS -> the budget is split between the workers (each has its own pool)
+        - the events backplane holds one more connection per worker (outside of the pool)
+        - NOTE: a budget too small for the workers -> error at startup (never more connections than allowed)
+    """
+    if not config.DB_MAX_CONNECTIONS:
+        return config.DB_POOL_SIZE
+    workers = max(config.WORKERS, 1)
+    per_worker = config.DB_MAX_CONNECTIONS // workers - _connections_outside_pool()
+    if per_worker < 1:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={config.DB_MAX_CONNECTIONS} is too small for {workers} workers "
+            f"(at most {max_workers()})"
+        )
+    return per_worker
+
+
+def postgres_args(url: str) -> dict:
+    if "postgres" not in url:
+        return {}
+    return {
+        "min_size": 1,
+        "max_size": pool_size(),
+        "statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+    }
+
+
+db_args = postgres_args(config.DATABASE_URL)
+# NOTE: every statement is timed & counted per request (see socialapi.querystats)
+database = InstrumentedDatabase(
     config.DATABASE_URL, force_rollback=config.DB_FORCE_ROLL_BACK, **db_args
 )
+
+# <5> read replicas (optional) -> read-only queries of GET endpoints use `read_database`
+# NOTE: without replicas, `read_database` simply reads from `database`
+read_database = ReplicaRouter(
+    database,
+    [
+        InstrumentedDatabase(url, **postgres_args(url))
+        for url in config.READ_REPLICA_URLS
+    ],
+    sticky_seconds=config.READ_YOUR_WRITES_SECONDS,
+)
+
+
+def dialect_insert(table: Table):
+    """
+    INSERT of the configured database's dialect -> supports `ON CONFLICT ...`
+        - both PostgreSQL and SQLite (>= 3.24) support it, but SQLAlchemy builds it per dialect
+    """
+    if database.url.dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    return insert(table)
+
+
+def insert_or_ignore(table: Table):
+    """
+    `INSERT ... ON CONFLICT DO NOTHING` for the configured database
+        - single statement -> no race between "does it exist?" and "insert"
+    """
+    return dialect_insert(table).on_conflict_do_nothing()
+
+
+def comment_path(comment_id: int, parent_path: str | None = None) -> str:
+    """materialized path of a comment (see `comment_table`) -> fixed width, so that text order == id order"""
+    segment = f"{comment_id:010d}"
+    return f"{parent_path}.{segment}" if parent_path else segment
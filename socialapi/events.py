@@ -0,0 +1,202 @@
+import asyncio
+import logging
+from typing import AsyncIterator
+
+import orjson
+from databases import DatabaseURL
+
+from socialapi.config import config
+from socialapi.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+"""
+[ live events (pub/sub) ]
+routers publish small events after their writes (ids only -> clients fetch what they need):
+    post_created {post_id, user_id} / comment_created {comment_id, post_id, user_id} / post_liked {post_id, user_id}
+- in-process fan-out to every subscriber (`GET /events`, server-sent events)
+    - an event is encoded to its SSE frame once, the same bytes go to all subscribers
+    - one bounded queue per subscriber -> a slow client never blocks the publisher or other clients
+    - a full queue (client doesn't keep up) -> the subscriber is dropped, its stream ends w/ a `dropped` event
+      (the client reconnects & refreshes, instead of silently missing events)
+- several workers (EVENTS_BACKPLANE=true, PostgreSQL only): events are sent w/ NOTIFY,
+  every worker LISTENs and fans them out to its own subscribers (the publisher included)
+    - NOTE: NOTIFY is delivered only to connected listeners -> events during a reconnect are lost
+"""
+
+EVENTS_CHANNEL = "socialapi_events"
+RECONNECT_SECONDS = 1.0
+
+events_published = Counter(
+    "socialapi_events_published_total", "Published live events by type", ("type",)
+)
+event_subscribers = Gauge(
+    "socialapi_event_subscribers", "Clients connected to the event stream"
+)
+event_subscribers_dropped = Counter(
+    "socialapi_event_subscribers_dropped_total",
+    "Event stream clients dropped because they didn't keep up",
+)
+
+
+def encode_event(event_type: str, data: dict) -> bytes:
+    """SSE frame of an event"""
+    return b"event: " + event_type.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+DROPPED_FRAME = encode_event("dropped", {"reason": "slow consumer"})
+HEARTBEAT_FRAME = b": heartbeat\n\n"
+CLOSE = b""  # end of a subscriber's stream (ex. shutdown)
+
+
+class Subscriber:
+    def __init__(self, queue_size: int) -> None:
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=queue_size)
+
+    def close(self, final_frame: bytes = CLOSE) -> None:
+        # NOTE: make room for the final frame(s), the rest is never read anyway
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        if final_frame:
+            self.queue.put_nowait(final_frame)
+        self.queue.put_nowait(CLOSE)
+
+    async def frames(self, heartbeat: float) -> AsyncIterator[bytes]:
+        while True:
+            try:
+                frame = await asyncio.wait_for(self.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                # NOTE: SSE comment -> keeps proxies / load balancers from closing an idle stream
+                yield HEARTBEAT_FRAME
+                continue
+            if frame == CLOSE:
+                return
+            yield frame
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = 100, max_subscribers: int = 1000) -> None:
+        self.queue_size = max(queue_size, 2)  # room for the final frames
+        # NOTE: each subscriber holds a queue & a stream for as long as it stays connected
+        self.max_subscribers = max_subscribers
+        self.subscribers: set[Subscriber] = set()
+        self.backplane: "PostgresBackplane | None" = None
+
+    @property
+    def full(self) -> bool:
+        return len(self.subscribers) >= self.max_subscribers
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        event_subscribers.set(len(self.subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+        event_subscribers.set(len(self.subscribers))
+
+    def deliver(self, frame: bytes) -> None:
+        """fan out an encoded event to the subscribers of this process"""
+        dropped = []
+        for subscriber in self.subscribers:
+            try:
+                subscriber.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                dropped.append(subscriber)
+
+        for subscriber in dropped:
+            logger.warning("Dropping a slow event stream client")
+            event_subscribers_dropped.inc()
+            self.unsubscribe(subscriber)
+            subscriber.close(DROPPED_FRAME)
+
+    async def publish(self, event_type: str, data: dict) -> None:
+        # NOTE: best effort -> a failed publish never fails the write that triggered it
+        frame = encode_event(event_type, data)
+        events_published.inc(type=event_type)
+        if self.backplane is not None:
+            try:
+                await self.backplane.notify(frame)
+                return
+            except Exception:
+                logger.exception("Publishing event to the backplane failed")
+        self.deliver(frame)
+
+    async def start(self) -> None:
+        if not config.EVENTS_BACKPLANE:
+            return
+        url = DatabaseURL(config.DATABASE_URL)
+        if url.dialect != "postgresql":
+            logger.warning("EVENTS_BACKPLANE needs PostgreSQL, events stay in-process")
+            return
+        self.backplane = PostgresBackplane(str(url.replace(driver="")), self.deliver)
+        await self.backplane.connect()
+
+    def close_streams(self) -> None:
+        """end the open streams -> their responses finish (they never end by themselves)"""
+        for subscriber in list(self.subscribers):
+            self.unsubscribe(subscriber)
+            subscriber.close()
+
+    async def stop(self) -> None:
+        if self.backplane is not None:
+            await self.backplane.close()
+            self.backplane = None
+        self.close_streams()
+
+
+class PostgresBackplane:
+    """LISTEN / NOTIFY on a dedicated asyncpg connection (not one of the pool's)"""
+
+    def __init__(self, url: str, deliver) -> None:
+        self.url = url
+        self.deliver = deliver
+        self.connection = None
+        self._lock = asyncio.Lock()  # one query at a time per asyncpg connection
+        self._closing = False
+        self._reconnecting: asyncio.Task | None = None
+
+    async def connect(self) -> None:
+        import asyncpg
+
+        self.connection = await asyncpg.connect(self.url)
+        await self.connection.add_listener(EVENTS_CHANNEL, self._on_notification)
+        self.connection.add_termination_listener(self._on_termination)
+        logger.info(f"Listening for events on {EVENTS_CHANNEL}")
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        self.deliver(payload.encode())
+
+    def _on_termination(self, connection) -> None:
+        if not self._closing:
+            logger.warning("Event backplane connection lost, reconnecting")
+            self._reconnecting = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while not self._closing:
+            await asyncio.sleep(RECONNECT_SECONDS)
+            try:
+                await self.connect()
+                return
+            except Exception:
+                logger.exception("Reconnecting the event backplane failed")
+
+    async def notify(self, frame: bytes) -> None:
+        if self.connection is None or self.connection.is_closed():
+            raise ConnectionError("Event backplane is not connected")
+        # NOTE: payloads are limited to 8000 bytes -> events carry ids only
+        async with self._lock:
+            await self.connection.execute(
+                "SELECT pg_notify($1, $2)", EVENTS_CHANNEL, frame.decode()
+            )
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+        if self.connection is not None and not self.connection.is_closed():
+            await self.connection.close()
+
+
+event_broker = EventBroker(config.EVENTS_QUEUE_SIZE, config.EVENTS_MAX_SUBSCRIBERS)
@@ -0,0 +1,118 @@
+import threading
+from typing import Callable, Sequence
+
+from socialapi.querycache import CachedQuery
+from socialapi.querystats import timed_query
+from socialapi.replicas import ReplicaRouter
+
+"""
+[ fast read path ]
+- hottest reads (post listing / post detail / user by email) skip the `databases` layer on PostgreSQL:
+    - SQL is rendered once per query for asyncpg (`$1` placeholders) -> server-side prepared statement
+    - `fetch()` on the raw asyncpg connection (binary protocol), no `Record` wrapper per row
+    - each row (a tuple of values) is zipped into a plain dict / named tuple once
+      -> Pydantic validates dicts directly, instead of walking objects with `from_attributes`
+- other databases (SQLite in tests / local dev) -> the usual `databases` path with the same `CachedQuery`
+
+ex.
+    await fastread.fetch_all(read_database, query_comments_on_post, post_id=1)
+"""
+
+# (values of a row, column names) -> row object
+RowFactory = Callable[[Sequence, tuple[str, ...]], object]
+
+
+def as_dict(row: Sequence, columns: tuple[str, ...]) -> dict:
+    return dict(zip(columns, row))
+
+
+def row_type(named_tuple: type) -> RowFactory:
+    """rows as a `NamedTuple` (attribute access like `Record`, ex. `user.password`), fields matched by name"""
+    fields = named_tuple._fields
+
+    def make(row: Sequence, columns: tuple[str, ...]):
+        if columns == fields:
+            return named_tuple._make(row)
+        # NOTE: other columns / order -> by name (a missing column raises, never a shifted field)
+        return named_tuple._make([row[columns.index(name)] for name in fields])
+
+    return make
+
+
+class PreparedQuery:
+    def __init__(self, cached: CachedQuery) -> None:
+        # NOTE: imported here -> SQLite deployments / tests never load the PostgreSQL dialect
+        from sqlalchemy.dialects.postgresql import asyncpg as asyncpg_dialect
+
+        compiled = cached.statement.compile(
+            dialect=asyncpg_dialect.dialect(),
+            compile_kwargs={"render_postcompile": True},
+        )
+        self._compiled = compiled
+        self.sql = compiled.string
+        # NOTE: plain `str` keys (not SQLAlchemy's `quoted_name`) -> orjson can serialize the dicts
+        self.columns = tuple(map(str, cached.statement.selected_columns.keys()))
+
+    def args(self, values: dict) -> list:
+        params = self._compiled.construct_params(values)
+        return [params[name] for name in self._compiled.positiontup]
+
+
+_prepared: dict[CachedQuery, PreparedQuery] = {}
+_prepared_lock = threading.Lock()
+
+
+def prepare(cached: CachedQuery) -> PreparedQuery:
+    prepared = _prepared.get(cached)
+    if prepared is None:
+        with _prepared_lock:
+            prepared = _prepared.setdefault(cached, PreparedQuery(cached))
+    return prepared
+
+
+def enabled(router: ReplicaRouter) -> bool:
+    # NOTE: replicas are copies of the primary -> same kind of database
+    return router.primary.url.dialect == "postgresql"
+
+
+async def fetch_all(
+    router: ReplicaRouter,
+    cached: CachedQuery,
+    row_factory: RowFactory = as_dict,
+    **values,
+) -> list:
+    if not enabled(router):
+        return await router.fetch_all(cached(**values))
+
+    prepared = prepare(cached)
+    args = prepared.args(values)
+
+    async def read(db) -> list:
+        async with db.connection() as connection:
+            with timed_query(cached, "postgresql"):
+                rows = await connection.raw_connection.fetch(prepared.sql, *args)
+        columns = prepared.columns
+        return [row_factory(row, columns) for row in rows]
+
+    return await router.run(read)
+
+
+async def fetch_one(
+    router: ReplicaRouter,
+    cached: CachedQuery,
+    row_factory: RowFactory = as_dict,
+    **values,
+):
+    if not enabled(router):
+        return await router.fetch_one(cached(**values))
+
+    prepared = prepare(cached)
+    args = prepared.args(values)
+
+    async def read(db):
+        async with db.connection() as connection:
+            with timed_query(cached, "postgresql"):
+                row = await connection.raw_connection.fetchrow(prepared.sql, *args)
+        return None if row is None else row_factory(row, prepared.columns)
+
+    return await router.run(read)
@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from enum import Enum
+from typing import Awaitable, Callable
+
+from databases import Database
+
+from socialapi.database import image_generation_table, insert_or_ignore
+from socialapi.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+"""
+[ image generation flow ]
+create_post (status = pending) -> background task
+    -> (1) cache hit (same prompt generated before)? -> reuse output_url, no API call
+    -> (2) same prompt already being generated in this process? -> wait for that call (single flight)
+    -> (3) concurrency limiter -> circuit breaker -> DeepAI API (retry w/ exponential backoff)
+    -> store output_url in the cache & update post (status = completed / failed)
+client polls `GET /post/{id}/image-status` until the status is not pending anymore
+"""
+
+MAX_CONCURRENT_REQUESTS = 4  # outbound DeepAI calls at once (per process)
+MAX_ATTEMPTS = 3
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 10.0
+
+image_generation_requests = Counter(
+    "socialapi_image_generation_requests_total",
+    "Image generation requests by how they were served",
+    ("result",),  # cache_hit / shared / generated / failed
+)
+
+
+class ImageStatus(str, Enum):
+    pending = "pending"
+    completed = "completed"
+    failed = "failed"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    stop calling an API that keeps failing
+        - closed: calls go through, consecutive failures are counted
+        - open: after `failure_threshold` failures, calls fail immediately for `reset_timeout` seconds
+        - half-open: after that, one trial call is let through -> success closes, failure opens again
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock=time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open" or (state == "half-open" and self._trial_running):
+            raise CircuitOpenError("Circuit breaker is open, not calling the API")
+        if state == "half-open":
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._trial_running or self._failures >= self.failure_threshold:
+            logger.warning("Opening circuit breaker for image generation API")
+            self._opened_at = self._clock()
+        self._trial_running = False
+
+    def release(self) -> None:
+        """a call ended w/o an outcome (ex. cancelled) -> the half-open trial may run again"""
+        self._trial_running = False
+
+    def reset(self) -> None:
+        self.record_success()
+
+
+def backoff_delay(attempt: int) -> float:
+    # NOTE: "full jitter" -> retries of many tasks don't hit the API at the same moment
+    return random.uniform(
+        0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+    )
+
+
+async def call_with_retries(
+    func: Callable[[], Awaitable],
+    is_retriable: Callable[[Exception], bool],
+    breaker: CircuitBreaker,
+):
+    for attempt in range(MAX_ATTEMPTS):
+        breaker.before_call()
+        try:
+            result = await func()
+        except Exception as err:
+            if not is_retriable(err):
+                # NOTE: the API answered (ex. a rejected prompt) -> not a sign of an outage
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            delay = backoff_delay(attempt)
+            logger.debug(f"Image generation failed ({err}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+        except BaseException:
+            breaker.release()  # -- cancelled -> must not block every later call
+            raise
+        else:
+            breaker.record_success()
+            return result
+
+
+def prompt_hash(prompt: str) -> str:
+    # NOTE: normalize whitespace & case -> "A cat" and " a  cat" share one image
+    normalized = " ".join(prompt.lower().split())
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+async def get_cached_image_url(database: Database, key: str) -> str | None:
+    query = image_generation_table.select().where(
+        image_generation_table.c.prompt_hash == key
+    )
+    row = await database.fetch_one(query)
+    return row.output_url if row else None
+
+
+async def cache_image_url(
+    database: Database, key: str, prompt: str, output_url: str
+) -> None:
+    # NOTE: another worker may have cached the same prompt in the meantime -> ignore conflict
+    query = insert_or_ignore(image_generation_table).values(
+        prompt_hash=key, prompt=prompt, output_url=output_url
+    )
+    await database.execute(query)
+
+
+class ImageGenerator:
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_REQUESTS) -> None:
+        self.max_concurrency = max_concurrency
+        self.breaker = CircuitBreaker()
+        self._semaphore: asyncio.Semaphore | None = None
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # NOTE: created lazily -> bound to the running event loop, not the one at import time
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def generate(
+        self,
+        database: Database,
+        prompt: str,
+        api_call: Callable[[str], Awaitable[dict]],
+        is_retriable: Callable[[Exception], bool],
+    ) -> str:
+        """return output_url for the prompt, calling the API only if it is not cached"""
+        key = prompt_hash(prompt)
+
+        if output_url := await get_cached_image_url(database, key):
+            logger.debug("Reusing cached image for prompt")
+            image_generation_requests.inc(result="cache_hit")
+            return output_url
+
+        if key in self._in_flight:
+            logger.debug("Waiting for in-flight generation of the same prompt")
+            image_generation_requests.inc(result="shared")
+            return await asyncio.shield(self._in_flight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            async with self.semaphore:
+                response = await call_with_retries(
+                    lambda: api_call(prompt), is_retriable, self.breaker
+                )
+            output_url = response["output_url"]
+            await cache_image_url(database, key, prompt, output_url)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as err:
+            image_generation_requests.inc(result="failed")
+            future.set_exception(err)
+            # NOTE: mark as retrieved, so that asyncio doesn't warn when no one else is waiting
+            future.exception()
+            raise
+        else:
+            image_generation_requests.inc(result="generated")
+            future.set_result(output_url)
+            return output_url
+        finally:
+            del self._in_flight[key]
+
+
+image_generator = ImageGenerator()
@@ -1,42 +1,186 @@
+import asyncio
+import contextvars
+import functools
+import hashlib
+import io
 import logging
-from functools import lru_cache
-
-import b2sdk.v2 as b2
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, TypeVar
 
 from socialapi.config import config
+from socialapi.metrics import Counter, Histogram
+from socialapi.tracing import span
+
+if TYPE_CHECKING:
+    import b2sdk.v2 as b2
 
 logger = logging.getLogger(__name__)
 
 # NOTE: third party APIs와 상호작용 할 때는 logging을 꼭 하자! 어디서 문제가 발생했는지 알기 위해서..
 
+T = TypeVar("T")
+
+
+"""
+[ B2 client lifecycle ]
+- authorized once at startup (`lifespan`) -> the first upload doesn't pay for authorization
+- authorization token expires after 24 hours -> re-authorized in the background before that
+    (and on use, if the background refresh didn't happen for some reason)
+- b2sdk is synchronous -> calls run in one shared thread pool, never on the event loop
+- b2sdk is slow to import -> imported on first use (w/ credentials: authorization at startup, in the pool)
+"""
+
+# NOTE: B2 auth tokens are valid for 24 hours -> refresh well before
+AUTHORIZATION_MAX_AGE_SECONDS = 23 * 60 * 60
+
+b2_authorizations = Counter(
+    "socialapi_b2_authorizations_total", "B2 account authorizations"
+)
+b2_uploads = Counter(
+    "socialapi_b2_uploads_total", "Uploads to B2 by result", ("result",)
+)
+b2_uploaded_bytes = Counter("socialapi_b2_upload_bytes_total", "Bytes uploaded to B2")
+b2_upload_seconds = Histogram(
+    "socialapi_b2_upload_seconds", "Duration of uploads to B2", ("operation",)
+)
+
+
+class B2Client:
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._api: "b2.B2Api | None" = None
+        self._bucket: "b2.Bucket | None" = None
+        self._authorized_at = 0.0
+        self._executor: ThreadPoolExecutor | None = None
+        self._refresh_task: asyncio.Task | None = None
+
+    # ----- authorization ----- #
+    def authorize(self) -> None:
+        with self._lock:
+            self._authorize()
+
+    def _authorize(self) -> None:
+        import b2sdk.v2 as b2
+
+        logger.debug("Creating and authorizing B2 API")
+
+        info = b2.InMemoryAccountInfo()
+        api = b2.B2Api(info)
+        api.authorize_account("production", config.B2_KEY_ID, config.B2_APPLICATION_KEY)
+        # NOTE: bucket을 하나만 사용하므로 authorize 할 때 같이 가져온다.
+        bucket = api.get_bucket_by_name(config.B2_BUCKET_NAME)
+
+        # swap only after both calls succeeded -> in-flight uploads keep the old (still valid) api
+        self._api, self._bucket = api, bucket
+        self._authorized_at = time.monotonic()
+        b2_authorizations.inc()
 
-@lru_cache()
-def b2_api():
-    logger.debug("Creating and authorizing B2 API")
+    def authorized(self) -> tuple["b2.B2Api", "b2.Bucket"]:
+        # NOTE: double-checked -> threads don't wait on the lock once authorized
+        if self._api is None or self._is_expiring():
+            with self._lock:
+                if self._api is None or self._is_expiring():
+                    self._authorize()
+        return self._api, self._bucket
 
-    # NOTE: auth 정보가 바뀌지 않을 것이므로 lru_cache()
-    info = b2.InMemoryAccountInfo()
-    b2_api = b2.B2Api(info)
+    def _is_expiring(self) -> bool:
+        return time.monotonic() - self._authorized_at >= AUTHORIZATION_MAX_AGE_SECONDS
 
-    b2_api.authorize_account("production", config.B2_KEY_ID, config.B2_APPLICATION_KEY)
-    return b2_api
+    # ----- lifecycle ----- #
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="b2"
+            )
+        return self._executor
 
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """run a (blocking) b2 function in the shared upload thread pool"""
+        loop = asyncio.get_running_loop()
+        # NOTE: in the caller's context (like `asyncio.to_thread`) -> correlation id & trace span
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(context.run, func, *args, **kwargs)
+        )
 
-@lru_cache()
-def b2_get_bucket(api: b2.B2Api):
-    # NOTE: bucket을 하나만 사용할 것이므로 lru_cache()
-    return api.get_bucket_by_name(config.B2_BUCKET_NAME)
+    async def start(self) -> None:
+        if not (config.B2_KEY_ID and config.B2_APPLICATION_KEY):
+            logger.warning("B2 credentials are not configured, uploads are disabled")
+            return
 
+        try:
+            await self.run(self.authorize)
+        except Exception:
+            # NOTE: don't prevent the API from starting -> authorization is retried on first use
+            logger.exception("Authorizing B2 at startup failed")
 
-def b2_upload_file(local_file: str, file_name: str) -> str:
-    # NOTE: b2_api()는 첫 호출 시에만 계산되고, 그 후로는 cached value가 반환된다.
-    api = b2_api()
+        self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(AUTHORIZATION_MAX_AGE_SECONDS)
+            try:
+                await self.run(self.authorize)
+            except Exception:
+                logger.exception("Refreshing B2 authorization failed")
+
+    async def close(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            # NOTE: wait for the cancellation -> no pending task is left behind on shutdown
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+        if self._executor is not None:
+            # NOTE: waits for running uploads to finish
+            await asyncio.to_thread(self._executor.shutdown, wait=True)
+            self._executor = None
+
+
+b2_client = B2Client(max_workers=config.B2_UPLOAD_THREADS)
+
+
+@contextmanager
+def _measure_upload(operation: str, size: int):
+    start = time.perf_counter()
+    try:
+        with span(
+            f"b2 upload_{operation}",
+            "client",
+            {"server.address": "backblazeb2.com", "socialapi.upload_bytes": size},
+        ):
+            yield
+    except Exception:
+        b2_uploads.inc(result="error")
+        raise
+    b2_upload_seconds.observe(time.perf_counter() - start, operation=operation)
+    b2_uploaded_bytes.inc(size)
+    b2_uploads.inc(result="success")
+
+
+# NOTE: for content-addressed names (the content behind a name never changes) -> CDN & browsers can cache forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def b2_upload_file(
+    local_file: str, file_name: str, cache_control: str | None = None
+) -> str:
+    # NOTE: authorized at startup, so usually no API call is made here
+    api, bucket = b2_client.authorized()
 
     logger.debug(f"Uploading {local_file} to B2 as {file_name}")
 
-    uploaded_file = b2_get_bucket(api).upload_local_file(
-        local_file=local_file, file_name=file_name
-    )
+    # NOTE: B2 serves the `b2-cache-control` file info as the Cache-Control header on download
+    file_infos = {"b2-cache-control": cache_control} if cache_control else None
+    with _measure_upload("file", os.path.getsize(local_file)):
+        uploaded_file = bucket.upload_local_file(
+            local_file=local_file, file_name=file_name, file_infos=file_infos
+        )
 
     # NOTE: public bucket에 file을 올리면, download url을 얻을 수 있다.
     download_url = api.get_download_url_for_fileid(uploaded_file.id_)
@@ -45,3 +189,86 @@ def b2_upload_file(local_file: str, file_name: str) -> str:
     )
 
     return download_url
+
+
+def b2_upload_bytes(data: bytes, file_name: str, content_type: str) -> str:
+    api, bucket = b2_client.authorized()
+
+    logger.debug(f"Uploading {len(data)} bytes to B2 as {file_name}")
+
+    with _measure_upload("bytes", len(data)):
+        uploaded_file = bucket.upload_bytes(
+            data_bytes=data, file_name=file_name, content_type=content_type
+        )
+
+    download_url = api.get_download_url_for_fileid(uploaded_file.id_)
+    logger.debug(f"Uploaded {file_name} to B2 successfully")
+
+    return download_url
+
+
+# ----- direct (client -> B2) uploads ----- #
+def b2_get_upload_authorization() -> dict:
+    """
+    upload URL & token with which a client uploads a file straight to the bucket (b2_get_upload_url)
+        - the token only allows uploading to this bucket, and is valid for 24 hours
+        - NOTE: it is NOT limited to one file name -> whatever the client uploaded is verified before use
+          (`b2_get_file_info`, `b2_hash_file`), and URLs are by file id -> a new version never changes them
+    """
+    api, bucket = b2_client.authorized()
+
+    logger.debug("Getting upload URL for direct upload to B2")
+
+    response = api.session.get_upload_url(bucket.id_)
+    return {
+        "upload_url": response["uploadUrl"],
+        "authorization_token": response["authorizationToken"],
+    }
+
+
+def b2_get_file_info(file_name: str) -> dict | None:
+    from b2sdk.v2.exception import FileNotPresent
+
+    api, bucket = b2_client.authorized()
+
+    logger.debug(f"Getting info of {file_name} from B2")
+
+    try:
+        file_version = bucket.get_file_info_by_name(file_name)
+    except FileNotPresent:
+        return None
+
+    # NOTE: more than one version -> the name was uploaded to again (ex. to replace the content)
+    versions = sum(1 for _ in bucket.list_file_versions(file_name, fetch_count=2))
+
+    return {
+        "file_id": file_version.id_,
+        "size": file_version.size,
+        "content_sha1": file_version.content_sha1,
+        "file_info": file_version.file_info,
+        "versions": versions,
+        "file_url": api.get_download_url_for_fileid(file_version.id_),
+    }
+
+
+class _HashingWriter(io.RawIOBase):
+    def __init__(self) -> None:
+        self.digest = hashlib.sha256()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.digest.update(data)
+        return len(data)
+
+
+def b2_hash_file(file_id: str) -> str:
+    """SHA-256 of a file in the bucket (streamed, never stored)"""
+    api, bucket = b2_client.authorized()
+
+    logger.debug(f"Hashing {file_id} in B2")
+
+    writer = _HashingWriter()
+    bucket.download_file_by_id(file_id).save(writer)
+    return writer.digest.hexdigest()
@@ -0,0 +1,122 @@
+import asyncio
+import functools
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# NOTE: this module must stay free of app imports (config, database, ...)
+# -> process pool workers import it to run `render_variants`, and should start fast
+
+# variant name -> longest side in pixels
+VARIANT_SIZES = {"thumbnail": 320, "medium": 1080}
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
+
+MAX_IMAGE_PIXELS = 40_000_000
+
+
+@functools.cache
+def pil():
+    """
+    Pillow, configured once
+        - imported on first use -> the API process starts w/o it (only pool workers render images)
+    """
+    from PIL import Image, ImageOps
+
+    # NOTE: refuse decompression bombs (ex. a tiny PNG that decodes to 50k x 50k pixels)
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+    try:
+        # NOTE: optional plugin (`poetry install -E avif`) -> registers the AVIF encoder to Pillow
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+
+    return Image, ImageOps
+
+
+@dataclass(frozen=True)
+class ImageVariant:
+    variant: str
+    format: str  # webp / avif
+    width: int
+    height: int
+    data: bytes
+
+    @property
+    def content_type(self) -> str:
+        return f"image/{self.format}"
+
+
+def output_formats() -> list[str]:
+    Image, _ = pil()
+    formats = ["webp"]
+    if "AVIF" in Image.SAVE:
+        formats.append("avif")
+    return formats
+
+
+def render_variants(data: bytes) -> list[ImageVariant]:
+    """
+    resize the original image into every variant & format (CPU heavy -> runs in the process pool)
+        - EXIF orientation is applied to the pixels first, then all metadata (EXIF, GPS, ICC, ...) is dropped
+        - images are never upscaled
+    """
+    Image, ImageOps = pil()
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    variants = []
+    for variant, size in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        for image_format in output_formats():
+            buffer = io.BytesIO()
+            # NOTE: no `exif=` / `icc_profile=` arguments -> metadata is stripped
+            resized.save(
+                buffer,
+                format=image_format.upper(),
+                quality=WEBP_QUALITY if image_format == "webp" else AVIF_QUALITY,
+            )
+            variants.append(
+                ImageVariant(
+                    variant, image_format, *resized.size, data=buffer.getvalue()
+                )
+            )
+
+    return variants
+
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # NOTE: "spawn" -> workers don't inherit the event loop, threads & sockets of the API process
+        workers = os.cpu_count() or 1
+        logger.debug(f"Starting image processing pool with {workers} workers")
+        _pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+async def render_variants_in_pool(data: bytes) -> list[ImageVariant]:
+    # NOTE: image encoding holds the GIL -> threads wouldn't help, processes use all cores
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), render_variants, data)
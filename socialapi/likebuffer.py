@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from collections import Counter as TallyCounter
+
+from databases import Database
+from sqlalchemy import select
+
+from socialapi.config import config
+from socialapi.database import database, like_table, post_table
+from socialapi.events import event_broker
+from socialapi.metrics import Counter, Gauge
+from socialapi.ranking import LIKE_WEIGHT, bump_hot_score
+from socialapi.userstats import bump_user_stats
+
+logger = logging.getLogger(__name__)
+
+"""
+[ write-behind likes ]
+- a viral post -> every `POST /like` inserts into `likes` & updates the same `posts` row (hot_score)
+  -> all those transactions wait on the same row lock / index pages
+- LIKE_BUFFER_ENABLED=true -> `POST /like` only adds the like to this buffer (202 Accepted)
+    - pending likes are deduplicated per (user, post)
+    - every LIKE_BUFFER_FLUSH_SECONDS, one transaction writes them all:
+      multi-row INSERTs + one `hot_score` UPDATE per post (w/ the summed weights)
+      + one `user_stats` upsert per post owner
+    - a failed flush puts the likes back -> retried by the next flush
+    - `post_liked` events are published once the flush has committed -> a client that refetches sees the like
+    - shutdown (lifespan) -> the loop stops & the remaining likes are flushed before disconnecting
+- NOTE: per process -> a hard crash (ex. SIGKILL) loses at most one interval of likes,
+  and likes show up in the counts w/ a delay of up to one interval
+"""
+
+# NOTE: 2 values per row -> stays below the bind parameter limits (SQLite 32766 / PostgreSQL 32767)
+INSERT_CHUNK_SIZE = 5_000
+SHUTDOWN_FLUSH_ATTEMPTS = 3
+
+like_buffer_flushes = Counter(
+    "socialapi_like_buffer_flushes_total",
+    "Flushes of the like buffer by result",
+    ("result",),  # ok / error
+)
+like_buffer_flushed = Counter(
+    "socialapi_like_buffer_flushed_likes_total", "Likes written by the like buffer"
+)
+like_buffer_pending = Gauge(
+    "socialapi_like_buffer_pending", "Likes waiting for the next flush"
+)
+
+
+class LikeBuffer:
+    def __init__(
+        self,
+        database: Database,
+        flush_interval: float = 0.25,
+        max_pending: int = 10_000,
+    ) -> None:
+        self.database = database
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # (user_id, post_id) -> dict keeps the arrival order
+        self._pending: dict[tuple[int, int], None] = {}
+        self._in_flight: dict[tuple[int, int], None] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def full(self) -> bool:
+        return len(self._pending) >= self.max_pending
+
+    def add(self, user_id: int, post_id: int) -> bool:
+        """False if the same like is already waiting (or being written)"""
+        key = (user_id, post_id)
+        if key in self._pending or key in self._in_flight:
+            return False
+        self._pending[key] = None
+        like_buffer_pending.set(len(self._pending))
+        return True
+
+    async def flush(self) -> int:
+        """write the pending likes in one transaction, returns the number of written likes"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            # NOTE: swap -> likes added during the flush go to the next batch
+            self._in_flight, self._pending = self._pending, {}
+            like_buffer_pending.set(0)
+            likes = list(self._in_flight)
+            try:
+                await self._write(likes)
+            except BaseException:
+                like_buffer_flushes.inc(result="error")
+                # NOTE: put them back (before newer ones) -> nothing is lost
+                self._pending = {**self._in_flight, **self._pending}
+                like_buffer_pending.set(len(self._pending))
+                raise
+            finally:
+                count, self._in_flight = len(self._in_flight), {}
+
+        like_buffer_flushes.inc(result="ok")
+        like_buffer_flushed.inc(count)
+        logger.debug(f"Flushed {count} buffered likes")
+        for user_id, post_id in likes:
+            await event_broker.publish(
+                "post_liked", {"post_id": post_id, "user_id": user_id}
+            )
+        return count
+
+    async def _write(self, likes: list[tuple[int, int]]) -> None:
+        per_post = TallyCounter(post_id for _, post_id in likes)
+        async with self.database.transaction():
+            for start in range(0, len(likes), INSERT_CHUNK_SIZE):
+                chunk = likes[start : start + INSERT_CHUNK_SIZE]
+                await self.database.execute(
+                    like_table.insert().values(
+                        [
+                            {"user_id": user_id, "post_id": post_id}
+                            for user_id, post_id in chunk
+                        ]
+                    )
+                )
+            # NOTE: same order in every worker -> concurrent flushes can't deadlock on the posts rows
+            for post_id in sorted(per_post):
+                await self.database.execute(
+                    bump_hot_score(post_id, per_post[post_id] * LIKE_WEIGHT)
+                )
+
+            per_owner = TallyCounter()
+            for post in await self.database.fetch_all(
+                select(post_table.c.id, post_table.c.user_id).where(
+                    post_table.c.id.in_(per_post)
+                )
+            ):
+                per_owner[post.user_id] += per_post[post.id]
+            for user_id in sorted(per_owner):
+                await self.database.execute(
+                    bump_user_stats(user_id, likes_received=per_owner[user_id])
+                )
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing buffered likes failed, retrying later")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(), name="like-buffer")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # NOTE: final flush -> graceful shutdown doesn't drop accepted likes
+        for _ in range(SHUTDOWN_FLUSH_ATTEMPTS):
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing buffered likes on shutdown failed")
+            else:
+                return
+        logger.error(f"Dropped {len(self._pending)} buffered likes on shutdown")
+
+
+like_buffer = LikeBuffer(
+    database, config.LIKE_BUFFER_FLUSH_SECONDS, config.LIKE_BUFFER_MAX_PENDING
+)
@@ -1,44 +1,10 @@
 import logging
 from logging.config import dictConfig
 
-from socialapi.config import DevConfig, ProdConfig, config
-
-
-# custom filter for hiding emails
-def obfuscated(email: str, obfuscated_length: int) -> str:
-    characters = email[:obfuscated_length]
-    first, last = email.split("@")
-    return characters + ("*" * (len(first) - obfuscated_length)) + "@" + last
-
-
-class EmailObfuscationFilter(logging.Filter):
-    """
-    for not logging some personal data(ex. emails) which are included in extra argument
-    extra argument:
-        ```
-        logger.debug(query, extra={"email": "bob@example.net"})
-        ```
-        -> to log extra information that isn't included in formatting message
-    """
-
-    def __init__(self, name: str = "", obfuscated_length: int = 2) -> None:
-        super().__init__(name)
-        self.obfuscated_length = obfuscated_length
+from pythonjsonlogger import jsonlogger
 
-    def filter(self, record: logging.LogRecord) -> bool:
-        """
-        If return true, the log record will be displayed.
-        Otherwise, the log record will be filtered out.
-
-        If you want to add new variables like "correlation_id", just set an attribute of record.
-        ```
-        record.your_variable = "123"
-        ```
-        This variable can be used in formatters.
-        """
-        if "email" in record.__dict__:
-            record.email = obfuscated(record.email, self.obfuscated_length)
-        return True
+from socialapi.config import DevConfig, ProdConfig, config
+from socialapi.redaction import RedactionFilter
 
 
 # enable logtail only in production
@@ -47,6 +13,19 @@ if isinstance(config, ProdConfig):
     handlers.append("logtail")
 
 
+class JsonFormatter(jsonlogger.JsonFormatter):
+    """uses the redacted `exc_text` (see socialapi.redaction) -> doesn't render `exc_info` again"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not record.exc_text:
+            return super().format(record)
+        exc_info, record.exc_info = record.exc_info, None
+        try:
+            return super().format(record)
+        finally:
+            record.exc_info = exc_info
+
+
 def configure_logging() -> None:
     dictConfig(
         {
@@ -60,9 +39,10 @@ def configure_logging() -> None:
                     "default_value": "-",
                 },
                 # add custom filter
-                "email_obfuscation": {
-                    "()": EmailObfuscationFilter,  # class -> use class // str -> import
-                    "obfuscated_length": 2 if isinstance(config, DevConfig) else 0,
+                # NOTE: one instance shared by the handlers -> each record is redacted once (see socialapi.redaction)
+                "redaction": {
+                    "()": RedactionFilter,  # class -> use class // str -> import
+                    "email_visible_chars": 2 if isinstance(config, DevConfig) else 0,
                 },
             },
             "formatters": {
@@ -73,7 +53,7 @@ def configure_logging() -> None:
                 },
                 # file logs
                 "file": {
-                    "class": "pythonjsonlogger.jsonlogger.JsonFormatter",
+                    "class": "socialapi.logging_conf.JsonFormatter",
                     "datefmt": "%Y-%m-%dT%H:%M:%S",
                     # standard datetime format for file logs (ISO format standard) -> for analyzing
                     # when using json logger, just list variables (don't care the format)
@@ -86,25 +66,28 @@ def configure_logging() -> None:
                     "class": "rich.logging.RichHandler",  # -- change to rich handler
                     "level": "DEBUG",
                     "formatter": "console",  # -- one of the "formatters"
-                    "filters": ["correlation_id", "email_obfuscation"],
+                    "filters": ["redaction", "correlation_id"],
                 },
-                # when file size reaches certain size...
+                # when file size reaches certain size (or every day)...
+                # NOTE: safe w/ several workers, old files are gzip-compressed in the background
                 "rotating_file": {
-                    "class": "logging.handlers.RotatingFileHandler",
+                    "class": "socialapi.logrotation.SharedRotatingFileHandler",
                     "level": "DEBUG",
                     "formatter": "file",  # -- one of the "formatters"
-                    "filename": "socialapi.log",
-                    # should calculate the disk size to decide maxBytes & backupCount
-                    "maxBytes": 1024 * 1024,  # 1MB per file
-                    "backupCount": 5,  # 5 files
+                    "filename": config.LOG_FILE,
+                    # should calculate the disk size to decide max_bytes & backup_count
+                    "max_bytes": config.LOG_FILE_MAX_BYTES,
+                    "rotate_seconds": config.LOG_FILE_ROTATE_SECONDS,
+                    "backup_count": config.LOG_FILE_BACKUPS,
+                    "retention_days": config.LOG_FILE_RETENTION_DAYS,
                     "encoding": "utf8",
-                    "filters": ["correlation_id", "email_obfuscation"],
+                    "filters": ["redaction", "correlation_id"],
                 },
                 "logtail": {
                     "class": "logtail.LogtailHandler",
                     "level": "DEBUG",
                     "formatter": "console",
-                    "filters": ["correlation_id", "email_obfuscation"],
+                    "filters": ["redaction", "correlation_id"],
                     "source_token": config.LOGTAIL_API_KEY,
                 },
             },
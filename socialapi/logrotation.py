@@ -0,0 +1,218 @@
+import datetime
+import glob
+import gzip
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # -- Windows: no lock -> only safe w/ a single process
+    fcntl = None
+
+"""
+[ log file rotation (several workers) ]
+`RotatingFileHandler` in every worker -> each one renames the files on its own
+    -> renames race (segments overwritten, lines written to renamed files) & one worker's rotation
+       goes unnoticed by the others
+`SharedRotatingFileHandler`:
+- rotates by size (max_bytes) and/or time (rotate_seconds, aligned to the clock -> same moment in every worker)
+- rotation = one rename under a lock file (`<file>.lock`, flock) -> only one worker rotates
+    - segments are named by UTC time (`socialapi.log.20260101-000000-000000`) -> no renaming of older segments
+    - the other workers notice the new file (other inode) within `sync_seconds` & reopen it
+- rotated segments are gzip-compressed in a background thread -> logging never waits for compression
+    - NOTE: after `compress_delay` -> workers that haven't reopened yet still append to the segment
+- retention: the newest `backup_count` segments, none older than `retention_days` (0 -> no limit)
+- per-record cost: the size is counted while writing, the file is only stat()-ed every `sync_seconds`
+"""
+
+SEGMENT_TIME_FORMAT = "%Y%m%d-%H%M%S-%f"
+
+
+def segment_paths(base: str) -> list[str]:
+    """rotated segments (compressed or not), oldest first"""
+    paths = glob.glob(f"{glob.escape(base)}.[0-9]*")
+    return sorted(path for path in paths if not path.endswith(".tmp"))
+
+
+def compress(path: str) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(path, "rb") as source, gzip.open(
+            tmp, "wb", compresslevel=6
+        ) as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        os.replace(tmp, f"{path}.gz")
+        os.remove(path)
+    except FileNotFoundError:
+        pass  # -- compressed by another worker already
+
+
+def prune(
+    base: str, backup_count: int, retention_days: float, compress_after: float
+) -> None:
+    """compress leftover segments (ex. of a stopped worker) & delete the ones beyond the retention"""
+    now = time.time()
+    segments = segment_paths(base)
+    for path in segments:
+        if not path.endswith(".gz") and now - _mtime(path, now) >= compress_after:
+            compress(path)
+
+    segments = segment_paths(base)
+    expired = segments[: -backup_count or None] if backup_count else []
+    if retention_days:
+        oldest = now - retention_days * 24 * 60 * 60
+        expired += [path for path in segments if _mtime(path, now) < oldest]
+    for path in set(expired):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _mtime(path: str, default: float) -> float:
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return default
+
+
+class _Compressor(threading.Thread):
+    def __init__(self, handler: "SharedRotatingFileHandler") -> None:
+        super().__init__(name="log-compressor", daemon=True)
+        self.handler = handler
+        self.segments: queue.Queue[str | None] = queue.Queue()
+
+    def run(self) -> None:
+        handler = self.handler
+        while (segment := self.segments.get()) is not None:
+            try:
+                # NOTE: give the other workers time to reopen the log file
+                time.sleep(handler.compress_delay)
+                compress(segment)
+                prune(
+                    handler.baseFilename,
+                    handler.backup_count,
+                    handler.retention_days,
+                    handler.compress_delay,
+                )
+            except Exception:
+                logger.exception("Compressing a log segment failed")
+
+
+class SharedRotatingFileHandler(logging.FileHandler):
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 0,
+        rotate_seconds: float = 0,
+        backup_count: int = 0,
+        retention_days: float = 0,
+        encoding: str | None = None,
+        sync_seconds: float = 1.0,
+        compress_delay: float | None = None,
+    ) -> None:
+        super().__init__(filename, mode="a", encoding=encoding)
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.retention_days = retention_days
+        self.sync_seconds = sync_seconds
+        self.compress_delay = (
+            2 * sync_seconds if compress_delay is None else compress_delay
+        )
+        self._lock_file = open(f"{self.baseFilename}.lock", "a")
+        self._compressor: _Compressor | None = None
+        self._size = os.fstat(self.stream.fileno()).st_size
+        self._next_sync = time.time() + sync_seconds
+        self._rollover_at = self._next_rollover(time.time())
+
+    def _next_rollover(self, now: float) -> float:
+        if not self.rotate_seconds:
+            return float("inf")
+        return now - now % self.rotate_seconds + self.rotate_seconds
+
+    def _reopen(self) -> None:
+        self.stream.close()
+        self.stream = self._open()
+        self._size = os.fstat(self.stream.fileno()).st_size
+
+    def _rotated_elsewhere(self) -> bool:
+        try:
+            current = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return True
+        return current.st_ino != os.fstat(self.stream.fileno()).st_ino
+
+    def _sync(self, now: float) -> None:
+        """pick up rotations & writes of the other workers"""
+        self._next_sync = now + self.sync_seconds
+        if self._rotated_elsewhere():
+            self._reopen()
+            self._rollover_at = self._next_rollover(now)
+        else:
+            self._size = os.fstat(self.stream.fileno()).st_size
+
+    def _rollover(self, now: float) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            # NOTE: another worker may have rotated while we waited for the lock
+            if self._rotated_elsewhere():
+                self._reopen()
+            else:
+                # NOTE: UTC -> names sort by time, also when DST ends (retention keeps the last ones)
+                stamp = datetime.datetime.fromtimestamp(now, datetime.UTC).strftime(
+                    SEGMENT_TIME_FORMAT
+                )
+                segment = f"{self.baseFilename}.{stamp}"
+                self.stream.close()
+                os.rename(self.baseFilename, segment)
+                self.stream = self._open()
+                self._size = 0
+                self._compress(segment)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._rollover_at = self._next_rollover(now)
+
+    def _compress(self, segment: str) -> None:
+        if self._compressor is None:
+            self._compressor = _Compressor(self)
+            self._compressor.start()
+        self._compressor.segments.put(segment)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            now = record.created
+            if now >= self._next_sync:
+                self._sync(now)
+            if (self.max_bytes and self._size >= self.max_bytes) or (
+                now >= self._rollover_at
+            ):
+                self._rollover(now)
+
+            message = self.format(record) + self.terminator
+            self.stream.write(message)
+            self.stream.flush()
+            self._size += len(message)  # -- characters, close enough to bytes
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        with self.lock:
+            compressor, self._compressor = self._compressor, None
+        if compressor is not None:
+            # NOTE: w/o the handler lock (the compressor may log an error)
+            #   segments not compressed by then -> compressed by the next `prune()` of any worker
+            compressor.segments.put(None)
+            compressor.join(timeout=self.compress_delay + 5)
+        with self.lock:
+            if not self._lock_file.closed:
+                self._lock_file.close()
+            super().close()
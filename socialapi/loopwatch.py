@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from asgi_correlation_id.context import correlation_id
+
+from socialapi.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+"""
+[ event loop watchdog ]
+synchronous work on the loop (ex. bcrypt, b2sdk, console rendering) -> every other request waits for it
+LOOP_WATCHDOG_ENABLED=true ->
+- lag: a task sleeps LOOP_WATCHDOG_INTERVAL_SECONDS & measures how late it wakes up -> lag histogram
+- blocking calls: a (daemon) thread checks that the task keeps waking up
+    - late by more than LOOP_WATCHDOG_THRESHOLD_SECONDS -> the loop is stuck right now
+      -> the stack of the loop thread = the blocking call, logged w/ the route & correlation id of the request
+         (found in the same stack: the frame of `RouteContextMiddleware.__call__` the call runs under)
+    - one report per stall (logged while the loop is still blocked, no matter how long it takes)
+- NOTE: reading another thread's stack is cheap, but not free -> opt-in
+"""
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+loop_lag = Histogram(
+    "socialapi_event_loop_lag_seconds",
+    "How late the event loop runs a scheduled callback",
+    buckets=LAG_BUCKETS,
+)
+loop_stalls = Counter(
+    "socialapi_event_loop_stalls_total",
+    "Blocking calls that stalled the event loop beyond the threshold",
+)
+
+NO_REQUEST = ("-", "-")
+
+
+def request_of(frame) -> tuple[str, str]:
+    """("METHOD /path", correlation id) of the request a stack runs under (walks up to `RouteContextMiddleware`)"""
+    # NOTE: context variables can't be read from another thread -> the middleware's local variable
+    while frame is not None:
+        if frame.f_code is RouteContextMiddleware.__call__.__code__:
+            return frame.f_locals.get("request", NO_REQUEST)
+        frame = frame.f_back
+    return NO_REQUEST
+
+
+class LoopWatchdog:
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self._loop_thread_id: int | None = None
+        self._last_beat = 0.0
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+
+    async def _beat(self) -> None:
+        while True:
+            started = time.perf_counter()
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            loop_lag.observe(max(time.perf_counter() - started - self.interval, 0.0))
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stopping.wait(self.interval):
+            last_beat = self._last_beat
+            stalled = time.monotonic() - last_beat - self.interval
+            if stalled > self.threshold and last_beat != reported_beat:
+                reported_beat = last_beat
+                self.report(stalled)
+
+    def report(self, stalled: float) -> None:
+        """log the blocking call (runs in the watchdog thread, while the loop is stuck)"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame else "(no stack)\n"
+        route, request_id = request_of(frame)
+
+        loop_stalls.inc()
+        logger.warning(
+            f"Event loop blocked for {stalled * 1000:.0f} ms+ "
+            f"(route {route}, request {request_id})\n{stack}",
+            extra={"route": route, "request_id": request_id},
+        )
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._beat(), name="loop-watchdog")
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class RouteContextMiddleware:
+    """
+    pure ASGI middleware -> the watchdog knows which request a blocked task serves
+        - NOTE: inside CorrelationIdMiddleware (-> the id is set already)
+        - child tasks of a request (ex. streaming responses) are reported w/o the route
+        - NOTE: nothing is stored -> `request_of` reads the local variable `request` of this frame
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request = (  # noqa: F841 -- read by `request_of`
+            f"{scope['method']} {scope['path']}",
+            correlation_id.get() or "-",
+        )
+        return await self.app(scope, receive, send)
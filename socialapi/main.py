@@ -1,48 +1,114 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
-import sentry_sdk
 from asgi_correlation_id import CorrelationIdMiddleware
 from fastapi import FastAPI, HTTPException
 from fastapi.exception_handlers import http_exception_handler
+from fastapi.responses import ORJSONResponse
 
+from socialapi.bloom import registered_emails
 from socialapi.config import config
-from socialapi.database import database
+from socialapi.database import database, read_database
+from socialapi.events import event_broker
+from socialapi.libs.b2 import b2_client
+from socialapi.libs.imaging import shutdown_process_pool
+from socialapi.likebuffer import like_buffer
 from socialapi.logging_conf import configure_logging
+from socialapi.loopwatch import LoopWatchdog, RouteContextMiddleware
+from socialapi.querystats import QueryStatsMiddleware
+from socialapi.ranking import decay_hot_scores
+from socialapi.replicas import ReadYourWritesMiddleware
+from socialapi.routers.events import router as events_router
+from socialapi.routers.export import router as export_router
+from socialapi.routers.metrics import router as metrics_router
 from socialapi.routers.post import router as post_router
 from socialapi.routers.upload import router as upload_router
 from socialapi.routers.user import router as user_router
+from socialapi.scheduler import Scheduler
+from socialapi.tracing import TracingMiddleware, configure_tracing, shutdown_tracing
 
-sentry_sdk.init(
-    dsn=config.SENTRY_DSN,
-    # Set traces_sample_rate to 1.0 to capture 100%
-    # of transactions for performance monitoring.
-    traces_sample_rate=1.0,
-    # Set profiles_sample_rate to 1.0 to profile 100%
-    # of sampled transactions.
-    # We recommend adjusting this value in production.
-    profiles_sample_rate=1.0,
-)
+if config.SENTRY_DSN:
+    # NOTE: sentry_sdk (+ its integrations) is slow to import -> only when Sentry is configured
+    import sentry_sdk
+
+    sentry_sdk.init(
+        dsn=config.SENTRY_DSN,
+        # Set traces_sample_rate to 1.0 to capture 100%
+        # of transactions for performance monitoring.
+        traces_sample_rate=1.0,
+        # Set profiles_sample_rate to 1.0 to profile 100%
+        # of sampled transactions.
+        # We recommend adjusting this value in production.
+        profiles_sample_rate=1.0,
+    )
 
 logger = logging.getLogger(__name__)
 
+loop_watchdog = LoopWatchdog(
+    config.LOOP_WATCHDOG_INTERVAL_SECONDS, config.LOOP_WATCHDOG_THRESHOLD_SECONDS
+)
+
+# periodic jobs (one run per interval across all workers)
+scheduler = Scheduler(database)
+scheduler.add_job(
+    "decay_hot_scores", config.HOT_SCORE_DECAY_INTERVAL_SECONDS, decay_hot_scores
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     configure_logging()
+    if config.TRACING_ENABLED:
+        configure_tracing()
+    if config.LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.start()  # -- first -> also catches blocking calls during startup
 
     await database.connect()  # startup: setup
+    await read_database.connect()  # -- read replicas (if configured)
+    # -- duplicate email checks w/o queries, built in the background (startup doesn't wait)
+    registered_emails.start(database)
+    await b2_client.start()  # -- authorize B2 now, not on the first upload
+    await event_broker.start()  # -- LISTEN on the backplane (if configured)
+    scheduler.start()
+    if config.LIKE_BUFFER_ENABLED:
+        like_buffer.start()
     yield  # -- pause execution until sth happens(= FastAPI tells it to continue) -- #
+    # -- flush the buffered likes while the database is still connected
+    await like_buffer.stop()
+    await registered_emails.stop()
+    await scheduler.stop()
+    await event_broker.stop()  # -- ends the open event streams
+    await b2_client.close()
+    await read_database.disconnect()
     await database.disconnect()  # shutdown: teardown (when FastAPI app terminates)
+    # -- waits for the running image jobs -> in a thread, doesn't block the event loop
+    await asyncio.to_thread(shutdown_process_pool)
+    await loop_watchdog.stop()
+    shutdown_tracing()  # -- exports the remaining spans
 
 
-app = FastAPI(lifespan=lifespan)
+# NOTE: orjson -> much faster serialization of (big) JSON responses than the standard json module
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# query count & DB time per request (N+1 warnings, Server-Timing header w/ DB_SERVER_TIMING)
+app.add_middleware(QueryStatsMiddleware)
+if config.TRACING_ENABLED:
+    # server span of each request (inside the correlation id middleware)
+    app.add_middleware(TracingMiddleware)
+if config.LOOP_WATCHDOG_ENABLED:
+    # the route of the request that blocked the loop (inside the correlation id middleware)
+    app.add_middleware(RouteContextMiddleware)
 # for identifying logs from the same request (correlation id)
 app.add_middleware(CorrelationIdMiddleware)
+# after a write, the same client reads from the primary for a while (only with read replicas)
+app.add_middleware(ReadYourWritesMiddleware, router=read_database)
 
 app.include_router(post_router)
 app.include_router(user_router)
 app.include_router(upload_router)
+app.include_router(export_router)
+app.include_router(events_router)
+app.include_router(metrics_router)
 
 
 @app.exception_handler(HTTPException)
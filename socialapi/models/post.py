@@ -14,15 +14,28 @@ class UserPost(UserPostIn):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PostImageStatus(BaseModel):
+    post_id: int
+    status: str | None  # pending / completed / failed (None if no image was generated)
+    image_url: str | None = None
+
+
 class UserPostWithLikes(UserPost):
     likes: int
+    thumbnail_url: str | None = None  # small WebP variant of image_url (once processed)
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserPostPage(BaseModel):
+    posts: list[UserPostWithLikes]  # newest first
+    next_cursor: int | None  # `before` for the next page (None on the last page)
+
+
 class CommentIn(BaseModel):
     body: str
     post_id: int
+    parent_id: int | None = None  # id of the comment this one replies to
 
 
 class Comment(CommentIn):
@@ -32,6 +45,25 @@ class Comment(CommentIn):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CommentThread(BaseModel):
+    comment: Comment  # top-level comment
+    # first replies of the thread (depth-first, use parent_id to nest them)
+    replies: list[Comment]
+    reply_count: int  # all replies of the thread
+    # `after` for `/comment/{id}/replies` (None if all replies are included)
+    replies_cursor: str | None
+
+
+class CommentThreadPage(BaseModel):
+    threads: list[CommentThread]
+    next_cursor: int | None  # `after` for the next page (None on the last page)
+
+
+class CommentReplyPage(BaseModel):
+    replies: list[Comment]  # depth-first
+    next_cursor: str | None  # `after` for the next page (None on the last page)
+
+
 class UserPostWithComments(BaseModel):
     post: UserPostWithLikes  # specific post를 request 할 때만 사용하므로 변경
     comments: list[Comment]
@@ -42,5 +74,5 @@ class PostLikeIn(BaseModel):
 
 
 class PostLike(PostLikeIn):
-    id: int
+    id: int | None  # None while the like waits in the like buffer
     user_id: int
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+
+MAX_DIRECT_UPLOAD_SIZE = 50 * 1024 * 1024  # 50MB
+
+
+class UploadAuthorizationIn(BaseModel):
+    # NOTE: client hashes the file before uploading -> known content is never uploaded again
+    sha256: str = Field(pattern=r"^[0-9a-f]{64}$")
+    # NOTE: sent to B2 as X-Bz-Content-Sha1 -> B2 rejects an upload w/ other content
+    sha1: str = Field(pattern=r"^[0-9a-f]{40}$")
+    size: int = Field(gt=0, le=MAX_DIRECT_UPLOAD_SIZE)
+    content_type: str
+    filename: str | None = None
+
+
+class UploadAuthorization(BaseModel):
+    exists: bool  # True -> already uploaded, just use file_url
+    file_url: str | None = None
+    # for uploading straight to B2 (POST the file to upload_url with these headers)
+    upload_url: str | None = None
+    headers: dict[str, str] | None = None
+    # for `POST /upload/complete` after the upload has finished
+    upload_token: str | None = None
+
+
+class UploadCompleteIn(BaseModel):
+    upload_token: str
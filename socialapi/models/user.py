@@ -8,3 +8,9 @@ class User(BaseModel):
 
 class UserIn(User):
     password: str
+
+
+class UserProfile(BaseModel):
+    id: int
+    posts: int
+    likes_received: int  # likes of the user's posts
@@ -0,0 +1,92 @@
+import threading
+from functools import cached_property
+
+from sqlalchemy.sql import ClauseElement
+
+"""
+[ compiled query cache ]
+- `databases` compiles every query it is given (SQLAlchemy's own compiled cache is not used)
+  -> building + compiling `select_post_and_likes.where(...)` on every request costs CPU
+- `CachedQuery` compiles a statement shape (with `bindparam()`s for the values) once per dialect,
+  and only fills in the values on each call
+    - the SQL string stays identical between calls
+      -> asyncpg keeps it as a server-side prepared statement (per connection statement cache)
+
+ex.
+    query_post_by_id = CachedQuery(post_table.select().where(post_table.c.id == bindparam("post_id")))
+    await database.fetch_one(query_post_by_id(post_id=1))
+"""
+
+
+class _BoundCompiled:
+    """cached `Compiled` object with the values of a single call (what the `databases` backends read)"""
+
+    def __init__(self, compiled, values: dict) -> None:
+        self._compiled = compiled
+        self.params = compiled.construct_params(values)
+
+    def construct_params(self, *args, **kwargs) -> dict:
+        return self.params
+
+    def __getattr__(self, name: str):
+        # string, positiontup, _bind_processors, _result_columns, ...
+        return getattr(self._compiled, name)
+
+    def __str__(self) -> str:
+        return self._compiled.string
+
+
+class BoundQuery:
+    """
+    a `CachedQuery` with values -> pass it to `database.fetch_*()` / `read_database.fetch_*()`
+        - NOTE: don't pass `values=` to `fetch_*()` as well (they're already bound)
+    """
+
+    def __init__(self, cached: "CachedQuery", values: dict) -> None:
+        self.cached = cached
+        self.values = values
+
+    def compile(self, dialect=None, compile_kwargs=None, **kwargs) -> _BoundCompiled:
+        return _BoundCompiled(
+            self.cached.compiled_for(dialect, compile_kwargs), self.values
+        )
+
+    def __str__(self) -> str:
+        # NOTE: `logger.debug(query)` -> no need to compile again with the default dialect
+        return str(self.cached)
+
+
+class CachedQuery:
+    def __init__(self, statement: ClauseElement) -> None:
+        self.statement = statement
+        self._compiled: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, **values) -> BoundQuery:
+        return BoundQuery(self, values)
+
+    def compiled_for(self, dialect, compile_kwargs: dict | None = None):
+        # NOTE: same dialect class w/ another paramstyle (ex. qmark / pyformat) renders other SQL
+        compile_kwargs = compile_kwargs or {}
+        key = (
+            type(dialect),
+            getattr(dialect, "paramstyle", None),
+            tuple(sorted(compile_kwargs.items())),
+        )
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled.get(key)
+                if compiled is None:
+                    compiled = self.statement.compile(
+                        dialect=dialect, compile_kwargs=compile_kwargs
+                    )
+                    self._compiled[key] = compiled
+        return compiled
+
+    @cached_property
+    def sql(self) -> str:
+        return str(self.statement)
+
+    def __str__(self) -> str:
+        return self.sql
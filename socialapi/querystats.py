@@ -0,0 +1,201 @@
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+import databases
+
+from socialapi.config import config
+from socialapi.metrics import Histogram
+from socialapi.querycache import BoundQuery, CachedQuery
+from socialapi.tracing import span
+
+logger = logging.getLogger(__name__)
+
+"""
+[ query stats ]
+- every statement of `database` / `read_database` (incl. prepared reads of `socialapi.fastread`) is timed
+- per request (`QueryStatsMiddleware`):
+    - query count & total DB time -> `Server-Timing: db;dur=<ms>;desc="<n> queries"` header (browser dev tools)
+      only w/ DB_SERVER_TIMING (dev & test) -> backend timings aren't shown to every client in production
+    - debug log of the request's stats w/ its slowest statement (under its correlation id)
+    - the same statement DB_REPEATED_QUERY_WARNING+ times -> N+1 warning (a loop that should be one query)
+- slow query log: statements over DB_SLOW_QUERY_SECONDS (also outside of requests, ex. flushes / jobs)
+  w/ the SQL & duration as structured fields (`extra` -> own keys of the JSON file logs)
+- tests: `socialapi.tests.helpers.assert_max_queries(n)` locks in the query budget of an endpoint
+- tracing enabled -> one client span per statement (w/ its SQL)
+- NOTE: statements are grouped by the SQLAlchemy cache key (= SQL w/o the values), the SQL text is
+  rendered only for the statements that are logged
+"""
+
+query_duration = Histogram(
+    "socialapi_db_query_duration_seconds", "Duration of database statements"
+)
+
+
+def statement_key(query) -> object:
+    """same key for the same statement w/ other values"""
+    if isinstance(query, str):
+        return query
+    if isinstance(query, BoundQuery):
+        return query.cached.sql
+    if isinstance(query, CachedQuery):
+        return query.sql
+    cache_key = query._generate_cache_key()
+    return cache_key.key if cache_key is not None else id(query)
+
+
+def statement_sql(query) -> str:
+    return " ".join(str(query).split())  # -- one line
+
+
+class QueryStats:
+    """statements of one request (or of an `assert_max_queries` block)"""
+
+    def __init__(self, parent: "QueryStats | None" = None) -> None:
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest: tuple[float, object] | None = None
+        # statement key -> [count, first query]
+        self.statements: dict[object, list] = {}
+
+    def record(self, query, key: object, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if self.slowest is None or seconds > self.slowest[0]:
+            self.slowest = (seconds, query)
+        statement = self.statements.get(key)
+        if statement is None:
+            self.statements[key] = [1, query]
+        else:
+            statement[0] += 1
+        if self.parent is not None:
+            self.parent.record(query, key, seconds)
+
+    def repeated(self, threshold: int) -> list[tuple[int, object]]:
+        return [
+            (count, query)
+            for count, query in self.statements.values()
+            if count >= threshold
+        ]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries"'
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def collect_queries():
+    """count the statements of this block (nested blocks -> also counted by the outer ones)"""
+    stats = QueryStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def query_span(query, system: str):
+    sql = statement_sql(query)
+    return span(
+        sql.split(" ", 1)[0],  # -- SELECT / INSERT / ...
+        "client",
+        {"db.system": system, "db.statement": sql},
+    )
+
+
+@contextmanager
+def timed_query(query, system: str):
+    started = time.perf_counter()
+    try:
+        # NOTE: the SQL is only rendered for the span if tracing is enabled
+        with query_span(query, system) if config.TRACING_ENABLED else nullcontext():
+            yield
+    finally:
+        seconds = time.perf_counter() - started
+        query_duration.observe(seconds)
+        stats = _current.get()
+        if stats is not None:
+            stats.record(query, statement_key(query), seconds)
+        if seconds >= config.DB_SLOW_QUERY_SECONDS:
+            sql = statement_sql(query)
+            logger.warning(
+                f"Slow query ({seconds * 1000:.0f} ms): {sql}",
+                extra={"sql": sql, "duration_ms": round(seconds * 1000, 1)},
+            )
+
+
+class InstrumentedDatabase(databases.Database):
+    """`databases.Database` that times every statement (see `timed_query`)"""
+
+    async def fetch_all(self, query, values: dict | None = None):
+        with timed_query(query, self.url.dialect):
+            return await super().fetch_all(query, values)
+
+    async def fetch_one(self, query, values: dict | None = None):
+        with timed_query(query, self.url.dialect):
+            return await super().fetch_one(query, values)
+
+    async def fetch_val(self, query, values: dict | None = None, column=0):
+        with timed_query(query, self.url.dialect):
+            return await super().fetch_val(query, values, column)
+
+    async def execute(self, query, values: dict | None = None):
+        with timed_query(query, self.url.dialect):
+            return await super().execute(query, values)
+
+    async def execute_many(self, query, values: list):
+        with timed_query(query, self.url.dialect):
+            return await super().execute_many(query, values)
+
+    async def iterate(self, query, values: dict | None = None):
+        # NOTE: the whole iteration (incl. the time the caller spends per row)
+        with timed_query(query, self.url.dialect):
+            async for record in super().iterate(query, values):
+                yield record
+
+
+def log_request_stats(stats: QueryStats) -> None:
+    for count, query in stats.repeated(config.DB_REPEATED_QUERY_WARNING):
+        sql = statement_sql(query)
+        logger.warning(
+            f"Possible N+1: the same query ran {count} times in one request: {sql}",
+            extra={"sql": sql, "query_count": count},
+        )
+    if stats.count and logger.isEnabledFor(logging.DEBUG):
+        seconds, query = stats.slowest
+        logger.debug(
+            f"{stats.count} queries, {stats.seconds * 1000:.1f} ms in the database "
+            f"(slowest {seconds * 1000:.1f} ms: {statement_sql(query)})"
+        )
+
+
+class QueryStatsMiddleware:
+    """
+    pure ASGI middleware -> query stats of each request
+        - NOTE: inside CorrelationIdMiddleware (-> the logs have the request's id)
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with collect_queries() as stats:
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start" and config.DB_SERVER_TIMING:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", stats.server_timing().encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                return await self.app(scope, receive, send_with_timing)
+            finally:
+                log_request_stats(stats)
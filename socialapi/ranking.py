@@ -0,0 +1,56 @@
+import logging
+
+from sqlalchemy import case
+
+from socialapi.config import config
+from socialapi.database import database, post_table
+from socialapi.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+"""
+[ hot ranking ]
+hot_score = sum of the weights of a post's interactions, each halved every HOT_SCORE_HALF_LIFE_HOURS
+    - new post / like / comment -> `hot_score + weight` (single UPDATE, no recount)
+    - periodic job -> every score is multiplied by 0.5 ** (elapsed / half life)
+      (scores that decayed below HOT_SCORE_FLOOR become 0 and are not touched anymore)
+    - `posts.hot_score` is indexed -> the hot feed reads the top of the index, no sorting of all posts
+"""
+
+POST_WEIGHT = 1.0  # new posts start a bit above old, inactive ones
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+HOT_SCORE_FLOOR = 0.01
+HOT_FEED_SIZE = 100  # posts in the hot feed
+
+hot_score_decays = Counter(
+    "socialapi_hot_score_decays_total", "Periodic decays of the hot scores"
+)
+
+
+def decay_factor(elapsed_seconds: float, half_life_seconds: float) -> float:
+    return 0.5 ** (elapsed_seconds / half_life_seconds)
+
+
+def bump_hot_score(post_id: int, weight: float):
+    # NOTE: relative update -> concurrent likes of the same post don't overwrite each other
+    return (
+        post_table.update()
+        .where(post_table.c.id == post_id)
+        .values(hot_score=post_table.c.hot_score + weight)
+    )
+
+
+async def decay_hot_scores(elapsed_seconds: float) -> None:
+    factor = decay_factor(elapsed_seconds, config.HOT_SCORE_HALF_LIFE_HOURS * 3600)
+    decayed = post_table.c.hot_score * factor
+    query = (
+        post_table.update()
+        .where(post_table.c.hot_score > 0)
+        .values(hot_score=case((decayed < HOT_SCORE_FLOOR, 0.0), else_=decayed))
+    )
+    logger.debug(query)
+
+    await database.execute(query)
+    hot_score_decays.inc()
+    logger.info(f"Decayed hot scores by {factor:.4f}")
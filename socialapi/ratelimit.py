@@ -0,0 +1,215 @@
+import logging
+import math
+import time
+from typing import Annotated, Protocol
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+from socialapi.config import config
+from socialapi.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+"""
+[ token bucket ]
+- each key (ex. "login:ip:1.2.3.4") owns a bucket that holds at most `capacity` tokens
+- tokens are refilled continuously at `refill_rate` tokens per second
+- a request consumes one token -> if the bucket is empty, the request is rejected with 429
+- allows short bursts (up to capacity) while limiting the sustained rate
+
+[ why as a dependency ]
+- FastAPI resolves dependencies before running the endpoint body
+  -> rejected requests never reach `get_user()` (DB) or `verify_password()` (bcrypt)
+"""
+
+rate_limit_requests = Counter(
+    "socialapi_rate_limit_requests_total",
+    "Requests checked by the rate limiter",
+    ("scope",),
+)
+rate_limit_rejections = Counter(
+    "socialapi_rate_limit_rejections_total",
+    "Requests rejected by the rate limiter",
+    ("scope", "key_type"),
+)
+
+
+class RateLimitBackend(Protocol):
+    async def consume(
+        self, key: str, capacity: int, refill_rate: float
+    ) -> tuple[bool, float]:
+        """take one token from the bucket -> (allowed, seconds until the next token)"""
+
+    async def reset(self) -> None: ...
+
+
+class InMemoryBackend:
+    """per-process buckets (default) -> each worker has its own limits"""
+
+    # NOTE: prune full buckets once there are this many keys, so that random emails can't grow memory forever
+    MAX_KEYS = 100_000
+
+    def __init__(self, clock=time.monotonic) -> None:
+        self._clock = clock
+        self._buckets: dict[str, tuple[float, float]] = {}  # key -> (tokens, updated)
+
+    async def consume(
+        self, key: str, capacity: int, refill_rate: float
+    ) -> tuple[bool, float]:
+        # NOTE: no `await` inside -> runs atomically on the event loop, no lock needed
+        now = self._clock()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_rate)
+
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            allowed, retry_after = True, 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            allowed, retry_after = False, (1 - tokens) / refill_rate
+
+        if len(self._buckets) > self.MAX_KEYS:
+            self._prune(now, capacity, refill_rate)
+
+        return allowed, retry_after
+
+    def _prune(self, now: float, capacity: int, refill_rate: float) -> None:
+        self._buckets = {
+            key: (tokens, updated)
+            for key, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * refill_rate < capacity
+        }
+
+    async def reset(self) -> None:
+        self._buckets.clear()
+
+
+# NOTE: runs atomically inside the server -> buckets are shared safely between workers/instances
+# server clock (TIME) is used, so that the clocks of API instances don't matter
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * refill_rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / refill_rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / refill_rate * 1000))
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisBackend:
+    """
+    shared buckets in any server that speaks the Redis protocol (Redis, Valkey, KeyDB, ...)
+        - needs the optional `redis` package (`poetry install -E redis`)
+    """
+
+    def __init__(self, url: str, prefix: str = "socialapi:ratelimit:") -> None:
+        # NOTE: import here -> `redis` is only required when this backend is configured
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._prefix = prefix
+
+    async def consume(
+        self, key: str, capacity: int, refill_rate: float
+    ) -> tuple[bool, float]:
+        allowed, retry_after = await self._script(
+            keys=[self._prefix + key], args=[capacity, refill_rate]
+        )
+        return bool(int(allowed)), float(retry_after)
+
+    async def reset(self) -> None:
+        async for key in self._client.scan_iter(match=self._prefix + "*"):
+            await self._client.delete(key)
+
+
+def create_backend() -> RateLimitBackend:
+    if config.RATE_LIMIT_REDIS_URL:
+        logger.debug("Using Redis rate limit backend")
+        return RedisBackend(config.RATE_LIMIT_REDIS_URL)
+    return InMemoryBackend()
+
+
+backend: RateLimitBackend = create_backend()
+
+
+class RateLimiter:
+    def __init__(self, scope: str, capacity: int, per_seconds: float) -> None:
+        """allow `capacity` requests at once, refilled completely over `per_seconds`"""
+        self.scope = scope
+        self.capacity = capacity
+        self.refill_rate = capacity / per_seconds
+
+    async def hit(self, key_type: str, key: str) -> None:
+        allowed, retry_after = await backend.consume(
+            f"{self.scope}:{key_type}:{key}", self.capacity, self.refill_rate
+        )
+        if allowed:
+            return
+
+        logger.warning(
+            f"Rate limit exceeded for {self.scope} by {key_type}",
+            extra={"email": key} if key_type == "email" else {},
+        )
+        rate_limit_rejections.inc(scope=self.scope, key_type=key_type)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    async def check(self, ip: str, email: str | None) -> None:
+        if not config.RATE_LIMIT_ENABLED:
+            return
+
+        rate_limit_requests.inc(scope=self.scope)
+        await self.hit("ip", ip)
+        if email:
+            # NOTE: per-email limit stops slow brute force on one account from many IPs
+            await self.hit("email", email.strip().lower())
+
+
+login_limiter = RateLimiter("login", capacity=10, per_seconds=60)
+register_limiter = RateLimiter("register", capacity=5, per_seconds=60)
+
+
+def client_ip(request: Request) -> str:
+    # NOTE: behind a proxy, run uvicorn with `--proxy-headers` so that request.client is the real client
+    return request.client.host if request.client else "unknown"
+
+
+async def login_rate_limit(
+    request: Request, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+) -> None:
+    # NOTE: same dependency as in `login()` -> FastAPI parses the form only once per request
+    await login_limiter.check(client_ip(request), form_data.username)
+
+
+async def register_rate_limit(request: Request) -> None:
+    # NOTE: request body is cached on the request -> the endpoint doesn't read it again
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None  # -- let the endpoint validation report the error
+    email = body.get("email") if isinstance(body, dict) else None
+
+    await register_limiter.check(
+        client_ip(request), email if isinstance(email, str) else None
+    )
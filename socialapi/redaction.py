@@ -0,0 +1,103 @@
+import logging
+import re
+
+"""
+[ log redaction ]
+personal data & secrets never reach a log handler:
+    emails -> `bo*@example.net` (first characters kept in dev) / JWTs, bearer tokens -> [REDACTED]
+    `password=...`, `api_key: ...`, ... -> the value is [REDACTED]
+- in the message (incl. f-strings & %-args), in `extra` fields (ex. `extra={"email": email}`)
+  and in tracebacks (`exc_info` -> rendered here into `exc_text`, `stack_info`)
+- ONE precompiled pattern (alternation of all the rules) -> a single scan per string
+    - every rule needs "@", ":" / "=", "eyJ" or "bearer" -> strings w/o any of them (most log messages)
+      skip the scan (a few substring checks cost far less than the regex)
+- runs once per record: ONE filter instance shared by all handlers, a record it has redacted is marked & passes as is
+    - NOTE: why not a logger filter? logger filters don't see the records of child loggers
+      (`socialapi.routers.post` -> handlers of `socialapi`), and a log record factory runs before `extra` is set
+    - the message is formatted once here (`record.msg` = the redacted message, no `args`)
+    - redacting twice would change nothing -> the mark only saves time
+"""
+
+REDACTED = "[REDACTED]"
+# NOTE: leading "_" -> not an `extra` field for the JSON formatter
+REDACTED_MARK = "_redacted"
+
+_PATTERN = re.compile(
+    r"""
+      (?P<jwt>\beyJ[\w-]+\.[\w-]+\.[\w-]*)                      # JSON web tokens (access, confirmation, ...)
+    | \bbearer\s+(?P<bearer>[\w.~+/-]+=*)                       # Authorization header values
+    | (?P<key>\b(?:password|passwd|pwd|secret|api[_-]?key|(?:access_|refresh_|upload_)?token)
+        ["']?\s*[:=]\s*["']?)(?P<secret>[^\s"',;&}]+)           # password=..., "api_key": "..."
+    | (?<![\w.+-])(?P<local>[\w.+-]+)@(?P<domain>[\w-]+(?:\.[\w-]+)+)  # emails
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+# NOTE: extra fields w/ these names are redacted entirely (whatever their value looks like)
+_SECRET_FIELD = re.compile(r"pass|secret|token|api_?key|authorization", re.IGNORECASE)
+
+# NOTE: renders tracebacks like the handlers' formatters (which reuse `exc_text` once it is set)
+_formatter = logging.Formatter()
+
+# attributes of every record -> the others came from `extra`
+_RECORD_ATTRIBUTES = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__)
+
+
+class Redactor:
+    def __init__(self, email_visible_chars: int = 0) -> None:
+        self.email_visible_chars = email_visible_chars
+
+    def _replace(self, match: re.Match) -> str:
+        kind = match.lastgroup
+        if kind == "domain":
+            local = match["local"]
+            visible = local[: self.email_visible_chars]
+            return f"{visible}{'*' * (len(local) - len(visible))}@{match['domain']}"
+        if kind == "secret":
+            return match["key"] + REDACTED
+        if kind == "bearer":
+            return match[0][: match.start("bearer") - match.start()] + REDACTED
+        return REDACTED  # -- jwt
+
+    def redact(self, text: str) -> str:
+        if (
+            "@" in text
+            or "=" in text
+            or ":" in text
+            or "eyJ" in text
+            or "earer" in text  # -- Bearer / bearer
+        ):
+            return _PATTERN.sub(self._replace, text)
+        return text
+
+    def redact_record(self, record: logging.LogRecord) -> None:
+        try:
+            message = record.getMessage()
+        except (TypeError, ValueError):
+            return  # -- wrong args -> the handler reports the logging error
+        record.msg, record.args = self.redact(message), None
+        if record.exc_info:
+            # ex. an httpx error w/ the request URL (email / API key) in its message
+            record.exc_text = self.redact(_formatter.formatException(record.exc_info))
+        if record.stack_info:
+            record.stack_info = self.redact(record.stack_info)
+        if len(record.__dict__) == len(_RECORD_ATTRIBUTES):
+            return  # -- no `extra`
+        for name in record.__dict__.keys() - _RECORD_ATTRIBUTES:
+            value = record.__dict__[name]
+            if _SECRET_FIELD.search(name):
+                setattr(record, name, REDACTED)
+            elif isinstance(value, str):
+                setattr(record, name, self.redact(value))
+
+
+class RedactionFilter(logging.Filter):
+    def __init__(self, name: str = "", email_visible_chars: int = 0) -> None:
+        super().__init__(name)
+        self.redactor = Redactor(email_visible_chars)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # NOTE: marked on the record -> holds w/ records of several threads interleaved
+        if REDACTED_MARK not in record.__dict__:
+            self.redactor.redact_record(record)
+            record.__dict__[REDACTED_MARK] = True
+        return True
@@ -0,0 +1,228 @@
+import asyncio
+import contextvars
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from databases import Database
+from starlette.requests import Request
+
+from socialapi.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+"""
+[ read replica routing ]
+- writes always go to the primary (`database`)
+- read-only queries of GET endpoints go through `read_database`:
+    - round robin over the healthy replicas (primary if there are none)
+    - a replica that fails with a connection error is skipped for `cooldown` seconds
+      (and the query is retried on the primary)
+- read-your-writes: after a client writes, its reads go to the primary for a short window,
+  so that it doesn't see stale data because of replication lag
+    - per client IP in this process + a cookie, so that it also works across workers
+    - GET endpoints that write (ex. email confirmation links) -> `Depends(mark_write)`
+"""
+
+STICKY_COOKIE = "rw_primary"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+WRITE_SCOPE_KEY = "socialapi.write"  # -- set by `mark_write`
+
+# NOTE: connection-level errors only -> a broken query would fail on the primary as well
+#   (not sqlite3.OperationalError: also raised for "no such table", syntax errors, ...)
+REPLICA_ERRORS: tuple[type[BaseException], ...] = (OSError, asyncio.TimeoutError)
+try:
+    import asyncpg
+
+    REPLICA_ERRORS += (
+        asyncpg.PostgresConnectionError,
+        asyncpg.InterfaceError,
+        asyncpg.CannotConnectNowError,
+    )
+except ImportError:
+    pass
+
+replica_queries = Counter(
+    "socialapi_db_read_queries_total",
+    "Read-only queries by the database that served them",
+    ("target",),  # primary / replica
+)
+replica_failures = Counter(
+    "socialapi_db_replica_failures_total", "Replica queries that failed over"
+)
+
+# set per request by `ReadYourWritesMiddleware`
+_read_from_primary: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "read_from_primary", default=False
+)
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        primary: Database,
+        replicas: list[Database],
+        cooldown: float = 30.0,
+        sticky_seconds: float = 5.0,
+        clock=time.monotonic,
+    ) -> None:
+        self.primary = primary
+        self.replicas = replicas
+        self.cooldown = cooldown
+        self.sticky_seconds = sticky_seconds
+        self._clock = clock
+        self._round_robin = itertools.cycle(range(len(replicas))) if replicas else None
+        self._unhealthy_until: dict[int, float] = {}
+        self._recent_writers: dict[str, float] = {}
+
+    # ----- lifecycle (the primary is connected separately) ----- #
+    async def connect(self) -> None:
+        for index, replica in enumerate(self.replicas):
+            try:
+                await replica.connect()
+            except REPLICA_ERRORS:
+                logger.exception(f"Connecting to read replica {index} failed")
+                self._mark_unhealthy(index)
+
+    async def disconnect(self) -> None:
+        for replica in self.replicas:
+            if replica.is_connected:
+                await replica.disconnect()
+
+    # ----- read-your-writes ----- #
+    def record_write(self, client: str) -> None:
+        now = self._clock()
+        self._recent_writers[client] = now + self.sticky_seconds
+        # NOTE: drop expired entries once in a while -> bounded memory
+        if len(self._recent_writers) > 10_000:
+            self._recent_writers = {
+                key: until for key, until in self._recent_writers.items() if until > now
+            }
+
+    def is_sticky(self, client: str) -> bool:
+        until = self._recent_writers.get(client)
+        return until is not None and until > self._clock()
+
+    # ----- routing ----- #
+    def _mark_unhealthy(self, index: int) -> None:
+        logger.warning(f"Read replica {index} is unhealthy, skipping it")
+        self._unhealthy_until[index] = self._clock() + self.cooldown
+
+    def _next_replica(self) -> int | None:
+        now = self._clock()
+        for _ in range(len(self.replicas)):
+            index = next(self._round_robin)
+            if self._unhealthy_until.get(index, 0) <= now:
+                return index
+        return None
+
+    def _choose(self) -> int | None:
+        if not self.replicas or _read_from_primary.get():
+            return None
+        return self._next_replica()
+
+    async def run(self, read: Callable[[Database], Awaitable[T]]) -> T:
+        """run a read-only `read(database)` on a replica (or the primary), w/ failover"""
+        index = self._choose()
+        if index is not None:
+            try:
+                result = await read(self.replicas[index])
+            except REPLICA_ERRORS:
+                replica_failures.inc()
+                self._mark_unhealthy(index)
+            else:
+                replica_queries.inc(target="replica")
+                return result
+
+        replica_queries.inc(target="primary")
+        return await read(self.primary)
+
+    async def _read(self, method: str, query, values: dict | None):
+        return await self.run(lambda database: getattr(database, method)(query, values))
+
+    async def fetch_all(self, query, values: dict | None = None):
+        return await self._read("fetch_all", query, values)
+
+    async def fetch_one(self, query, values: dict | None = None):
+        return await self._read("fetch_one", query, values)
+
+    async def fetch_val(self, query, values: dict | None = None):
+        return await self._read("fetch_val", query, values)
+
+    async def iterate(self, query, values: dict | None = None):
+        """
+        stream rows with a server-side cursor (`Database.iterate`)
+            - NOTE: no failover once rows have been streamed -> a replica error ends the stream
+        """
+        index = self._choose()
+        target = self.primary if index is None else self.replicas[index]
+        replica_queries.inc(target="primary" if index is None else "replica")
+        async for record in target.iterate(query, values):
+            yield record
+
+
+def _client_key(scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _has_sticky_cookie(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"cookie" and f"{STICKY_COOKIE}=".encode() in value:
+            return True
+    return False
+
+
+async def mark_write(request: Request) -> None:
+    """dependency of a GET endpoint that writes -> its client reads from the primary afterwards, like after a POST"""
+    request.scope[WRITE_SCOPE_KEY] = True
+    _read_from_primary.set(True)
+
+
+class ReadYourWritesMiddleware:
+    """
+    pure ASGI middleware (no BaseHTTPMiddleware overhead)
+        - unsafe methods (POST, ...) & `mark_write` endpoints -> the client reads from the primary for a while
+        - sets the context variable that `ReplicaRouter` checks for each query
+    """
+
+    def __init__(self, app, router: ReplicaRouter) -> None:
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.router.replicas:
+            return await self.app(scope, receive, send)
+
+        client = _client_key(scope)
+        is_write = scope["method"] not in SAFE_METHODS
+        if is_write:
+            self.router.record_write(client)
+
+        token = _read_from_primary.set(
+            is_write or self.router.is_sticky(client) or _has_sticky_cookie(scope)
+        )
+        cookie = (
+            f"{STICKY_COOKIE}=1; Max-Age={int(self.router.sticky_seconds) or 1}; "
+            "Path=/; HttpOnly; SameSite=Lax"
+        )
+
+        async def send_with_cookie(message):
+            # NOTE: a GET endpoint may have marked itself as a write by now (`mark_write`)
+            if message["type"] == "http.response.start" and (
+                is_write or scope.get(WRITE_SCOPE_KEY)
+            ):
+                if not is_write:
+                    self.router.record_write(client)
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", cookie.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            return await self.app(scope, receive, send_with_cookie)
+        finally:
+            _read_from_primary.reset(token)
@@ -0,0 +1,36 @@
+from typing import Any, Iterable
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from socialapi.config import config
+
+"""
+[ trusted output ]
+- with `response_model`, FastAPI validates every returned row with Pydantic, and then serializes it again
+  -> for big listings that is most of the request's CPU
+- rows that come straight from our own tables already have the right types
+    -> only pick the fields of the response model (never leak other columns, ex. `users.password`)
+    -> serialize with orjson, FastAPI skips the validation for a returned `Response`
+- `response_model` stays on the route -> the OpenAPI schema doesn't change
+- TRUSTED_RESPONSES=false -> the dicts are returned to FastAPI and validated as usual (ex. to debug)
+"""
+
+
+def row_as(model: type[BaseModel], row) -> dict | None:
+    """`row` (a dict or `databases` Record) -> dict with the fields of `model` only"""
+    if row is None:
+        return None
+    return {name: row[name] for name in model.model_fields}
+
+
+def rows_as(model: type[BaseModel], rows: Iterable) -> list[dict]:
+    fields = tuple(model.model_fields)
+    return [{name: row[name] for name in fields} for row in rows]
+
+
+def trusted_response(content: Any) -> Any:
+    # NOTE: content must already have the shape of the response model (see `rows_as`)
+    if not config.TRUSTED_RESPONSES:
+        return content
+    return ORJSONResponse(content)
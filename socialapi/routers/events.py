@@ -0,0 +1,55 @@
+import logging
+from typing import AsyncIterator
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from socialapi.config import config
+from socialapi.events import event_broker
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+"""
+[ event stream ]
+GET /events -> server-sent events (`text/event-stream`) of new posts, comments & likes (see socialapi.events)
+- replaces polling `GET /post` / `GET /post/{id}`: refetch only when an event says something changed
+- ex. (browser) new EventSource("/events").addEventListener("post_created", ...)
+- public (events carry ids only), but at most EVENTS_MAX_SUBSCRIBERS streams per worker
+    - NOTE: no auth -> EventSource can't send an Authorization header
+"""
+
+SSE_MEDIA_TYPE = "text/event-stream"
+RETRY_MILLISECONDS = 3000  # EventSource reconnects after this (ex. after being dropped)
+
+
+async def event_stream(heartbeat: float) -> AsyncIterator[bytes]:
+    # NOTE: subscribe when the stream starts -> the `finally` always unsubscribes
+    subscriber = event_broker.subscribe()
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n".encode()
+        async for frame in subscriber.frames(heartbeat):
+            yield frame
+    finally:
+        event_broker.unsubscribe(subscriber)
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def stream_events():
+    # NOTE: checked before the stream subscribes -> may go over by the streams starting right now
+    if event_broker.full:
+        logger.warning("Too many event stream clients, rejecting one")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event stream clients",
+            headers={"Retry-After": str(RETRY_MILLISECONDS // 1000)},
+        )
+
+    logger.info("Client subscribed to events")
+    return StreamingResponse(
+        event_stream(config.EVENTS_HEARTBEAT_SECONDS),
+        media_type=SSE_MEDIA_TYPE,
+        # NOTE: no caching / proxy buffering -> events reach the client right away
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from typing import Annotated, AsyncIterator
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Table, bindparam
+
+from socialapi.config import config
+from socialapi.database import comment_table, like_table, post_table, read_database
+from socialapi.models.user import User
+from socialapi.querycache import CachedQuery
+from socialapi.security import get_current_user
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+"""
+[ bulk export ]
+GET /export/{posts,comments,likes}.ndjson?since_id=...
+- one JSON object per line (NDJSON), ordered by id
+- rows are read in keyset batches (`id > last id ORDER BY id LIMIT ROWS_PER_CHUNK`) & written while they are read
+  -> memory stays bounded, however big the table is (unlike `GET /post` w/ `fetch_all`)
+  -> the connection goes back to the pool between batches -> a slow client doesn't hold one
+- at most EXPORT_MAX_CONCURRENT exports per worker, more get 503 (& retry later)
+- incremental pulls: pass the id of the last line you received as `since_id`
+"""
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# rows read & written per batch (fewer, bigger writes than one per row)
+ROWS_PER_CHUNK = 500
+RETRY_AFTER_SECONDS = 5
+
+
+def query_rows_since(table: Table) -> CachedQuery:
+    return CachedQuery(
+        table.select()
+        .where(table.c.id > bindparam("since_id"))
+        .order_by(table.c.id)
+        .limit(bindparam("limit"))
+    )
+
+
+export_queries = {
+    "posts": query_rows_since(post_table),
+    "comments": query_rows_since(comment_table),
+    "likes": query_rows_since(like_table),
+}
+
+
+export_slots = asyncio.Semaphore(config.EXPORT_MAX_CONCURRENT)
+
+
+async def stream_ndjson(name: str, since_id: int) -> AsyncIterator[bytes]:
+    query = export_queries[name]
+    # NOTE: plain `str` keys -> orjson doesn't accept SQLAlchemy's `quoted_name`
+    columns = tuple(map(str, query.statement.selected_columns.keys()))
+    logger.debug(query)
+
+    # NOTE: taken when the stream starts -> always given back, even if the client disconnects
+    async with export_slots:
+        exported, last_id = 0, since_id
+        while True:
+            rows = await read_database.fetch_all(
+                query(since_id=last_id, limit=ROWS_PER_CHUNK)
+            )
+            if not rows:
+                break
+            exported += len(rows)
+            last_id = rows[-1]["id"]
+            yield b"".join(
+                orjson.dumps({column: row[column] for column in columns}) + b"\n"
+                for row in rows
+            )
+            if len(rows) < ROWS_PER_CHUNK:
+                break
+
+    logger.info(f"Exported {exported} {name} since id {since_id}")
+
+
+def ndjson_response(name: str, since_id: int) -> StreamingResponse:
+    # NOTE: checked before the stream starts -> streams starting right now may still wait for a slot
+    if export_slots.locked():
+        logger.warning("Too many concurrent exports, rejecting one")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent exports",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+    return StreamingResponse(
+        stream_ndjson(name, since_id), media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+@router.get("/export/posts.ndjson", response_class=StreamingResponse)
+async def export_posts(
+    current_user: Annotated[User, Depends(get_current_user)], since_id: int = 0
+):
+    logger.info("Exporting posts", extra={"email": current_user.email})
+    return ndjson_response("posts", since_id)
+
+
+@router.get("/export/comments.ndjson", response_class=StreamingResponse)
+async def export_comments(
+    current_user: Annotated[User, Depends(get_current_user)], since_id: int = 0
+):
+    logger.info("Exporting comments", extra={"email": current_user.email})
+    return ndjson_response("comments", since_id)
+
+
+@router.get("/export/likes.ndjson", response_class=StreamingResponse)
+async def export_likes(
+    current_user: Annotated[User, Depends(get_current_user)], since_id: int = 0
+):
+    logger.info("Exporting likes", extra={"email": current_user.email})
+    return ndjson_response("likes", since_id)
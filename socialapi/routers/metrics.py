@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from socialapi.metrics import render_latest
+
+router = APIRouter()
+
+
+# NOTE: Prometheus text format -> can be scraped directly by Prometheus (or read with curl)
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    return render_latest()
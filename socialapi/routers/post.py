@@ -1,24 +1,61 @@
 import logging
+from collections import defaultdict
 from enum import Enum
 from typing import Annotated
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
-from sqlalchemy import desc, func, select
-
-from socialapi.database import comment_table, database, like_table, post_table
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from sqlalchemy import bindparam, desc, func, select
+
+from socialapi import fastread
+from socialapi.config import config
+from socialapi.database import (
+    comment_path,
+    comment_table,
+    database,
+    like_table,
+    post_image_table,
+    post_table,
+    read_database,
+)
+from socialapi.events import event_broker
+from socialapi.imagegen import ImageStatus
+from socialapi.likebuffer import like_buffer
 from socialapi.models.post import (
     Comment,
     CommentIn,
+    CommentReplyPage,
+    CommentThreadPage,
+    PostImageStatus,
     PostLike,
     PostLikeIn,
     UserPost,
     UserPostIn,
+    UserPostPage,
     UserPostWithComments,
     UserPostWithLikes,
 )
 from socialapi.models.user import User
+from socialapi.querycache import CachedQuery
+from socialapi.ranking import (
+    COMMENT_WEIGHT,
+    HOT_FEED_SIZE,
+    LIKE_WEIGHT,
+    POST_WEIGHT,
+    bump_hot_score,
+)
+from socialapi.responses import row_as, rows_as, trusted_response
 from socialapi.security import get_current_user
 from socialapi.tasks import generate_and_add_to_post
+from socialapi.userstats import bump_user_stats
 
 # NOTE: model = to validate data (that client sends us)
 
@@ -43,17 +80,87 @@ post_table.select().where(...) (= shortcut)
 == select(post_table).select_from(post_table).where(...) (= repetitive)
 """
 
+# NOTE: scalar subquery (not a join) -> doesn't multiply likes & doesn't need to be grouped
+select_thumbnail_url = (
+    select(post_image_table.c.url)
+    .where(
+        post_image_table.c.source_url == post_table.c.image_url,
+        post_image_table.c.variant == "thumbnail",
+        post_image_table.c.format == "webp",
+    )
+    .scalar_subquery()
+    .label("thumbnail_url")
+)
+
 select_post_and_likes = (
-    select(post_table, func.count(like_table.c.id).label("likes"))
+    select(post_table, func.count(like_table.c.id).label("likes"), select_thumbnail_url)
     .select_from(post_table.outerjoin(like_table))
     .group_by(post_table.c.id)
 )
 
+# NOTE: statement shapes of the read queries -> compiled once, only the values change per request
+query_post_by_id = CachedQuery(
+    post_table.select().where(post_table.c.id == bindparam("post_id"))
+)
+query_post_and_likes_by_id = CachedQuery(
+    select_post_and_likes.where(post_table.c.id == bindparam("post_id"))
+)
+query_comments_on_post = CachedQuery(
+    comment_table.select().where(comment_table.c.post_id == bindparam("post_id"))
+)
+query_comment_by_id = CachedQuery(
+    comment_table.select().where(comment_table.c.id == bindparam("comment_id"))
+)
+query_top_level_comments = CachedQuery(
+    comment_table.select()
+    .where(
+        comment_table.c.post_id == bindparam("post_id"),
+        comment_table.c.parent_id.is_(None),
+        comment_table.c.id > bindparam("after"),
+    )
+    .order_by(comment_table.c.id)
+    .limit(bindparam("limit"))
+)
+# NOTE: subtree of a comment = replies in its thread whose path starts w/ the comment's path
+query_thread_replies = CachedQuery(
+    comment_table.select()
+    .where(
+        comment_table.c.root_id == bindparam("root_id"),
+        comment_table.c.path.like(bindparam("prefix")),
+        comment_table.c.path > bindparam("after"),
+    )
+    .order_by(comment_table.c.path)
+    .limit(bindparam("limit"))
+)
+# largest INTEGER id -> a larger `before` can't be bound (asyncpg)
+MAX_POST_ID = 2**31 - 1
+
+# NOTE: keyset pagination -> each page continues the (user_id, id) index scan where the last one ended
+# (no OFFSET, which would read & skip all posts of the previous pages)
+query_user_posts_first = CachedQuery(
+    select_post_and_likes.where(post_table.c.user_id == bindparam("user_id"))
+    .order_by(post_table.c.id.desc())
+    .limit(bindparam("limit"))
+)
+query_user_posts = CachedQuery(
+    select_post_and_likes.where(
+        post_table.c.user_id == bindparam("user_id"),
+        post_table.c.id < bindparam("before"),
+    )
+    .order_by(post_table.c.id.desc())
+    .limit(bindparam("limit"))
+)
+query_post_image_status = CachedQuery(
+    select(post_table.c.id, post_table.c.image_url, post_table.c.image_status).where(
+        post_table.c.id == bindparam("post_id")
+    )
+)
+
 
 async def find_post(post_id: int):
     logger.info(f"Finding post with id {post_id}")
 
-    query = post_table.select().where(post_table.c.id == post_id)
+    query = query_post_by_id(post_id=post_id)
 
     logger.debug(query)
 
@@ -74,11 +181,17 @@ async def create_post(
     logger.info("Creating post")
 
     data = {**post.model_dump(), "user_id": current_user.id}
-    query = post_table.insert().values(data)
+    # NOTE: clients can poll `/post/{id}/image-status` while the image is generated
+    status_value = {"image_status": ImageStatus.pending.value} if prompt else {}
+    query = post_table.insert().values(
+        {**data, **status_value, "hot_score": POST_WEIGHT}
+    )
 
     logger.debug(query)
 
-    last_record_id = await database.execute(query)  # returns generated id
+    async with database.transaction():
+        last_record_id = await database.execute(query)  # returns generated id
+        await database.execute(bump_user_stats(current_user.id, posts=1))
 
     # image generation & add to post w/ background task
     if prompt:
@@ -91,6 +204,10 @@ async def create_post(
             prompt,
         )
 
+    await event_broker.publish(
+        "post_created", {"post_id": last_record_id, "user_id": current_user.id}
+    )
+
     # NOTE: it's okay to return dict, because Pydantic knows how to deal with it
     return {**data, "id": last_record_id}
 
@@ -105,6 +222,29 @@ class PostSorting(str, Enum):
     new = "new"  # PostSorting.new
     old = "old"
     most_likes = "most_likes"
+    # trending: time-decayed likes & comments (top HOT_FEED_SIZE posts only)
+    hot = "hot"
+
+
+query_all_posts = {
+    # if you have an actual column object, can call the desc() method on it
+    PostSorting.new: CachedQuery(
+        select_post_and_likes.order_by(post_table.c.id.desc())
+    ),
+    PostSorting.old: CachedQuery(select_post_and_likes.order_by(post_table.c.id.asc())),
+    # if you don't have an actual column object but know the column name, do it like this
+    PostSorting.most_likes: CachedQuery(select_post_and_likes.order_by(desc("likes"))),
+    # NOTE: top posts are picked from the hot_score index first -> only those are joined w/ likes
+    PostSorting.hot: CachedQuery(
+        select_post_and_likes.where(
+            post_table.c.id.in_(
+                select(post_table.c.id)
+                .order_by(post_table.c.hot_score.desc(), post_table.c.id.desc())
+                .limit(HOT_FEED_SIZE)
+            )
+        ).order_by(post_table.c.hot_score.desc(), post_table.c.id.desc())
+    ),
+}
 
 
 @router.get("/post", response_model=list[UserPostWithLikes])
@@ -117,19 +257,14 @@ async def get_all_posts(sorting: PostSorting = PostSorting.new):
 
     logger.info("Getting all posts")
 
-    match sorting:
-        case PostSorting.new:
-            # if you have an actual column object, can call the desc() method on it
-            query = select_post_and_likes.order_by(post_table.c.id.desc())
-        case PostSorting.old:
-            query = select_post_and_likes.order_by(post_table.c.id.asc())
-        case PostSorting.most_likes:
-            # if you don't have an actual column object but know the column name, do it like this
-            query = select_post_and_likes.order_by(desc("likes"))
+    query = query_all_posts[sorting]
 
     logger.debug(query)
 
-    return await database.fetch_all(query)
+    # NOTE: hot read -> raw asyncpg on PostgreSQL (see socialapi.fastread)
+    posts = await fastread.fetch_all(read_database, query)
+    # NOTE: rows of our own tables -> serialized w/o validating them again (see socialapi.responses)
+    return trusted_response(rows_as(UserPostWithLikes, posts))
 
 
 @router.post("/comment", response_model=Comment, status_code=status.HTTP_201_CREATED)
@@ -146,24 +281,203 @@ async def create_comment(
             status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
         )
 
+    parent = None
+    if comment.parent_id is not None:
+        parent = await find_comment(comment.parent_id)
+        if not parent or parent.post_id != comment.post_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Parent comment not found",
+            )
+
     data = {**comment.model_dump(), "user_id": current_user.id}
-    query = comment_table.insert().values(data)
+    # NOTE: replies belong to the thread of the top-level comment
+    root_id = (parent.root_id or parent.id) if parent else None
+    query = comment_table.insert().values({**data, "root_id": root_id})
     logger.debug(query)
 
-    last_record_id = await database.execute(query)
+    # NOTE: the path ends w/ the comment's own id -> known only after the insert
+    async with database.transaction():
+        last_record_id = await database.execute(query)
+        parent_path = (parent.path or comment_path(parent.id)) if parent else None
+        await database.execute(
+            comment_table.update()
+            .where(comment_table.c.id == last_record_id)
+            .values(path=comment_path(last_record_id, parent_path))
+        )
+        await database.execute(bump_hot_score(comment.post_id, COMMENT_WEIGHT))
+
+    # NOTE: after the commit -> clients that refetch on the event see the comment
+    await event_broker.publish(
+        "comment_created",
+        {
+            "comment_id": last_record_id,
+            "post_id": comment.post_id,
+            "user_id": current_user.id,
+        },
+    )
     return {**data, "id": last_record_id}
 
 
-@router.get("/post/{post_id}/comment", response_model=list[Comment])
-async def get_comments_on_post(post_id: int):
-    logger.info("Getting comments on post")
+async def find_comment(comment_id: int):
+    logger.info(f"Finding comment with id {comment_id}")
+
+    query = query_comment_by_id(comment_id=comment_id)
+
+    logger.debug(query)
+
+    return await database.fetch_one(query)
+
+
+def select_first_replies(root_ids: list[int], count: int):
+    """first `count` replies (depth-first) of every thread + the number of replies of each thread"""
+    # NOTE: IN (...) has a variable number of values -> built per request (not a CachedQuery)
+    ranked = (
+        select(
+            comment_table,
+            func.row_number()
+            .over(partition_by=comment_table.c.root_id, order_by=comment_table.c.path)
+            .label("position"),
+            func.count()
+            .over(partition_by=comment_table.c.root_id)
+            .label("reply_count"),
+        )
+        .where(comment_table.c.root_id.in_(root_ids))
+        .subquery()
+    )
+    return (
+        select(ranked)
+        .where(ranked.c.position <= count)
+        .order_by(ranked.c.root_id, ranked.c.path)
+    )
+
+
+@router.get("/user/{user_id}/posts", response_model=UserPostPage)
+async def get_user_posts(
+    user_id: int,
+    before: Annotated[int | None, Query(ge=1, le=MAX_POST_ID)] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+):
+    """a page of the user's posts w/ their likes, newest first (next page: `before=next_cursor`)"""
+    logger.info("Getting posts of user")
+
+    # NOTE: `before` only from the 2nd page on -> no sentinel id (ex. out of the INTEGER range)
+    values = {"user_id": user_id, "limit": limit + 1}
+    if before is None:
+        query = query_user_posts_first
+    else:
+        query, values["before"] = query_user_posts, before
+    logger.debug(query)
+    # NOTE: one more than the page -> tells if there is a next page
+    posts = await fastread.fetch_all(read_database, query, **values)
+    next_cursor = posts[limit - 1]["id"] if len(posts) > limit else None
+
+    return trusted_response(
+        {"posts": rows_as(UserPostWithLikes, posts[:limit]), "next_cursor": next_cursor}
+    )
+
+
+@router.get("/post/{post_id}/threads", response_model=CommentThreadPage)
+async def get_comment_threads(
+    post_id: int,
+    after: int = 0,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    replies: Annotated[int, Query(ge=0, le=20)] = 3,
+):
+    """
+    a page of top-level comments, each w/ its first replies
+        - always two queries, however many threads are on the page
+        - next page: `after=next_cursor`, rest of a thread: `/comment/{id}/replies?after=replies_cursor`
+    """
+    logger.info("Getting comment threads of post")
+
+    # (1) top-level comments (one more than the page -> tells if there is a next page)
+    query = query_top_level_comments
+    logger.debug(query)
+    comments = await fastread.fetch_all(
+        read_database, query, post_id=post_id, after=after, limit=limit + 1
+    )
+    next_cursor = comments[limit - 1]["id"] if len(comments) > limit else None
+    comments = comments[:limit]
+
+    # (2) first replies of all those threads at once
+    replies_by_root = defaultdict(list)
+    reply_counts = {}
+    if comments:
+        # NOTE: at least one row per thread -> reply_count of each thread, even w/ replies=0
+        query = select_first_replies([row["id"] for row in comments], max(replies, 1))
+        logger.debug(query)
+        for row in await read_database.fetch_all(query):
+            reply_counts[row["root_id"]] = row["reply_count"]
+            if row["position"] <= replies:
+                replies_by_root[row["root_id"]].append(row)
+
+    threads = []
+    for comment in comments:
+        thread_replies = replies_by_root[comment["id"]]
+        reply_count = reply_counts.get(comment["id"], 0)
+        replies_cursor = None
+        if reply_count > len(thread_replies):
+            replies_cursor = thread_replies[-1]["path"] if thread_replies else ""
+        threads.append(
+            {
+                "comment": row_as(Comment, comment),
+                "replies": rows_as(Comment, thread_replies),
+                "reply_count": reply_count,
+                "replies_cursor": replies_cursor,
+            }
+        )
+
+    return trusted_response({"threads": threads, "next_cursor": next_cursor})
+
+
+@router.get("/comment/{comment_id}/replies", response_model=CommentReplyPage)
+async def get_comment_replies(
+    comment_id: int,
+    after: str = "",
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+):
+    """replies to a comment (its whole subtree, depth-first), paginated w/ `after=next_cursor`"""
+    logger.info("Getting replies to comment")
 
+    comment = await find_comment(comment_id)
+    if not comment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found"
+        )
+
+    query = query_thread_replies
+    logger.debug(query)
+    replies = await fastread.fetch_all(
+        read_database,
+        query,
+        root_id=comment.root_id or comment.id,
+        prefix=f"{comment.path or comment_path(comment.id)}.%",
+        after=after,
+        limit=limit + 1,
+    )
+    next_cursor = replies[limit - 1]["path"] if len(replies) > limit else None
+
+    return trusted_response(
+        {"replies": rows_as(Comment, replies[:limit]), "next_cursor": next_cursor}
+    )
+
+
+async def find_comments(post_id: int) -> list[dict]:
     # NOTE: filtering by key(primary / foreign) is much faster in SQLAlchemy
-    query = comment_table.select().where(comment_table.c.post_id == post_id)
+    query = query_comments_on_post
 
     logger.debug(query)
 
-    return await database.fetch_all(query)
+    comments = await fastread.fetch_all(read_database, query, post_id=post_id)
+    return rows_as(Comment, comments)
+
+
+@router.get("/post/{post_id}/comment", response_model=list[Comment])
+async def get_comments_on_post(post_id: int):
+    logger.info("Getting comments on post")
+
+    return trusted_response(await find_comments(post_id))
 
 
 @router.get("/post/{post_id}", response_model=UserPostWithComments)
@@ -171,25 +485,50 @@ async def get_post_with_comments(post_id: int):
     logger.info("Getting post and its comments")
 
     # modify -> to have "likes" column
-    query = select_post_and_likes.where(post_table.c.id == post_id)
+    query = query_post_and_likes_by_id
 
     logger.debug(query)
 
-    post = await database.fetch_one(query)
+    post = await fastread.fetch_one(read_database, query, post_id=post_id)
+    if not post:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
+        )
+
+    return trusted_response(
+        {
+            "post": row_as(UserPostWithLikes, post),
+            "comments": await find_comments(post_id),
+        }
+    )
+
+
+@router.get("/post/{post_id}/image-status", response_model=PostImageStatus)
+async def get_post_image_status(post_id: int):
+    logger.info("Getting image generation status of post")
+
+    query = query_post_image_status(post_id=post_id)
+
+    logger.debug(query)
+
+    post = await read_database.fetch_one(query)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
         )
 
     return {
-        "post": post,
-        "comments": await get_comments_on_post(post_id),
+        "post_id": post.id,
+        "status": post.image_status,
+        "image_url": post.image_url,
     }
 
 
 @router.post("/like", response_model=PostLike, status_code=status.HTTP_201_CREATED)
 async def like_post(
-    like: PostLikeIn, current_user: Annotated[User, Depends(get_current_user)]
+    like: PostLikeIn,
+    response: Response,
+    current_user: Annotated[User, Depends(get_current_user)],
 ):
     logger.info("Liking post")
 
@@ -200,8 +539,22 @@ async def like_post(
         )
 
     data = {**like.model_dump(), "user_id": current_user.id}
+
+    # NOTE: write-behind -> written (& its event published) by the next flush (see socialapi.likebuffer)
+    if config.LIKE_BUFFER_ENABLED:
+        like_buffer.add(current_user.id, like.post_id)
+        if like_buffer.full:
+            await like_buffer.flush()  # backpressure instead of unbounded memory
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {**data, "id": None}
+
     query = like_table.insert().values(data)
     logger.debug(query)
 
-    last_record_id = await database.execute(query)
+    async with database.transaction():
+        last_record_id = await database.execute(query)
+        await database.execute(bump_hot_score(like.post_id, LIKE_WEIGHT))
+        await database.execute(bump_user_stats(post.user_id, likes_received=1))
+
+    await event_broker.publish("post_liked", data)
     return {**data, "id": last_record_id}
@@ -1,10 +1,41 @@
+import hashlib
 import logging
+import pathlib
 import tempfile
+from typing import Annotated
+from urllib.parse import quote
 
 import aiofiles
-from fastapi import APIRouter, HTTPException, UploadFile, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    UploadFile,
+    status,
+)
 
-from socialapi.libs.b2 import b2_upload_file
+from socialapi import tasks
+from socialapi.database import database, insert_or_ignore, upload_table
+from socialapi.libs.b2 import (
+    IMMUTABLE_CACHE_CONTROL,
+    b2_client,
+    b2_get_file_info,
+    b2_get_upload_authorization,
+    b2_hash_file,
+    b2_upload_file,
+)
+from socialapi.models.upload import (
+    UploadAuthorization,
+    UploadAuthorizationIn,
+    UploadCompleteIn,
+)
+from socialapi.models.user import User
+from socialapi.security import (
+    create_upload_token,
+    get_current_user,
+    get_payload_for_token_type,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -27,13 +58,34 @@ client (sends image) -> server (tempfile) -> B2 upload -> server (delete tempfil
     - FastAPI will finish putting all the chunks together into the temporary file
     - upload it to Backblaze B2
     - delete the temporary file
+
+[ content-addressed storage ]
+- chunks are hashed (SHA-256) while they are received -> no second pass over the file
+- if the same content was uploaded before, its URL is returned without uploading to B2 again
+- objects are named after their hash -> no name collisions, and a URL's content never changes
 """
 
 CHUNK_SIZE = 1024 * 1024  # 1MB
 
 
+def content_addressed_name(sha256: str, filename: str | None) -> str:
+    # NOTE: keep only a sane extension of the client's filename (for content type detection)
+    suffix = pathlib.PurePath(filename or "").suffix.lower()
+    if not (suffix[1:].isalnum() and len(suffix) <= 10):
+        suffix = ""
+    return f"{sha256}{suffix}"
+
+
+async def find_upload(sha256: str):
+    query = upload_table.select().where(upload_table.c.sha256 == sha256)
+
+    logger.debug(query)
+
+    return await database.fetch_one(query)
+
+
 @router.post("/upload", status_code=status.HTTP_201_CREATED)
-async def upload_file(file: UploadFile):
+async def upload_file(file: UploadFile, background_tasks: BackgroundTasks):
     # NOTE: file is not a complete file, is a chunk!
     """
     [ UploadFile.read(CHUNK_SIZE) ]
@@ -47,6 +99,8 @@ async def upload_file(file: UploadFile):
             filename = temp_file.name
             logger.info(f"Saving uploaded file temporarily to {filename}")
 
+            digest = hashlib.sha256()
+            size = 0
             async with aiofiles.open(filename, "wb") as f:
                 """
                 same as
@@ -61,10 +115,34 @@ async def upload_file(file: UploadFile):
                 # while loop는 chunks를 모두 읽고 write 완료하면 exit
                 # -> 즉, Backblaze B2에 upload 될 준비 완료!
                 while chunk := await file.read(CHUNK_SIZE):
+                    digest.update(chunk)
+                    size += len(chunk)
                     await f.write(chunk)
 
-                # filename = tempfile 이름(random string) / file.filename = 실제 file 이름
-                file_url = b2_upload_file(local_file=filename, file_name=file.filename)
+            sha256 = digest.hexdigest()
+            if upload := await find_upload(sha256):
+                # NOTE: same content uploaded before -> no storage call at all
+                logger.info("File content already uploaded, reusing it")
+                return {
+                    "detail": f"Successfully uploaded {file.filename}",
+                    "file_url": upload.file_url,
+                }
+
+            # filename = tempfile 이름(random string) / file_name = content hash 기반 이름
+            file_name = content_addressed_name(sha256, file.filename)
+            # NOTE: b2sdk is synchronous -> runs in the shared B2 thread pool, not on the event loop
+            file_url = await b2_client.run(
+                b2_upload_file,
+                local_file=filename,
+                file_name=file_name,
+                cache_control=IMMUTABLE_CACHE_CONTROL,
+            )
+
+            # NOTE: a concurrent upload of the same content may have won the race -> ignore conflict
+            query = insert_or_ignore(upload_table).values(
+                sha256=sha256, file_name=file_name, file_url=file_url, size=size
+            )
+            await database.execute(query)
 
     except Exception:
         raise HTTPException(
@@ -72,5 +150,126 @@ async def upload_file(file: UploadFile):
             detail="There was an error uploading the file",
         )
 
+    # thumbnails & WebP/AVIF copies are made after the response is sent
+    background_tasks.add_task(tasks.process_image_variants, database, file_url)
+
     # NOTE: user profile image upload에 사용한다면, file_url을 DB에 User's model profile image URL로 저장하면 된다!
     return {"detail": f"Successfully uploaded {file.filename}", "file_url": file_url}
+
+
+"""
+[ direct upload flow ] -> file bytes never pass through the API workers
+1. client hashes the file & calls `POST /upload/authorize` (sha256, sha1, size, content_type)
+    - already uploaded content -> the existing file_url is returned right away
+    - otherwise -> B2 upload URL + headers + signed upload_token
+    - a name that exists in B2 already is never handed out again (-> 409, use `POST /upload`)
+2. client uploads the file straight to B2 (POST upload_url with the headers)
+    - B2 checks the content against X-Bz-Content-Sha1
+3. client calls `POST /upload/complete` with the upload_token
+    - server checks the object in B2: one version only, authorized size & SHA-1
+    - NOTE: the upload token of B2 allows ANY content under ANY name -> the client's sha256 is never
+      trusted: the server hashes the object itself before recording it (`uploads` dedups by sha256)
+"""
+
+
+@router.post("/upload/authorize", response_model=UploadAuthorization)
+async def authorize_upload(
+    upload: UploadAuthorizationIn,
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    logger.info("Authorizing direct upload")
+
+    if existing := await find_upload(upload.sha256):
+        logger.info("File content already uploaded, reusing it")
+        return {"exists": True, "file_url": existing.file_url}
+
+    file_name = content_addressed_name(upload.sha256, upload.filename)
+    # NOTE: never authorize a new version of an existing object
+    if await b2_client.run(b2_get_file_info, file_name) is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A file with this content exists already, upload it with POST /upload",
+        )
+
+    # b2sdk is synchronous (network call) -> run in the B2 thread pool
+    authorization = await b2_client.run(b2_get_upload_authorization)
+
+    return {
+        "exists": False,
+        "upload_url": authorization["upload_url"],
+        "headers": {
+            "Authorization": authorization["authorization_token"],
+            "X-Bz-File-Name": quote(file_name),
+            "Content-Type": upload.content_type,
+            "Content-Length": str(upload.size),
+            "X-Bz-Content-Sha1": upload.sha1,
+            "X-Bz-Info-b2-cache-control": quote(IMMUTABLE_CACHE_CONTROL),
+            "X-Bz-Info-sha256": upload.sha256,
+        },
+        "upload_token": create_upload_token(
+            current_user.email,
+            {
+                "sha256": upload.sha256,
+                "sha1": upload.sha1,
+                "size": upload.size,
+                "file_name": file_name,
+            },
+        ),
+    }
+
+
+@router.post("/upload/complete", status_code=status.HTTP_201_CREATED)
+async def complete_upload(
+    upload: UploadCompleteIn,
+    current_user: Annotated[User, Depends(get_current_user)],
+    background_tasks: BackgroundTasks,
+):
+    logger.info("Completing direct upload")
+
+    payload = get_payload_for_token_type(upload.upload_token, "upload")
+    if payload["sub"] != current_user.email:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Upload was authorized for another user",
+        )
+
+    file_info = await b2_client.run(b2_get_file_info, payload["file_name"])
+    if file_info is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file not found"
+        )
+
+    # NOTE: the object must be exactly what was authorized (B2 verified its SHA-1 on upload)
+    if (
+        file_info["versions"] != 1
+        or file_info["size"] != payload["size"]
+        or file_info["content_sha1"] != payload["sha1"]
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file does not match the authorized upload",
+        )
+
+    # NOTE: other uploads are deduplicated by this hash -> computed here, not taken from the client
+    sha256 = await b2_client.run(b2_hash_file, file_info["file_id"])
+    if sha256 != payload["sha256"]:
+        logger.warning("Uploaded file content does not match its SHA-256")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file does not match the authorized upload",
+        )
+
+    query = insert_or_ignore(upload_table).values(
+        sha256=payload["sha256"],
+        file_name=payload["file_name"],
+        file_url=file_info["file_url"],
+        size=payload["size"],
+    )
+    logger.debug(query)
+    await database.execute(query)
+
+    background_tasks.add_task(
+        tasks.process_image_variants, database, file_info["file_url"]
+    )
+
+    return {"detail": "Successfully uploaded file", "file_url": file_info["file_url"]}
@@ -3,10 +3,22 @@ from typing import Annotated
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-
-from socialapi import tasks
-from socialapi.database import database, user_table
-from socialapi.models.user import UserIn
+from sqlalchemy import bindparam, func, select
+
+from socialapi import fastread, tasks
+from socialapi.bloom import registered_emails
+from socialapi.database import (
+    database,
+    insert_or_ignore,
+    read_database,
+    user_stats_table,
+    user_table,
+)
+from socialapi.models.user import UserIn, UserProfile
+from socialapi.querycache import CachedQuery
+from socialapi.ratelimit import login_rate_limit, register_rate_limit
+from socialapi.replicas import mark_write
+from socialapi.responses import row_as
 from socialapi.security import (
     authenticate_user,
     create_access_token,
@@ -19,24 +31,53 @@ from socialapi.security import (
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# NOTE: counts come from the `user_stats` rollup (see socialapi.userstats), no counting per request
+query_user_profile = CachedQuery(
+    select(
+        user_table.c.id,
+        func.coalesce(user_stats_table.c.posts, 0).label("posts"),
+        func.coalesce(user_stats_table.c.likes_received, 0).label("likes_received"),
+    )
+    .select_from(user_table.outerjoin(user_stats_table))
+    .where(user_table.c.id == bindparam("user_id"))
+)
+
+
+def email_exists_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="A user with that email already exists",
+    )
+
 
 # NOTE: BackgroundTasks: FastAPI will inject what you need into this variable (any function available)
 # if the function is async, FastAPI awaits for it
-@router.post("/register", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/register",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(register_rate_limit)],
+)
 async def register(user: UserIn, background_tasks: BackgroundTasks, request: Request):
-    if await get_user(user.email):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="A user with that email already exists",
-        )
+    # NOTE: cheap checks first -> a duplicate email is rejected w/o hashing the password
+    # (not in the bloom filter = certainly new -> no existence query)
+    if registered_emails.might_exist(user.email) and await get_user(user.email):
+        raise email_exists_exception()
 
     # NOTE: MUST save password after hashing
     hashed_password = get_password_hash(user.password)
-    query = user_table.insert().values(email=user.email, password=hashed_password)
+    # NOTE: single statement -> no race between the check above & the insert
+    # (a concurrent registration w/ the same email inserts nothing -> no id returned)
+    query = (
+        insert_or_ignore(user_table)
+        .values(email=user.email, password=hashed_password)
+        .returning(user_table.c.id)
+    )
 
     logger.debug(query)
 
-    await database.execute(query)
+    if await database.fetch_val(query) is None:
+        raise email_exists_exception()
+    registered_emails.add(user.email)
 
     # send email confirmation (modify: await -> background task)
     background_tasks.add_task(
@@ -51,7 +92,8 @@ async def register(user: UserIn, background_tasks: BackgroundTasks, request: Req
     return {"detail": "User created. Please confirm your email"}
 
 
-@router.post("/token")
+# NOTE: rate limit dependency runs before the endpoint -> no DB lookup / bcrypt for rejected requests
+@router.post("/token", dependencies=[Depends(login_rate_limit)])
 async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
     # 1. 사용자 인증 (사용자 존재하는지, password 일치하는지) 등
     user = await authenticate_user(form_data.username, form_data.password)
@@ -62,7 +104,8 @@ async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-@router.get("/confirm/{token}")
+# NOTE: a GET (link in the email) that writes -> the login right after it reads from the primary
+@router.get("/confirm/{token}", dependencies=[Depends(mark_write)])
 async def confirm_email(token: str):
     email = get_subject_for_token_type(token, "confirmation")
     query = (
@@ -73,3 +116,18 @@ async def confirm_email(token: str):
 
     await database.execute(query)
     return {"detail": "User confirmed"}
+
+
+@router.get("/user/{user_id}", response_model=UserProfile)
+async def get_user_profile(user_id: int):
+    logger.info("Getting user profile")
+
+    query = query_user_profile
+    logger.debug(query)
+
+    profile = await fastread.fetch_one(read_database, query, user_id=user_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    return row_as(UserProfile, profile)
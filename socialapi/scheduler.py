@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from databases import Database
+
+from socialapi.database import insert_or_ignore, scheduled_job_table
+
+logger = logging.getLogger(__name__)
+
+"""
+[ periodic jobs ]
+- every worker runs the scheduler (started / stopped in the app's lifespan)
+- a job run is claimed in the database first (compare-and-set on `last_run_at`)
+  -> with N workers, each job still runs once per interval
+- the job gets the time since its previous run -> a late run makes up for the delay
+"""
+
+
+@dataclass
+class PeriodicJob:
+    name: str
+    interval: float  # seconds
+    func: Callable[[float], Awaitable[None]]  # called w/ seconds since the previous run
+
+
+async def claim_run(
+    database: Database, name: str, interval: float, now: float | None = None
+) -> float | None:
+    """seconds since the previous run if this worker may run the job now, else None"""
+    now = time.time() if now is None else now
+    # NOTE: first claim ever -> starts counting from now
+    await database.execute(
+        insert_or_ignore(scheduled_job_table).values(name=name, last_run_at=now)
+    )
+    previous = await database.fetch_val(
+        scheduled_job_table.select()
+        .with_only_columns(scheduled_job_table.c.last_run_at)
+        .where(scheduled_job_table.c.name == name)
+    )
+    if now - previous < interval:
+        return None
+
+    # NOTE: only succeeds if no other worker claimed the run in the meantime
+    claimed = await database.fetch_val(
+        scheduled_job_table.update()
+        .where(
+            scheduled_job_table.c.name == name,
+            scheduled_job_table.c.last_run_at == previous,
+        )
+        .values(last_run_at=now)
+        .returning(scheduled_job_table.c.name)
+    )
+    return now - previous if claimed else None
+
+
+class Scheduler:
+    def __init__(self, database: Database) -> None:
+        self.database = database
+        self.jobs: list[PeriodicJob] = []
+        self._tasks: list[asyncio.Task] = []
+
+    def add_job(
+        self, name: str, interval: float, func: Callable[[float], Awaitable[None]]
+    ) -> None:
+        self.jobs.append(PeriodicJob(name, interval, func))
+
+    async def run_once(self, job: PeriodicJob) -> bool:
+        # NOTE: claim & job in one transaction -> a failed run can be retried by any worker
+        async with self.database.transaction():
+            elapsed = await claim_run(self.database, job.name, job.interval)
+            if elapsed is None:
+                return False
+            logger.debug(f"Running scheduled job {job.name}")
+            await job.func(elapsed)
+        return True
+
+    async def _loop(self, job: PeriodicJob) -> None:
+        while True:
+            await asyncio.sleep(job.interval)
+            try:
+                await self.run_once(job)
+            except Exception:
+                logger.exception(f"Scheduled job {job.name} failed")
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._loop(job), name=f"job-{job.name}")
+            for job in self.jobs
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
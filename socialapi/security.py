@@ -1,18 +1,43 @@
 import datetime
+import functools
 import logging
-from typing import Annotated, Literal
+from typing import Annotated, Literal, NamedTuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import ExpiredSignatureError, JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import bindparam, select
 
+from socialapi import fastread
 from socialapi.config import config
-from socialapi.database import database, user_table
+from socialapi.database import read_database, user_table
+from socialapi.querycache import CachedQuery
 
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"])
+# NOTE: python-jose (w/ its crypto backend) & passlib are slow to import
+# -> imported on first use (first login / token check), not when the app starts
+
+
+@functools.cache
+def pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"])
+
+
+class UserRow(NamedTuple):
+    id: int
+    email: str
+    password: str
+    confirmed: bool
+
+
+# NOTE: exactly the columns of `UserRow`, by name -> a new column of `users` doesn't shift its fields
+query_user_by_email = CachedQuery(
+    select(*(user_table.c[name] for name in UserRow._fields)).where(
+        user_table.c.email == bindparam("email")
+    )
+)
 
 
 def create_credentials_exception(detail: str) -> HTTPException:
@@ -38,6 +63,18 @@ def confirm_token_expire_minutes() -> int:
     return 1440  # 24 hours
 
 
+def upload_token_expire_minutes() -> int:
+    return 60
+
+
+def encode_jwt(jwt_data: dict) -> str:
+    from jose import jwt
+
+    return jwt.encode(
+        jwt_data, key=config.JWT_SECRET_KEY, algorithm=config.JWT_ALGORITHM
+    )
+
+
 def create_access_token(email: str) -> str:
     logger.debug("Creating access token", extra={"email": email})
     expire = datetime.datetime.now(datetime.UTC) + datetime.timedelta(
@@ -45,9 +82,7 @@ def create_access_token(email: str) -> str:
     )
 
     jwt_data = {"sub": email, "exp": expire, "type": "access"}
-    encoded_jwt = jwt.encode(
-        jwt_data, key=config.JWT_SECRET_KEY, algorithm=config.JWT_ALGORITHM
-    )
+    encoded_jwt = encode_jwt(jwt_data)
 
     return encoded_jwt
 
@@ -59,16 +94,27 @@ def create_confirmation_token(email: str) -> str:
     )
 
     jwt_data = {"sub": email, "exp": expire, "type": "confirmation"}
-    encoded_jwt = jwt.encode(
-        jwt_data, key=config.JWT_SECRET_KEY, algorithm=config.JWT_ALGORITHM
+    encoded_jwt = encode_jwt(jwt_data)
+
+    return encoded_jwt
+
+
+def create_upload_token(email: str, upload: dict) -> str:
+    """signed description of an authorized direct upload -> checked again when the upload is completed"""
+    logger.debug("Creating upload token", extra={"email": email})
+    expire = datetime.datetime.now(datetime.UTC) + datetime.timedelta(
+        minutes=upload_token_expire_minutes()
     )
 
+    jwt_data = {**upload, "sub": email, "exp": expire, "type": "upload"}
+    encoded_jwt = encode_jwt(jwt_data)
+
     return encoded_jwt
 
 
-def get_subject_for_token_type(
-    token: str, type: Literal["access", "confirmation"]
-) -> str:
+def get_payload_for_token_type(
+    token: str, type: Literal["access", "confirmation", "upload"]
+) -> dict:
     # NOTE: with `Literal`, that value should be either options
     """
     [ Improvements ]
@@ -77,6 +123,8 @@ def get_subject_for_token_type(
     3. 기존의 credentials_exception 세분화
     """
 
+    from jose import ExpiredSignatureError, JWTError, jwt
+
     try:
         # NOTE: include the code that might raise error only! (better practice)
         # decode token
@@ -102,23 +150,33 @@ def get_subject_for_token_type(
             f"Token has incorrect type, expected '{type}'"
         )
 
-    return email
+    return payload
+
+
+def get_subject_for_token_type(
+    token: str, type: Literal["access", "confirmation", "upload"]
+) -> str:
+    return get_payload_for_token_type(token, type)["sub"]
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     # NOTE: 같은 password를 두 번 hash 하더라도, 그 값은 다르다! 따라서 verfy() 메서드를 이용한다.
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 
 async def get_user(email: str):
     logger.debug("Fetching user from the database", extra={"email": email})
-    query = user_table.select().where(user_table.c.email == email)
-
-    result = await database.fetch_one(query)
+    # NOTE: right after register / confirm, the same client is routed to the primary
+    result = await fastread.fetch_one(
+        read_database,
+        query_user_by_email,
+        row_factory=fastread.row_type(UserRow),
+        email=email,
+    )
     if result:
         return result
 
@@ -0,0 +1,159 @@
+import argparse
+import logging
+import math
+import os
+import pathlib
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+logger = logging.getLogger(__name__)
+
+"""
+[ production server ]
+python -m socialapi.serve [--workers N] [--port 8000] ...   (`make serve`)
+- workers: one per available core (CPU affinity & cgroup quota, ex. in a container), or WEB_CONCURRENCY
+    - workers are separate processes started w/ the "spawn" method (uvicorn's `Multiprocess`)
+      -> each one imports the app itself, nothing is shared by forking
+    - the socket is bound once in the supervisor & handed to every worker -> all accept on the same socket
+    - each worker has its own DB pool -> DB_MAX_CONNECTIONS is split between them (see `database.pool_size`)
+      -> never more workers than the budget allows
+- uvloop event loop & httptools HTTP parser (uvicorn[standard]), if installed
+- graceful drain (SIGTERM / SIGINT):
+    stop accepting -> end the event streams -> wait up to --graceful-timeout for in-flight requests
+    (incl. their background tasks) -> lifespan shutdown (buffered likes flushed, pools closed)
+- `make run` (uvicorn --reload) stays the development server
+"""
+
+APP = "socialapi.main:app"
+
+
+def _cgroup_cpu_quota() -> float | None:
+    """CPUs allowed by the cgroup (v2) quota, None if unlimited / unknown"""
+    try:
+        quota, period = pathlib.Path("/sys/fs/cgroup/cpu.max").read_text().split()
+    except (OSError, ValueError):
+        return None
+    if quota == "max":
+        return None
+    return int(quota) / int(period)
+
+
+def available_cores() -> int:
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:  # -- not on Linux
+        cores = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cores = min(cores, math.ceil(quota))
+    return max(cores, 1)
+
+
+def default_workers() -> int:
+    # NOTE: async workers -> one per core is enough (I/O waits don't block a worker)
+    return int(os.environ.get("WEB_CONCURRENCY", 0)) or available_cores()
+
+
+def _installed(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def export_worker_settings(workers: int) -> None:
+    """
+    settings the workers read from the environment when they load the config
+        - NOTE: w/ the prefix of the current ENV_STATE (ex. PROD_WORKERS)
+    """
+    from socialapi.config import config
+
+    prefix = type(config).model_config.get("env_prefix", "")
+    os.environ[f"{prefix}WORKERS"] = str(workers)
+
+
+class DrainingServer(uvicorn.Server):
+    async def shutdown(self, sockets=None) -> None:
+        # NOTE: event streams never end by themselves -> graceful shutdown would wait for its timeout
+        from socialapi.events import event_broker
+
+        event_broker.close_streams()
+        await super().shutdown(sockets)
+
+
+def build_config(args: argparse.Namespace) -> uvicorn.Config:
+    return uvicorn.Config(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if _installed("uvloop") else "asyncio",
+        http="httptools" if _installed("httptools") else "h11",
+        backlog=args.backlog,
+        # NOTE: longer than the load balancer's idle timeout -> the LB never reuses a closed connection
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=args.access_log,
+        proxy_headers=True,
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m socialapi.serve")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers", type=int, default=default_workers(), help="default: one per core"
+    )
+    parser.add_argument(
+        "--backlog", type=int, default=2048, help="pending connections of the socket"
+    )
+    parser.add_argument(
+        "--keep-alive", type=int, default=75, help="idle keep-alive seconds"
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=30,
+        help="seconds to wait for in-flight requests on shutdown",
+    )
+    parser.add_argument(
+        "--access-log",
+        action="store_true",
+        help="log every request (off: requests are logged by the app already)",
+    )
+    return parser
+
+
+def cap_workers(workers: int) -> int:
+    # NOTE: imported here -> only the budget settings matter, no DB connection is made
+    from socialapi.database import max_workers
+
+    limit = max_workers()
+    if limit is not None and workers > limit:
+        logger.warning(
+            f"DB_MAX_CONNECTIONS allows at most {limit} workers, starting {limit} instead of {workers}"
+        )
+        return limit
+    return workers
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    args.workers = cap_workers(args.workers)
+    export_worker_settings(args.workers)
+
+    config = build_config(args)
+    server = DrainingServer(config)
+    if config.workers > 1:
+        # NOTE: bound once here, handed to the (spawned) workers
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
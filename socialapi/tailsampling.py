@@ -0,0 +1,129 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.trace import StatusCode
+
+from socialapi.config import config
+from socialapi.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+"""
+[ tail sampling ]
+- head sampling decides when a trace starts -> can't know whether it will be slow or fail
+- here, every span is recorded, but held back until the trace's local root span (ex. the request) ends:
+    - slow (TRACING_SLOW_TRACE_SECONDS+) or any span failed -> exported
+    - others -> exported w/ probability TRACING_SAMPLE_RATE (by trace id -> same decision for every worker)
+- spans that end after their root (ex. tasks outliving the request) follow the decision of their trace
+- NOTE: held back spans cost memory -> at most MAX_PENDING_TRACES traces, the oldest are dropped
+"""
+
+MAX_PENDING_TRACES = 10_000
+MAX_DECISIONS = 10_000
+
+sampled_traces = Counter(
+    "socialapi_traces_total",
+    "Finished traces by tail sampling decision",
+    ("decision",),  # slow / error / sampled / dropped
+)
+
+
+class TailSamplingProcessor(SpanProcessor):
+    def __init__(
+        self,
+        processor: SpanProcessor,
+        slow_seconds: float = 1.0,
+        sample_rate: float = 0.0,
+    ) -> None:
+        # -- gets the spans of kept traces (ex. batch export)
+        self.processor = processor
+        self.slow_ns = int(slow_seconds * 1e9)
+        self.sample_rate = sample_rate
+        self._pending: dict[int, list[ReadableSpan]] = {}  # trace id -> ended spans
+        self._decisions: OrderedDict[int, bool] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def decide(self, root: ReadableSpan, spans: list[ReadableSpan]) -> str:
+        if root.end_time - root.start_time >= self.slow_ns:
+            return "slow"
+        if any(span.status.status_code is StatusCode.ERROR for span in spans):
+            return "error"
+        # NOTE: the low 64 bits of a trace id are random (W3C trace context)
+        if (root.context.trace_id & (2**64 - 1)) < self.sample_rate * 2**64:
+            return "sampled"
+        return "dropped"
+
+    def on_end(self, span: ReadableSpan) -> None:
+        trace_id = span.context.trace_id
+        is_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            keep = self._decisions.get(trace_id)
+            if keep is not None:
+                spans = [span]
+            elif not is_root:
+                self._pending.setdefault(trace_id, []).append(span)
+                if len(self._pending) > MAX_PENDING_TRACES:
+                    # NOTE: dicts keep the insertion order -> the oldest trace
+                    self._pending.pop(next(iter(self._pending)))
+                return
+            else:
+                spans = self._pending.pop(trace_id, [])
+                spans.append(span)
+                decision = self.decide(span, spans)
+                sampled_traces.inc(decision=decision)
+                keep = decision != "dropped"
+                self._decisions[trace_id] = keep
+                if len(self._decisions) > MAX_DECISIONS:
+                    self._decisions.popitem(last=False)
+
+        if keep:
+            for kept in spans:
+                self.processor.on_end(kept)
+
+    def shutdown(self) -> None:
+        self.processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.processor.force_flush(timeout_millis)
+
+
+class FileSpanExporter(ConsoleSpanExporter):
+    """one JSON object per line (w/o the console exporter's indentation), the file is closed on shutdown"""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(
+            out=open(path, "a", encoding="utf8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+
+    def shutdown(self) -> None:
+        self.out.close()
+
+
+def build_exporter():
+    if config.TRACING_EXPORTER == "file":
+        return FileSpanExporter(config.TRACING_FILE)
+    if config.TRACING_EXPORTER == "otlp":
+        # NOTE: OTLP/HTTP, w/o an endpoint -> OTEL_EXPORTER_OTLP_(TRACES_)ENDPOINT or localhost:4318
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        return OTLPSpanExporter(endpoint=config.TRACING_OTLP_ENDPOINT)
+    raise ValueError(f"Unknown TRACING_EXPORTER {config.TRACING_EXPORTER!r}")
+
+
+def build_tracer_provider(exporter=None) -> TracerProvider:
+    provider = TracerProvider(resource=Resource.create({"service.name": "socialapi"}))
+    provider.add_span_processor(
+        TailSamplingProcessor(
+            BatchSpanProcessor(exporter or build_exporter()),
+            slow_seconds=config.TRACING_SLOW_TRACE_SECONDS,
+            sample_rate=config.TRACING_SAMPLE_RATE,
+        )
+    )
+    return provider
@@ -1,36 +1,57 @@
+import hashlib
 import logging
 from json import JSONDecodeError
 
-import httpx
 from databases import Database
+from sqlalchemy import func, select
 
 from socialapi.config import config
-from socialapi.database import post_table
+from socialapi.database import insert_or_ignore, post_image_table, post_table
+from socialapi.imagegen import CircuitOpenError, ImageStatus, image_generator
+from socialapi.tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
+# NOTE: httpx is imported in the functions -> loaded by the first background task, not at startup
+
+
+def http_span(method: str, host: str):
+    """client span of an outbound API call (a failed call -> status ERROR)"""
+    return span(
+        f"{method} {host}",
+        "client",
+        {"http.request.method": method, "server.address": host},
+    )
+
 
 class APIResponseError(Exception):
-    pass
+    def __init__(self, message: str, retriable: bool = False) -> None:
+        super().__init__(message)
+        # NOTE: only temporary failures (5xx, 429, network) are worth retrying
+        self.retriable = retriable
 
 
 # ----- email ----- #
 async def send_simple_email(to: str, subject: str, body: str):
+    import httpx
+
     logger.debug(f"Sending email to '{to[:3]}' with subject '{subject[:20]}'")
     async with httpx.AsyncClient() as client:
         try:
-            response = await client.post(
-                f"https://api.mailgun.net/v3/{config.MAILGUN_DOMAIN}/messages",
-                auth=("api", config.MAILGUN_API_KEY),
-                data={
-                    "from": f"Seungri You <mailgun@{config.MAILGUN_DOMAIN}>",
-                    "to": [to],
-                    "subject": subject,
-                    "text": body,
-                },
-            )
-            # NOTE: response.raise_for_status: raise Python exception if the status code of response starts with 4 or 5
-            response.raise_for_status()
+            with http_span("POST", "api.mailgun.net") as current:
+                response = await client.post(
+                    f"https://api.mailgun.net/v3/{config.MAILGUN_DOMAIN}/messages",
+                    auth=("api", config.MAILGUN_API_KEY),
+                    data={
+                        "from": f"Seungri You <mailgun@{config.MAILGUN_DOMAIN}>",
+                        "to": [to],
+                        "subject": subject,
+                        "text": body,
+                    },
+                )
+                current.set_attribute("http.response.status_code", response.status_code)
+                # NOTE: response.raise_for_status: raise Python exception if the status code of response starts with 4 or 5
+                response.raise_for_status()
 
             logger.debug(response.content)
 
@@ -56,28 +77,41 @@ async def send_user_registration_email(email: str, confirmation_url: str):
 
 # ----- DeepAI image generator ----- #
 async def _generate_cute_creature_api(prompt: str):
+    import httpx
+
     logger.debug("Generating cute creature image")
     async with httpx.AsyncClient() as client:
         try:
-            response = await client.post(
-                "https://api.deepai.org/api/cute-creature-generator",
-                data={"text": prompt},
-                headers={"api-key": config.DEEPAI_API_KEY},
-                timeout=60,  # if API doesn't respond within 60 secs, it is an error
-            )
-            logger.debug(response)
-            response.raise_for_status()  # if response's status_code doesn't start with 2 or 3, raise an error
+            with http_span("POST", "api.deepai.org") as current:
+                response = await client.post(
+                    "https://api.deepai.org/api/cute-creature-generator",
+                    data={"text": prompt},
+                    headers={"api-key": config.DEEPAI_API_KEY},
+                    # if API doesn't respond within 30 secs, it is an error (retried w/ backoff)
+                    timeout=30,
+                )
+                current.set_attribute("http.response.status_code", response.status_code)
+                logger.debug(response)
+                response.raise_for_status()  # if response's status_code doesn't start with 2 or 3, raise an error
             return response.json()
 
         except httpx.HTTPStatusError as err:
+            status_code = err.response.status_code
             raise APIResponseError(
-                f"API request failed with status code {err.response.status_code}"
+                f"API request failed with status code {status_code}",
+                retriable=status_code >= 500 or status_code == 429,
+            ) from err
+
+        except httpx.TransportError as err:  # -- timeouts & connection errors
+            raise APIResponseError(
+                f"API request failed with {type(err).__name__}", retriable=True
             ) from err
 
         except (JSONDecodeError, TypeError) as err:
             raise APIResponseError("API response parsing failed") from err
 
 
+@traced("generate_and_add_to_post")
 async def generate_and_add_to_post(
     email: str,
     post_id: int,
@@ -86,9 +120,22 @@ async def generate_and_add_to_post(
     prompt: str = "A blue british shorthair cat is sitting on a couch",
 ):
     try:
-        response = await _generate_cute_creature_api(prompt)
+        # NOTE: cached prompts don't call the API at all
+        output_url = await image_generator.generate(
+            database,
+            prompt,
+            _generate_cute_creature_api,
+            lambda err: isinstance(err, APIResponseError) and err.retriable,
+        )
+
+    except (APIResponseError, CircuitOpenError, KeyError):
+        logger.debug("Marking image generation of post as failed")
+        await database.execute(
+            post_table.update()
+            .where(post_table.c.id == post_id)
+            .values(image_status=ImageStatus.failed.value)
+        )
 
-    except APIResponseError:
         # image generation 실패 시 email 발송
         return await send_simple_email(
             email,
@@ -102,7 +149,7 @@ async def generate_and_add_to_post(
     query = (
         post_table.update()
         .where(post_table.c.id == post_id)
-        .values(image_url=response["output_url"])
+        .values(image_url=output_url, image_status=ImageStatus.completed.value)
     )
 
     logger.debug(query)
@@ -121,4 +168,65 @@ async def generate_and_add_to_post(
         ),
     )
 
-    return response
+    # NOTE: after the email -> the user isn't kept waiting for the download, resizing & uploads
+    await process_image_variants(database, output_url)
+
+    return {"output_url": output_url}
+
+
+# ----- image variants ----- #
+@traced("process_image_variants")
+async def process_image_variants(database: Database, source_url: str):
+    """
+    thumbnail / medium copies of an image as WebP (and AVIF if available), stored in `post_images`
+        - resizing runs in a process pool -> doesn't block the event loop & uses all cores
+        - if anything fails, the post simply keeps only the original image
+    """
+    # NOTE: imported here -> Pillow & the process pool are only loaded when an image is processed
+    import httpx
+
+    from socialapi.libs.b2 import b2_client, b2_upload_bytes
+    from socialapi.libs.imaging import render_variants_in_pool
+
+    query = (
+        select(func.count())
+        .select_from(post_image_table)
+        .where(post_image_table.c.source_url == source_url)
+    )
+    if await database.fetch_val(query):
+        logger.debug("Image variants already exist")
+        return
+
+    try:
+        async with httpx.AsyncClient() as client:
+            with http_span("GET", httpx.URL(source_url).host):
+                response = await client.get(source_url, timeout=30)
+                response.raise_for_status()
+
+        variants = await render_variants_in_pool(response.content)
+
+        # NOTE: deterministic names -> processing the same image twice overwrites, never duplicates
+        prefix = f"variants/{hashlib.sha256(source_url.encode()).hexdigest()[:32]}"
+        for variant in variants:
+            # b2sdk is synchronous -> run in the shared B2 thread pool
+            url = await b2_client.run(
+                b2_upload_bytes,
+                variant.data,
+                f"{prefix}/{variant.variant}.{variant.format}",
+                variant.content_type,
+            )
+            query = insert_or_ignore(post_image_table).values(
+                source_url=source_url,
+                variant=variant.variant,
+                format=variant.format,
+                width=variant.width,
+                height=variant.height,
+                url=url,
+            )
+            await database.execute(query)
+
+    except Exception:
+        logger.exception("Processing image variants failed, keeping the original")
+        return
+
+    logger.debug(f"Stored {len(variants)} image variants")
@@ -9,19 +9,24 @@ from fastapi.testclient import TestClient
 # FastAPI server를 시작하지 않고서도 test 가능
 from httpx import Request  # API로 request를 보내는 역할
 from httpx import ASGITransport, AsyncClient, Response
+from sqlalchemy import create_engine
 
 # overwrite ENV_STATUS = "test" before importing modules
 os.environ["ENV_STATE"] = "test"
 
+from socialapi.config import config  # noqa: E402
 from socialapi.database import metadata  # noqa: E402
-from socialapi.database import database, engine, user_table  # noqa: E402
+from socialapi.database import database, user_table  # noqa: E402
 from socialapi.main import app  # noqa: E402
+from socialapi.ratelimit import backend as rate_limit_backend  # noqa: E402
 from socialapi.tests.helpers import create_post  # noqa: E402
 
 # NOTE: fixtures = ways to share data between multiple tests
 
 # NOTE: table 구조를 바꿀 때마다 test.db를 삭제해야 한다!
-metadata.create_all(engine)
+metadata.create_all(
+    create_engine(config.DATABASE_URL, connect_args={"check_same_thread": False})
+)
 
 
 @pytest.fixture(scope="session")  # runs only once for the entire test session
@@ -47,6 +52,13 @@ async def db() -> AsyncGenerator:  # 추후 DB로 바꿀 것이므로 async
     await database.disconnect()  # disconnect from db and rollback
 
 
+@pytest.fixture(autouse=True)
+async def reset_rate_limits() -> AsyncGenerator:
+    """every test logs in from the same IP -> start each test with full buckets"""
+    await rate_limit_backend.reset()
+    yield
+
+
 # httpx를 이용하여 API에게 request를 보내는 역할 (test parameter로 넣기)
 @pytest.fixture()
 async def async_client(client) -> AsyncGenerator:
@@ -100,8 +112,9 @@ async def logged_in_token(async_client: AsyncClient, confirmed_user: dict) -> st
 def mock_httpx_client(mocker):
     """test 시에는 mailgun으로 post request 보내는 동작이 실행되지 않도록 한다."""
 
-    # `socialapi.tasks.httpx.AsyncClient`를 통해 request를 보낼 때마다, 실제로 API를 호출하지 않고 200 return 하도록 한다.
-    mocked_client = mocker.patch("socialapi.tasks.httpx.AsyncClient")
+    # `socialapi.tasks`가 `httpx.AsyncClient`를 통해 request를 보낼 때마다, 실제로 API를 호출하지 않고 200 return 하도록 한다.
+    # NOTE: tasks import httpx lazily (inside the functions) -> patch the class on the httpx module itself
+    mocked_client = mocker.patch("httpx.AsyncClient")
 
     mocked_async_client = Mock()
     # NOTE: response는 200, 빈 content로 설정하고, 받은 request는 home URL(//)로부터 POST로 보내졌다고 설정한다.
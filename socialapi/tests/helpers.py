@@ -1,5 +1,10 @@
+import io
+from contextlib import contextmanager
+
 from httpx import AsyncClient
 
+from socialapi.querystats import collect_queries, statement_sql
+
 
 async def create_post(
     body: str, async_client: AsyncClient, logged_in_token: str
@@ -16,12 +21,16 @@ async def create_post(
 
 
 async def create_comment(
-    body: str, post_id: int, async_client: AsyncClient, logged_in_token: str
+    body: str,
+    post_id: int,
+    async_client: AsyncClient,
+    logged_in_token: str,
+    parent_id: int | None = None,
 ) -> dict:
     # json 파라미터를 사용함으로써, json 형식으로 보내는 데에 필요한 header(ex. content type)를 자동으로 설정
     response = await async_client.post(
         "/comment",
-        json={"body": body, "post_id": post_id},
+        json={"body": body, "post_id": post_id, "parent_id": parent_id},
         headers={"Authorization": f"Bearer {logged_in_token}"},
     )
     return response.json()
@@ -36,3 +45,38 @@ async def like_post(
         headers={"Authorization": f"Bearer {logged_in_token}"},
     )
     return response.json()  # for returning api response result as json
+
+
+def make_image(size: tuple[int, int], exif: bool = False) -> bytes:
+    # NOTE: imported here -> tests w/o images don't load Pillow
+    from PIL import Image
+
+    image = Image.new("RGB", size, color="blue")
+    buffer = io.BytesIO()
+    if exif:
+        metadata = Image.Exif()
+        metadata[0x010F] = "Test Camera"  # -- Make
+        image.save(buffer, format="JPEG", exif=metadata)
+    else:
+        image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@contextmanager
+def assert_max_queries(n: int):
+    """
+    query budget of the block (ex. one request)
+        ```
+        with assert_max_queries(2):
+            await async_client.get("/post/1")
+        ```
+    """
+    with collect_queries() as stats:
+        yield stats
+    statements = "\n".join(
+        f"  {count}x {statement_sql(query)}"
+        for count, query in stats.statements.values()
+    )
+    assert (
+        stats.count <= n
+    ), f"{stats.count} queries, expected at most {n}:\n{statements}"
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from socialapi.libs import b2 as b2_lib
+
+
+@pytest.fixture()
+def mock_b2_api(mocker):
+    mock_api_class = mocker.patch("b2sdk.v2.B2Api")
+    mocker.patch("b2sdk.v2.InMemoryAccountInfo")
+    api = mock_api_class.return_value
+    api.get_download_url_for_fileid.return_value = "https://fakeurl.com/file"
+    return mock_api_class
+
+
+@pytest.fixture()
+def b2_client_under_test(mocker, mock_b2_api) -> b2_lib.B2Client:
+    client = b2_lib.B2Client(max_workers=2)
+    mocker.patch("socialapi.libs.b2.b2_client", client)
+    return client
+
+
+@pytest.mark.anyio
+async def test_authorizes_once(b2_client_under_test: b2_lib.B2Client, mock_b2_api):
+    b2_client_under_test.authorized()
+    b2_client_under_test.authorized()
+
+    mock_b2_api.return_value.authorize_account.assert_called_once()
+
+
+@pytest.mark.anyio
+async def test_reauthorizes_before_expiry(
+    b2_client_under_test: b2_lib.B2Client, mock_b2_api, mocker
+):
+    b2_client_under_test.authorized()
+    mocker.patch("socialapi.libs.b2.AUTHORIZATION_MAX_AGE_SECONDS", 0)
+
+    b2_client_under_test.authorized()
+
+    assert mock_b2_api.return_value.authorize_account.call_count == 2
+
+
+@pytest.mark.anyio
+async def test_upload_bytes_records_metrics(b2_client_under_test: b2_lib.B2Client):
+    uploads_before = b2_lib.b2_uploads.value(result="success")
+    bytes_before = b2_lib.b2_uploaded_bytes.value()
+
+    url = b2_lib.b2_upload_bytes(b"12345", "file.webp", "image/webp")
+
+    assert url == "https://fakeurl.com/file"
+    assert b2_lib.b2_uploads.value(result="success") == uploads_before + 1
+    assert b2_lib.b2_uploaded_bytes.value() == bytes_before + 5
+    assert b2_lib.b2_upload_seconds.count(operation="bytes") >= 1
+
+
+@pytest.mark.anyio
+async def test_run_uses_shared_thread_pool(b2_client_under_test: b2_lib.B2Client):
+    thread_name = await b2_client_under_test.run(
+        lambda: threading.current_thread().name
+    )
+
+    assert thread_name.startswith("b2")
+    await b2_client_under_test.close()
+
+
+@pytest.mark.anyio
+async def test_start_authorizes_eagerly(
+    b2_client_under_test: b2_lib.B2Client, mock_b2_api, mocker
+):
+    mocker.patch("socialapi.libs.b2.config.B2_KEY_ID", "key-id")
+    mocker.patch("socialapi.libs.b2.config.B2_APPLICATION_KEY", "key")
+
+    await b2_client_under_test.start()
+    refresh_task = b2_client_under_test._refresh_task
+    await b2_client_under_test.close()
+
+    mock_b2_api.return_value.authorize_account.assert_called_once()
+    # NOTE: the background refresh has ended (not just been asked to)
+    assert refresh_task.done()
+
+
+@pytest.mark.anyio
+async def test_start_without_credentials(
+    b2_client_under_test: b2_lib.B2Client, mock_b2_api, mocker
+):
+    mocker.patch("socialapi.libs.b2.config.B2_KEY_ID", None)
+
+    await b2_client_under_test.start()
+
+    mock_b2_api.return_value.authorize_account.assert_not_called()
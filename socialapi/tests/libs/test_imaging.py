@@ -0,0 +1,32 @@
+import io
+
+from PIL import Image
+
+from socialapi.libs.imaging import VARIANT_SIZES, render_variants
+from socialapi.tests.helpers import make_image
+
+
+def test_render_variants_resizes_to_webp():
+    variants = render_variants(make_image((2000, 1000)))
+    webp = {v.variant: v for v in variants if v.format == "webp"}
+
+    assert set(webp) == set(VARIANT_SIZES)
+    assert (webp["thumbnail"].width, webp["thumbnail"].height) == (320, 160)
+    assert (webp["medium"].width, webp["medium"].height) == (1080, 540)
+    with Image.open(io.BytesIO(webp["thumbnail"].data)) as image:
+        assert image.format == "WEBP"
+        assert image.size == (320, 160)
+
+
+def test_render_variants_does_not_upscale():
+    variants = render_variants(make_image((100, 50)))
+
+    assert all((v.width, v.height) == (100, 50) for v in variants)
+
+
+def test_render_variants_strips_metadata():
+    variants = render_variants(make_image((400, 400), exif=True))
+
+    for variant in variants:
+        with Image.open(io.BytesIO(variant.data)) as image:
+            assert not image.getexif()
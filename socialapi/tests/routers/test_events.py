@@ -0,0 +1,58 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from socialapi.events import encode_event, event_broker
+from socialapi.routers.events import event_stream
+from socialapi.tests.helpers import create_comment, create_post, like_post
+
+
+@pytest.mark.anyio
+async def test_event_stream():
+    stream = event_stream(heartbeat=1)
+
+    assert await anext(stream) == b"retry: 3000\n\n"
+    await event_broker.publish("post_created", {"post_id": 1, "user_id": 1})
+    assert await anext(stream) == encode_event(
+        "post_created", {"post_id": 1, "user_id": 1}
+    )
+
+    # NOTE: client disconnected -> unsubscribed
+    await stream.aclose()
+    assert event_broker.subscribers == set()
+
+
+@pytest.mark.anyio
+async def test_writes_publish_events(
+    async_client: AsyncClient, confirmed_user: dict, logged_in_token: str
+):
+    subscriber = event_broker.subscribe()
+    try:
+        post = await create_post("Test Post", async_client, logged_in_token)
+        comment = await create_comment(
+            "Test Comment", post["id"], async_client, logged_in_token
+        )
+        await like_post(post["id"], async_client, logged_in_token)
+    finally:
+        event_broker.unsubscribe(subscriber)
+
+    user_id = confirmed_user["id"]
+    frames = [subscriber.queue.get_nowait() for _ in range(3)]
+    assert frames == [
+        encode_event("post_created", {"post_id": post["id"], "user_id": user_id}),
+        encode_event(
+            "comment_created",
+            {"comment_id": comment["id"], "post_id": post["id"], "user_id": user_id},
+        ),
+        encode_event("post_liked", {"post_id": post["id"], "user_id": user_id}),
+    ]
+
+
+@pytest.mark.anyio
+async def test_event_stream_subscriber_limit(async_client: AsyncClient, mocker):
+    mocker.patch.object(event_broker, "max_subscribers", 0)
+
+    response = await async_client.get("/events")
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["retry-after"] == "3"
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from socialapi.database import read_database
+from socialapi.tests.helpers import create_comment, create_post, like_post
+
+
+async def export(
+    async_client: AsyncClient, logged_in_token: str, name: str, **params
+) -> list[dict]:
+    response = await async_client.get(
+        f"/export/{name}.ndjson",
+        params=params,
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.fixture()
+async def created_posts(async_client: AsyncClient, logged_in_token: str) -> list:
+    return [
+        await create_post(f"Post {i}", async_client, logged_in_token) for i in range(3)
+    ]
+
+
+@pytest.mark.anyio
+async def test_export_posts(
+    async_client: AsyncClient, logged_in_token: str, created_posts: list, mocker
+):
+    # NOTE: smaller batches than rows -> rows are read & streamed over several batches
+    mocker.patch("socialapi.routers.export.ROWS_PER_CHUNK", 2)
+    fetch_all = mocker.spy(read_database, "fetch_all")
+
+    rows = await export(async_client, logged_in_token, "posts")
+
+    assert [row["id"] for row in rows] == [post["id"] for post in created_posts]
+    assert fetch_all.call_count == 2
+    assert rows[0] == {**created_posts[0], "image_status": None, "hot_score": 1.0}
+
+
+@pytest.mark.anyio
+async def test_export_posts_since_id(
+    async_client: AsyncClient, logged_in_token: str, created_posts: list
+):
+    rows = await export(
+        async_client, logged_in_token, "posts", since_id=created_posts[1]["id"]
+    )
+
+    assert [row["body"] for row in rows] == ["Post 2"]
+
+
+@pytest.mark.anyio
+async def test_export_empty(async_client: AsyncClient, logged_in_token: str):
+    assert await export(async_client, logged_in_token, "posts") == []
+
+
+@pytest.mark.anyio
+async def test_export_comments_and_likes(
+    async_client: AsyncClient, logged_in_token: str, created_posts: list
+):
+    post_id = created_posts[0]["id"]
+    comment = await create_comment("Comment", post_id, async_client, logged_in_token)
+    like = await like_post(post_id, async_client, logged_in_token)
+
+    assert await export(async_client, logged_in_token, "comments") == [
+        {**comment, "root_id": None, "path": "0000000001"}
+    ]
+    assert await export(async_client, logged_in_token, "likes") == [like]
+
+
+@pytest.mark.anyio
+async def test_export_requires_login(async_client: AsyncClient):
+    response = await async_client.get("/export/posts.ndjson")
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.anyio
+async def test_export_too_many_concurrent(
+    async_client: AsyncClient, logged_in_token: str, mocker
+):
+    mocker.patch("socialapi.routers.export.export_slots", asyncio.Semaphore(0))
+
+    response = await async_client.get(
+        "/export/posts.ndjson", headers={"Authorization": f"Bearer {logged_in_token}"}
+    )
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["retry-after"] == "5"
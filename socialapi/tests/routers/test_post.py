@@ -3,7 +3,15 @@ from fastapi import status
 from httpx import AsyncClient
 
 from socialapi import security
-from socialapi.tests.helpers import create_comment, create_post, like_post
+from socialapi.config import config
+from socialapi.database import post_image_table, post_table, read_database
+from socialapi.likebuffer import like_buffer
+from socialapi.tests.helpers import (
+    assert_max_queries,
+    create_comment,
+    create_post,
+    like_post,
+)
 
 
 # ===== fixtures ===== #
@@ -33,11 +41,12 @@ async def test_create_post(
 ):
     body = "Test Post"
 
-    response = await async_client.post(
-        "/post",
-        json={"body": body},
-        headers={"Authorization": f"Bearer {logged_in_token}"},
-    )
+    with assert_max_queries(3):
+        response = await async_client.post(
+            "/post",
+            json={"body": body},
+            headers={"Authorization": f"Bearer {logged_in_token}"},
+        )
 
     assert response.status_code == status.HTTP_201_CREATED
     # 나중에 response에 다른 정보가 추가될 수 있는데, 그때마다 코드를 수정하지 않기 위해
@@ -71,6 +80,36 @@ async def test_create_post_with_prompt(
     mock_generate_cute_creature_api.assert_called()  # -- ensure third party API was going to be called
 
 
+@pytest.mark.anyio
+async def test_get_post_image_status(
+    async_client: AsyncClient, logged_in_token: str, mocker
+):
+    # NOTE: background task isn't run -> generation stays pending
+    mocker.patch("socialapi.routers.post.generate_and_add_to_post")
+    response = await async_client.post(
+        "/post?prompt=A cat",
+        json={"body": "Test Post"},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+    post_id = response.json()["id"]
+
+    response = await async_client.get(f"/post/{post_id}/image-status")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "post_id": post_id,
+        "status": "pending",
+        "image_url": None,
+    }
+
+
+@pytest.mark.anyio
+async def test_get_missing_post_image_status(async_client: AsyncClient):
+    response = await async_client.get("/post/1/image-status")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
 @pytest.mark.anyio
 async def test_create_post_expired_token(
     async_client: AsyncClient, confirmed_user: dict, mocker
@@ -102,14 +141,37 @@ async def test_create_post_missing_data(
 async def test_like_post(
     async_client: AsyncClient, created_post: dict, logged_in_token: str
 ):
-    response = await async_client.post(
-        "/like",
-        json={"post_id": created_post["id"]},
-        headers={"Authorization": f"Bearer {logged_in_token}"},
-    )
+    # NOTE: user, post, like, hot score & the post owner's stats
+    with assert_max_queries(5):
+        response = await async_client.post(
+            "/like",
+            json={"post_id": created_post["id"]},
+            headers={"Authorization": f"Bearer {logged_in_token}"},
+        )
     assert response.status_code == status.HTTP_201_CREATED
 
 
+@pytest.mark.anyio
+async def test_like_post_buffered(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str, mocker
+):
+    mocker.patch.object(config, "LIKE_BUFFER_ENABLED", True)
+
+    for _ in range(2):
+        response = await async_client.post(
+            "/like",
+            json={"post_id": created_post["id"]},
+            headers={"Authorization": f"Bearer {logged_in_token}"},
+        )
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.json()["id"] is None
+
+    # NOTE: the second like of the same user was deduplicated
+    assert await like_buffer.flush() == 1
+    response = await async_client.get(f"/post/{created_post['id']}")
+    assert response.json()["post"]["likes"] == 1
+
+
 @pytest.mark.anyio
 async def test_get_all_posts(async_client: AsyncClient, created_post: dict):
     # post를 retrieve 해야하므로 미리 post를 생성해야 함 (created_post 이용)
@@ -120,10 +182,43 @@ async def test_get_all_posts(async_client: AsyncClient, created_post: dict):
     response = await async_client.get("/post")
 
     assert response.status_code == status.HTTP_200_OK
-    assert response.json() == [{**created_post, "likes": 0}]  # add likes
+    assert response.json() == [
+        {**created_post, "likes": 0, "thumbnail_url": None}
+    ]  # add likes
     assert created_post.items() <= response.json()[0].items()  # except likes (both ok)
 
 
+@pytest.mark.anyio
+async def test_get_all_posts_with_thumbnail(
+    async_client: AsyncClient, created_post: dict, db
+):
+    image_url = "https://example.com/image.jpg"
+    await db.execute(
+        post_table.update()
+        .where(post_table.c.id == created_post["id"])
+        .values(image_url=image_url)
+    )
+    for variant, url in [
+        ("thumbnail", "https://cdn/t.webp"),
+        ("medium", "https://cdn/m.webp"),
+    ]:
+        await db.execute(
+            post_image_table.insert().values(
+                source_url=image_url,
+                variant=variant,
+                format="webp",
+                width=1,
+                height=1,
+                url=url,
+            )
+        )
+
+    response = await async_client.get("/post")
+
+    assert response.json()[0]["thumbnail_url"] == "https://cdn/t.webp"
+    assert response.json()[0]["likes"] == 0
+
+
 # ----- sorting ----- #
 @pytest.mark.anyio
 @pytest.mark.parametrize(
@@ -173,6 +268,66 @@ async def test_get_all_posts_sort_likes(
     assert post_ids == expected_order
 
 
+@pytest.mark.anyio
+async def test_get_all_posts_sort_hot(async_client: AsyncClient, logged_in_token: str):
+    for body in ("Test Post 1", "Test Post 2", "Test Post 3"):
+        await create_post(body, async_client, logged_in_token)
+
+    # hot score: post 1 = post + comment, post 2 = post + like, post 3 = post
+    await create_comment("Comment", 1, async_client, logged_in_token)
+    await like_post(2, async_client, logged_in_token)
+
+    response = await async_client.get("/post", params={"sorting": "hot"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [post["id"] for post in response.json()] == [1, 2, 3]
+
+
+@pytest.mark.anyio
+async def test_get_user_posts(
+    async_client: AsyncClient, confirmed_user: dict, logged_in_token: str
+):
+    for body in ("Test Post 1", "Test Post 2", "Test Post 3"):
+        await create_post(body, async_client, logged_in_token)
+    await like_post(3, async_client, logged_in_token)
+
+    url = f"/user/{confirmed_user['id']}/posts"
+    response = await async_client.get(url, params={"limit": 2})
+
+    assert response.status_code == status.HTTP_200_OK
+    page = response.json()
+    assert [(post["id"], post["likes"]) for post in page["posts"]] == [(3, 1), (2, 0)]
+    assert page["next_cursor"] == 2
+
+    response = await async_client.get(
+        url, params={"limit": 2, "before": page["next_cursor"]}
+    )
+    page = response.json()
+    assert [post["id"] for post in page["posts"]] == [1]
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("before", [0, 2**31])
+async def test_get_user_posts_before_out_of_range(
+    async_client: AsyncClient, confirmed_user: dict, before: int
+):
+    response = await async_client.get(
+        f"/user/{confirmed_user['id']}/posts", params={"before": before}
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.anyio
+async def test_get_user_posts_of_other_user(
+    async_client: AsyncClient, created_post: dict
+):
+    response = await async_client.get("/user/1234/posts")
+
+    assert response.json() == {"posts": [], "next_cursor": None}
+
+
 @pytest.mark.anyio
 async def test_get_all_posts_wrong_sorting(async_client: AsyncClient):
     response = await async_client.get("/post", params={"sorting": "wrong"})
@@ -189,11 +344,12 @@ async def test_create_comment(
 ):
     body = "Test Comment"
 
-    response = await async_client.post(
-        "/comment",
-        json={"body": body, "post_id": created_post["id"]},
-        headers={"Authorization": f"Bearer {logged_in_token}"},
-    )
+    with assert_max_queries(5):
+        response = await async_client.post(
+            "/comment",
+            json={"body": body, "post_id": created_post["id"]},
+            headers={"Authorization": f"Bearer {logged_in_token}"},
+        )
 
     assert response.status_code == status.HTTP_201_CREATED
     assert {
@@ -228,11 +384,13 @@ async def test_get_comments_on_post_empty(
 async def test_get_post_with_comments(
     async_client: AsyncClient, created_post: dict, created_comment: dict
 ):
-    response = await async_client.get(f"/post/{created_post['id']}")
+    # NOTE: the post (w/ its likes) & its comments
+    with assert_max_queries(2):
+        response = await async_client.get(f"/post/{created_post['id']}")
 
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {
-        "post": {**created_post, "likes": 0},
+        "post": {**created_post, "likes": 0, "thumbnail_url": None},
         "comments": [created_comment],
     }
 
@@ -244,3 +402,160 @@ async def test_get_missing_post_with_comments(
     response = await async_client.get("/post/2")  # id 2 doesn't exist
 
     assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("url", ["/post", "/post/{post_id}", "/post/{post_id}/comment"])
+async def test_trusted_responses_match_validated_responses(
+    async_client: AsyncClient, created_post: dict, created_comment: dict, mocker, url
+):
+    url = url.format(post_id=created_post["id"])
+    trusted = await async_client.get(url)
+    mocker.patch.object(config, "TRUSTED_RESPONSES", False)
+    validated = await async_client.get(url)
+
+    assert trusted.status_code == validated.status_code == status.HTTP_200_OK
+    assert trusted.json() == validated.json()
+
+
+# ----- comment threads ----- #
+@pytest.fixture()
+async def comment_threads(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+) -> dict:
+    """
+    first (1)            second (2)    third (3)
+    ├── reply a (4)
+    │   └── reply a.1 (6)
+    └── reply b (5)
+    """
+    post_id = created_post["id"]
+
+    async def comment(body: str, parent_id: int | None = None) -> dict:
+        return await create_comment(
+            body, post_id, async_client, logged_in_token, parent_id=parent_id
+        )
+
+    comments = {body: await comment(body) for body in ("first", "second", "third")}
+    comments["a"] = await comment("a", comments["first"]["id"])
+    comments["b"] = await comment("b", comments["first"]["id"])
+    comments["a.1"] = await comment("a.1", comments["a"]["id"])
+    return comments
+
+
+@pytest.mark.anyio
+async def test_create_reply(comment_threads: dict):
+    assert comment_threads["a.1"]["parent_id"] == comment_threads["a"]["id"]
+
+
+async def create_reply(
+    post_id: int, parent_id: int, async_client: AsyncClient, logged_in_token: str
+):
+    return await async_client.post(
+        "/comment",
+        json={"body": "Reply", "post_id": post_id, "parent_id": parent_id},
+        headers={"Authorization": f"Bearer {logged_in_token}"},
+    )
+
+
+@pytest.mark.anyio
+async def test_create_reply_missing_parent(
+    async_client: AsyncClient, created_post: dict, logged_in_token: str
+):
+    response = await create_reply(created_post["id"], 99, async_client, logged_in_token)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.anyio
+async def test_create_reply_parent_on_other_post(
+    async_client: AsyncClient, created_comment: dict, logged_in_token: str
+):
+    other_post = await create_post("Other", async_client, logged_in_token)
+
+    response = await create_reply(
+        other_post["id"], created_comment["id"], async_client, logged_in_token
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.anyio
+async def test_get_comment_threads(
+    async_client: AsyncClient, created_post: dict, comment_threads: dict, mocker
+):
+    fetch_all = mocker.spy(read_database, "fetch_all")
+
+    response = await async_client.get(
+        f"/post/{created_post['id']}/threads", params={"limit": 2, "replies": 2}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    page = response.json()
+    assert page["next_cursor"] == comment_threads["second"]["id"]
+    first, second = page["threads"]
+    assert first["comment"] == comment_threads["first"]
+    # depth-first: a reply is followed by its own replies
+    assert first["replies"] == [comment_threads["a"], comment_threads["a.1"]]
+    assert first["reply_count"] == 3
+    assert first["replies_cursor"] is not None
+    assert second == {
+        "comment": comment_threads["second"],
+        "replies": [],
+        "reply_count": 0,
+        "replies_cursor": None,
+    }
+    # top-level comments + replies of all threads
+    assert fetch_all.call_count == 2
+
+
+@pytest.mark.anyio
+async def test_get_comment_threads_next_page(
+    async_client: AsyncClient, created_post: dict, comment_threads: dict
+):
+    response = await async_client.get(
+        f"/post/{created_post['id']}/threads",
+        params={"limit": 2, "after": comment_threads["second"]["id"]},
+    )
+
+    page = response.json()
+    assert [thread["comment"] for thread in page["threads"]] == [
+        comment_threads["third"]
+    ]
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.anyio
+async def test_get_comment_replies_pages(
+    async_client: AsyncClient, comment_threads: dict
+):
+    url = f"/comment/{comment_threads['first']['id']}/replies"
+
+    first_page = (await async_client.get(url, params={"limit": 2})).json()
+    second_page = (
+        await async_client.get(
+            url, params={"limit": 2, "after": first_page["next_cursor"]}
+        )
+    ).json()
+
+    assert first_page["replies"] == [comment_threads["a"], comment_threads["a.1"]]
+    assert second_page == {"replies": [comment_threads["b"]], "next_cursor": None}
+
+
+@pytest.mark.anyio
+async def test_get_comment_replies_of_reply(
+    async_client: AsyncClient, comment_threads: dict
+):
+    response = await async_client.get(f"/comment/{comment_threads['a']['id']}/replies")
+
+    assert response.json() == {
+        "replies": [comment_threads["a.1"]],
+        "next_cursor": None,
+    }
+
+
+@pytest.mark.anyio
+async def test_get_missing_comment_replies(async_client: AsyncClient):
+    response = await async_client.get("/comment/99/replies")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -3,6 +3,7 @@
 # (2) test 시에는 실제 파일을 생성하면 안 된다.
 
 import contextlib
+import hashlib
 import os
 import pathlib
 import tempfile
@@ -11,6 +12,8 @@ import pytest
 from fastapi import status
 from httpx import AsyncClient
 
+from socialapi.routers.upload import content_addressed_name
+
 
 # NOTE: fs fixture: pyfakefs gives
 @pytest.fixture()
@@ -91,3 +94,213 @@ async def test_temp_file_removed_after_upload(
 
     created_temp_file = named_temp_file_spy.spy_return
     assert not os.path.exists(created_temp_file.name)
+
+
+@pytest.mark.anyio
+async def test_upload_uses_content_addressed_name(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    sample_image: pathlib.Path,
+    mock_b2_upload_file,
+):
+    sample_image.write_bytes(b"image content")
+
+    await call_upload_endpoint(async_client, logged_in_token, sample_image)
+
+    expected_name = hashlib.sha256(b"image content").hexdigest() + ".png"
+    assert mock_b2_upload_file.call_args.kwargs["file_name"] == expected_name
+
+
+@pytest.mark.anyio
+async def test_upload_same_content_only_once(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    sample_image: pathlib.Path,
+    mock_b2_upload_file,
+):
+    first = await call_upload_endpoint(async_client, logged_in_token, sample_image)
+    second = await call_upload_endpoint(async_client, logged_in_token, sample_image)
+
+    assert second.status_code == status.HTTP_201_CREATED
+    assert second.json()["file_url"] == first.json()["file_url"]
+    mock_b2_upload_file.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "filename, expected",
+    [("cat.PNG", "abc.png"), ("cat", "abc"), (None, "abc"), ("cat.p/ng", "abc")],
+)
+def test_content_addressed_name(filename, expected):
+    assert content_addressed_name("abc", filename) == expected
+
+
+# ----- direct upload ----- #
+SHA256 = hashlib.sha256(b"image content").hexdigest()
+SHA1 = hashlib.sha1(b"image content").hexdigest()
+UPLOADED_FILE_INFO = {
+    "file_id": "4_z_direct",
+    "size": 13,
+    "content_sha1": SHA1,
+    "file_info": {},
+    "versions": 1,
+    "file_url": "https://fakeurl.com/direct",
+}
+
+
+@pytest.fixture()
+def mock_b2_hash_file(mocker):
+    return mocker.patch("socialapi.routers.upload.b2_hash_file", return_value=SHA256)
+
+
+@pytest.fixture()
+def mock_b2_direct_upload(mocker, mock_b2_hash_file):
+    """info of the uploaded file in B2 -> None (not uploaded yet) until a test sets it"""
+    mocker.patch(
+        "socialapi.routers.upload.b2_get_upload_authorization",
+        return_value={
+            "upload_url": "https://pod.backblaze.com/upload",
+            "authorization_token": "b2-token",
+        },
+    )
+    return mocker.patch("socialapi.routers.upload.b2_get_file_info", return_value=None)
+
+
+async def authorize_upload(async_client: AsyncClient, token: str, **upload):
+    return await async_client.post(
+        "/upload/authorize",
+        json={
+            "sha256": SHA256,
+            "sha1": SHA1,
+            "size": 13,
+            "content_type": "image/png",
+            **upload,
+        },
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+
+async def complete_upload(async_client: AsyncClient, token: str, upload_token: str):
+    return await async_client.post(
+        "/upload/complete",
+        json={"upload_token": upload_token},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+
+@pytest.mark.anyio
+async def test_authorize_upload(
+    async_client: AsyncClient, logged_in_token: str, mock_b2_direct_upload
+):
+    response = await authorize_upload(async_client, logged_in_token, filename="cat.png")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["exists"] is False
+    assert data["upload_url"] == "https://pod.backblaze.com/upload"
+    assert data["headers"]["Authorization"] == "b2-token"
+    assert data["headers"]["X-Bz-File-Name"] == f"{SHA256}.png"
+    # NOTE: B2 verifies the content
+    assert data["headers"]["X-Bz-Content-Sha1"] == SHA1
+
+
+@pytest.mark.anyio
+async def test_authorize_upload_requires_login(async_client: AsyncClient):
+    response = await async_client.post(
+        "/upload/authorize",
+        json={"sha256": SHA256, "sha1": SHA1, "size": 13, "content_type": "image/png"},
+    )
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.anyio
+async def test_authorize_upload_existing_name(
+    async_client: AsyncClient, logged_in_token: str, mock_b2_direct_upload
+):
+    # NOTE: in B2, but not recorded (ex. never completed) -> no new version of it
+    mock_b2_direct_upload.return_value = UPLOADED_FILE_INFO
+
+    response = await authorize_upload(async_client, logged_in_token)
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+
+@pytest.mark.anyio
+async def test_complete_upload_then_authorize_again(
+    async_client: AsyncClient, logged_in_token: str, mock_b2_direct_upload
+):
+    authorization = (await authorize_upload(async_client, logged_in_token)).json()
+    mock_b2_direct_upload.return_value = UPLOADED_FILE_INFO
+
+    response = await complete_upload(
+        async_client, logged_in_token, authorization["upload_token"]
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["file_url"] == "https://fakeurl.com/direct"
+
+    # NOTE: content is known now -> no upload URL is needed anymore
+    response = await authorize_upload(async_client, logged_in_token)
+    assert response.json() == {
+        "exists": True,
+        "file_url": "https://fakeurl.com/direct",
+        "upload_url": None,
+        "headers": None,
+        "upload_token": None,
+    }
+
+
+@pytest.mark.anyio
+async def test_complete_upload_file_missing(
+    async_client: AsyncClient, logged_in_token: str, mock_b2_direct_upload
+):
+    authorization = (await authorize_upload(async_client, logged_in_token)).json()
+
+    response = await complete_upload(
+        async_client, logged_in_token, authorization["upload_token"]
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "mismatch",
+    [{"size": 1024}, {"content_sha1": "0" * 40}, {"versions": 2}],
+)
+async def test_complete_upload_mismatch(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    mock_b2_direct_upload,
+    mismatch: dict,
+):
+    authorization = (await authorize_upload(async_client, logged_in_token)).json()
+    mock_b2_direct_upload.return_value = {**UPLOADED_FILE_INFO, **mismatch}
+
+    response = await complete_upload(
+        async_client, logged_in_token, authorization["upload_token"]
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "does not match" in response.json()["detail"]
+
+
+@pytest.mark.anyio
+async def test_complete_upload_checks_content_hash(
+    async_client: AsyncClient,
+    logged_in_token: str,
+    mock_b2_direct_upload,
+    mock_b2_hash_file,
+):
+    # NOTE: other content uploaded under the claimed sha256 -> never recorded
+    authorization = (await authorize_upload(async_client, logged_in_token)).json()
+    mock_b2_direct_upload.return_value = UPLOADED_FILE_INFO
+    mock_b2_hash_file.return_value = hashlib.sha256(b"other content").hexdigest()
+
+    response = await complete_upload(
+        async_client, logged_in_token, authorization["upload_token"]
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    mock_b2_direct_upload.return_value = None
+    response = await authorize_upload(async_client, logged_in_token)
+    assert response.json()["exists"] is False
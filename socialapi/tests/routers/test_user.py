@@ -2,6 +2,10 @@ import pytest
 from fastapi import BackgroundTasks, status
 from httpx import AsyncClient
 
+from socialapi import ratelimit, security
+from socialapi.bloom import EmailFilter
+from socialapi.tests.helpers import assert_max_queries, create_post, like_post
+
 
 async def register_user(async_client: AsyncClient, email: str, password: str):
     return await async_client.post(
@@ -29,6 +33,53 @@ async def test_register_user_already_exists(
     assert "already exists" in response.json()["detail"]
 
 
+@pytest.mark.anyio
+async def test_register_new_email_skips_existence_query(
+    async_client: AsyncClient, db, mocker
+):
+    emails = EmailFilter()
+    await emails.rebuild(db)
+    mocker.patch("socialapi.routers.user.registered_emails", emails)
+    get_user = mocker.patch("socialapi.routers.user.get_user")
+
+    response = await register_user(async_client, "new@example.net", "1234")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    get_user.assert_not_called()
+    assert emails.might_exist("new@example.net")
+
+
+@pytest.mark.anyio
+async def test_register_duplicate_skips_password_hash(
+    async_client: AsyncClient, registered_user: dict, mocker
+):
+    get_password_hash = mocker.patch("socialapi.routers.user.get_password_hash")
+
+    response = await register_user(
+        async_client, registered_user["email"], registered_user["password"]
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    get_password_hash.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_register_duplicate_missed_by_filter(
+    async_client: AsyncClient, registered_user: dict, mocker
+):
+    # NOTE: ex. registered by another worker -> not in this process's filter
+    mocker.patch(
+        "socialapi.routers.user.registered_emails.might_exist", return_value=False
+    )
+
+    response = await register_user(
+        async_client, registered_user["email"], registered_user["password"]
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "already exists" in response.json()["detail"]
+
+
 @pytest.mark.anyio
 async def test_confirm_user(async_client: AsyncClient, mocker):
     # NOTE: mocker.spy(): allows us to look at a function but not replace its return value or how it works
@@ -113,3 +164,79 @@ async def test_login_user(async_client: AsyncClient, confirmed_user: dict):
     )
 
     assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.anyio
+async def test_login_rate_limited_before_authentication(
+    async_client: AsyncClient, confirmed_user: dict, mocker
+):
+    spy = mocker.spy(security, "get_user")
+    mocker.patch.object(ratelimit.login_limiter, "capacity", 2)
+
+    responses = [
+        await async_client.post(
+            "/token",
+            data={"username": confirmed_user["email"], "password": "wrong"},
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        for _ in range(3)
+    ]
+
+    assert [response.status_code for response in responses] == [
+        status.HTTP_401_UNAUTHORIZED,
+        status.HTTP_401_UNAUTHORIZED,
+        status.HTTP_429_TOO_MANY_REQUESTS,
+    ]
+    assert "Retry-After" in responses[-1].headers
+    # NOTE: rejected request never reached the database (nor bcrypt)
+    assert spy.call_count == 2
+
+
+@pytest.mark.anyio
+async def test_register_rate_limited(async_client: AsyncClient, mocker):
+    mocker.patch.object(ratelimit.register_limiter, "capacity", 1)
+
+    await register_user(async_client, "test@example.net", "1234")
+    response = await register_user(async_client, "other@example.net", "1234")
+
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+
+@pytest.mark.anyio
+async def test_get_user_profile(
+    async_client: AsyncClient, confirmed_user: dict, logged_in_token: str
+):
+    for body in ("Test Post 1", "Test Post 2"):
+        post = await create_post(body, async_client, logged_in_token)
+    await like_post(post["id"], async_client, logged_in_token)
+
+    # NOTE: one row of the stats rollup, no counting
+    with assert_max_queries(1):
+        response = await async_client.get(f"/user/{confirmed_user['id']}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "id": confirmed_user["id"],
+        "posts": 2,
+        "likes_received": 1,
+    }
+
+
+@pytest.mark.anyio
+async def test_get_user_profile_without_activity(
+    async_client: AsyncClient, registered_user: dict
+):
+    response = await async_client.get(f"/user/{registered_user['id']}")
+
+    assert response.json() == {
+        "id": registered_user["id"],
+        "posts": 0,
+        "likes_received": 0,
+    }
+
+
+@pytest.mark.anyio
+async def test_get_user_profile_not_found(async_client: AsyncClient):
+    response = await async_client.get("/user/1234")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
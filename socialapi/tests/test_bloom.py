@@ -0,0 +1,44 @@
+import pytest
+
+from socialapi.bloom import BloomFilter, EmailFilter
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    emails = [f"user{i}@example.net" for i in range(1000)]
+    for email in emails:
+        bloom.add(email)
+
+    # NOTE: no false negatives, few false positives
+    assert all(email in bloom for email in emails)
+    false_positives = sum(f"other{i}@example.net" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+@pytest.mark.anyio
+async def test_email_filter_rebuild(db, registered_user: dict):
+    emails = EmailFilter()
+    # NOTE: not built yet -> every email may exist
+    assert emails.might_exist("new@example.net")
+
+    await emails.rebuild(db)
+
+    assert emails.ready
+    assert emails.might_exist(registered_user["email"])
+    assert not emails.might_exist("new@example.net")
+    emails.add("new@example.net")
+    assert emails.might_exist("new@example.net")
+
+
+@pytest.mark.anyio
+async def test_email_filter_builds_in_background(db, registered_user: dict):
+    emails = EmailFilter()
+
+    emails.start(db)
+    # NOTE: not waited for -> not built yet, every email may exist
+    assert not emails.ready
+    await emails._task
+    await emails.stop()
+
+    assert emails.ready
+    assert not emails.might_exist("new@example.net")
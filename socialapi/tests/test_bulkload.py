@@ -0,0 +1,177 @@
+import json
+import pathlib
+import sqlite3
+
+import pytest
+from sqlalchemy import Column, Index, Integer, MetaData, Table, create_engine
+
+from socialapi import bulkload, cli
+from socialapi.database import metadata, post_table
+
+
+@pytest.fixture()
+def database_path(tmp_path: pathlib.Path) -> pathlib.Path:
+    path = tmp_path / "bulk.db"
+    metadata.create_all(create_engine(f"sqlite:///{path}"))
+    return path
+
+
+@pytest.fixture()
+async def loader(database_path: pathlib.Path):
+    loader = await bulkload.connect_loader(f"sqlite:///{database_path}")
+    yield loader
+    await loader.close()
+
+
+def count(database_path: pathlib.Path, sql: str) -> int:
+    with sqlite3.connect(database_path) as connection:
+        return connection.execute(sql).fetchone()[0]
+
+
+@pytest.mark.anyio
+async def test_seed(loader, database_path: pathlib.Path, mocker):
+    mocker.patch("socialapi.security.get_password_hash", return_value="hashed")
+
+    results = await bulkload.seed(
+        loader, users=3, posts=20, comments=30, likes=40, batch_size=7, random_seed=1
+    )
+
+    assert [(result.table, result.rows) for result in results] == [
+        ("users", 3),
+        ("posts", 20),
+        ("comments", 30),
+        ("likes", 40),
+    ]
+    # every generated row references existing rows
+    assert (
+        count(
+            database_path,
+            "SELECT COUNT(*) FROM likes WHERE post_id NOT IN (SELECT id FROM posts) "
+            "OR user_id NOT IN (SELECT id FROM users)",
+        )
+        == 0
+    )
+
+
+@pytest.mark.anyio
+async def test_refresh_user_stats(loader, database_path: pathlib.Path, mocker):
+    mocker.patch("socialapi.security.get_password_hash", return_value="hashed")
+    await bulkload.seed(loader, users=3, posts=20, likes=40, random_seed=1)
+
+    await bulkload.refresh_user_stats(loader)
+
+    assert count(database_path, "SELECT COUNT(*) FROM user_stats") == 3
+    assert count(database_path, "SELECT SUM(posts) FROM user_stats") == 20
+    assert count(database_path, "SELECT SUM(likes_received) FROM user_stats") == 40
+
+
+@pytest.mark.anyio
+async def test_seed_posts_without_users(loader):
+    with pytest.raises(ValueError, match="users"):
+        await bulkload.seed(loader, posts=1)
+
+
+@pytest.mark.anyio
+async def test_load_rebuilds_deferred_indexes(loader, database_path: pathlib.Path):
+    table = Table(
+        "numbers",
+        MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("value", Integer),
+        Index("ix_numbers_value", "value"),
+    )
+    table.create(create_engine(f"sqlite:///{database_path}"))
+    statements = []
+    execute = loader.execute
+
+    async def record_execute(sql: str):
+        statements.append(sql.split(" ON ")[0].strip())
+        await execute(sql)
+
+    loader.execute = record_execute
+
+    result = await bulkload.load(
+        loader, table, ("id", "value"), ((i, i % 3) for i in range(10)), batch_size=4
+    )
+
+    assert result.rows == 10
+    assert statements == [
+        "DROP INDEX IF EXISTS ix_numbers_value",
+        "CREATE INDEX IF NOT EXISTS ix_numbers_value",
+    ]
+    assert (
+        count(
+            database_path,
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name = 'ix_numbers_value'",
+        )
+        == 1
+    )
+
+
+def test_read_rows_ndjson(tmp_path: pathlib.Path):
+    path = tmp_path / "posts.ndjson"
+    path.write_text(
+        "\n".join(
+            json.dumps(row)
+            for row in [
+                {"id": 1, "body": "first", "user_id": 1},
+                {"id": 2, "body": "second", "user_id": 2},
+            ]
+        )
+    )
+
+    columns, rows = bulkload.read_rows(path, post_table)
+
+    assert columns == ("id", "body", "user_id")
+    assert list(rows) == [(1, "first", 1), (2, "second", 2)]
+
+
+def test_read_rows_csv_converts_types(tmp_path: pathlib.Path):
+    path = tmp_path / "users.csv"
+    path.write_text("id,email,confirmed\n1,a@example.net,true\n2,b@example.net,0\n")
+
+    columns, rows = bulkload.read_rows(path, metadata.tables["users"])
+
+    assert columns == ("id", "email", "confirmed")
+    assert list(rows) == [(1, "a@example.net", True), (2, "b@example.net", False)]
+
+
+def test_read_rows_csv_floats_and_nulls(tmp_path: pathlib.Path):
+    path = tmp_path / "posts.csv"
+    path.write_text(
+        "id,body,user_id,image_url,hot_score\n1,a,1,,2.5\n2,b,1,https://x/1.png,1\n"
+    )
+
+    columns, rows = bulkload.read_rows(path, post_table)
+
+    assert columns == ("id", "body", "user_id", "image_url", "hot_score")
+    assert list(rows) == [
+        (1, "a", 1, None, 2.5),
+        (2, "b", 1, "https://x/1.png", 1.0),
+    ]
+
+
+def test_read_rows_unknown_column(tmp_path: pathlib.Path, mocker):
+    path = tmp_path / "posts.csv"
+    path.write_text("id,title\n1,x\n")
+    open_spy = mocker.spy(pathlib.Path, "open")
+
+    with pytest.raises(ValueError, match="title"):
+        bulkload.read_rows(path, post_table)
+
+    # NOTE: no rows iterator to close it -> closed by `read_rows`
+    assert open_spy.spy_return.closed
+
+
+def test_cli_import(database_path: pathlib.Path, tmp_path: pathlib.Path, capsys):
+    path = tmp_path / "users.csv"
+    path.write_text("email,password,confirmed\na@example.net,x,true\n")
+
+    cli.main(
+        ["import", "users", str(path), "--database-url", f"sqlite:///{database_path}"]
+    )
+
+    assert "users: 1 rows" in capsys.readouterr().out
+    assert count(database_path, "SELECT COUNT(*) FROM users WHERE confirmed") == 1
+    # NOTE: imported users get their (empty) stats
+    assert count(database_path, "SELECT COUNT(*) FROM user_stats") == 1
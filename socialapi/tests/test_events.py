@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from socialapi.events import (
+    DROPPED_FRAME,
+    HEARTBEAT_FRAME,
+    EventBroker,
+    encode_event,
+)
+
+
+async def read_frames(subscriber, count: int, heartbeat: float = 1) -> list[bytes]:
+    frames = []
+    async for frame in subscriber.frames(heartbeat):
+        frames.append(frame)
+        if len(frames) == count:
+            break
+    return frames
+
+
+def test_encode_event():
+    assert encode_event("post_liked", {"post_id": 1}) == (
+        b'event: post_liked\ndata: {"post_id":1}\n\n'
+    )
+
+
+@pytest.mark.anyio
+async def test_publish_fans_out():
+    broker = EventBroker()
+    subscribers = [broker.subscribe() for _ in range(3)]
+
+    await broker.publish("post_created", {"post_id": 1})
+
+    frame = encode_event("post_created", {"post_id": 1})
+    for subscriber in subscribers:
+        assert await read_frames(subscriber, 1) == [frame]
+
+
+@pytest.mark.anyio
+async def test_slow_subscriber_is_dropped():
+    broker = EventBroker(queue_size=2)
+    slow, fast = broker.subscribe(), broker.subscribe()
+
+    for post_id in range(2):
+        await broker.publish("post_created", {"post_id": post_id})
+    await read_frames(fast, 2)
+    await broker.publish("post_created", {"post_id": 2})
+
+    # NOTE: the slow subscriber's stream ends w/ the `dropped` event
+    assert await read_frames(slow, 10) == [DROPPED_FRAME]
+    assert broker.subscribers == {fast}
+    assert await read_frames(fast, 1) == [encode_event("post_created", {"post_id": 2})]
+
+
+@pytest.mark.anyio
+async def test_heartbeat():
+    subscriber = EventBroker().subscribe()
+
+    assert await read_frames(subscriber, 1, heartbeat=0.01) == [HEARTBEAT_FRAME]
+
+
+@pytest.mark.anyio
+async def test_stop_ends_streams():
+    broker = EventBroker()
+    subscriber = broker.subscribe()
+    reader = asyncio.create_task(read_frames(subscriber, 10))
+
+    await broker.stop()
+
+    assert await asyncio.wait_for(reader, 1) == []
+    assert broker.subscribers == set()
+
+
+@pytest.mark.anyio
+async def test_publish_falls_back_to_local_delivery(mocker):
+    broker = EventBroker()
+    broker.backplane = mocker.Mock(notify=mocker.AsyncMock(side_effect=OSError))
+    subscriber = broker.subscribe()
+
+    await broker.publish("post_created", {"post_id": 1})
+
+    assert await read_frames(subscriber, 1) == [
+        encode_event("post_created", {"post_id": 1})
+    ]
@@ -0,0 +1,114 @@
+import contextlib
+
+import pytest
+
+from socialapi import fastread
+from socialapi.database import post_table
+from socialapi.replicas import ReplicaRouter
+from socialapi.routers.post import query_comments_on_post, query_post_and_likes_by_id
+from socialapi.security import UserRow, query_user_by_email
+
+
+class FakeAsyncpgDatabase:
+    """`databases.Database` whose raw connection returns asyncpg-like rows (tuples)"""
+
+    def __init__(self, mocker, rows: list[tuple]) -> None:
+        self.raw_connection = mocker.Mock()
+        self.raw_connection.fetch = mocker.AsyncMock(return_value=rows)
+        self.raw_connection.fetchrow = mocker.AsyncMock(
+            return_value=rows[0] if rows else None
+        )
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        yield self
+
+
+@pytest.fixture()
+def use_fast_path(mocker):
+    mocker.patch("socialapi.fastread.enabled", return_value=True)
+
+
+def test_prepare_renders_asyncpg_sql():
+    prepared = fastread.prepare(query_post_and_likes_by_id)
+
+    assert "$3" in prepared.sql
+    assert prepared.args({"post_id": 5}) == ["thumbnail", "webp", 5]
+    assert prepared.columns[-2:] == ("likes", "thumbnail_url")
+    assert fastread.prepare(query_post_and_likes_by_id) is prepared
+
+
+@pytest.mark.anyio
+async def test_fetch_all_fast_path(mocker, use_fast_path):
+    database = FakeAsyncpgDatabase(mocker, [(1, "first", 1, 2), (2, "second", 1, 3)])
+
+    comments = await fastread.fetch_all(
+        ReplicaRouter(database, []), query_comments_on_post, post_id=1
+    )
+
+    assert comments == [
+        {"id": 1, "body": "first", "post_id": 1, "user_id": 2},
+        {"id": 2, "body": "second", "post_id": 1, "user_id": 3},
+    ]
+    database.raw_connection.fetch.assert_awaited_once_with(
+        fastread.prepare(query_comments_on_post).sql, 1
+    )
+
+
+@pytest.mark.anyio
+async def test_fetch_one_fast_path_row_type(mocker, use_fast_path):
+    database = FakeAsyncpgDatabase(mocker, [(1, "a@example.net", "hashed", True)])
+
+    user = await fastread.fetch_one(
+        ReplicaRouter(database, []),
+        query_user_by_email,
+        row_factory=fastread.row_type(UserRow),
+        email="a@example.net",
+    )
+
+    assert user.email == "a@example.net"
+    assert user.confirmed is True
+
+
+def test_user_row_matches_compiled_columns():
+    # NOTE: the real asyncpg SQL of the query -> each value is the name of its column
+    columns = fastread.prepare(query_user_by_email).columns
+
+    user = fastread.row_type(UserRow)(columns, columns)
+
+    assert user == UserRow(
+        id="id", email="email", password="password", confirmed="confirmed"
+    )
+
+
+def test_row_type_maps_columns_by_name():
+    columns = ("confirmed", "avatar", "password", "email", "id")
+
+    user = fastread.row_type(UserRow)((True, "a.png", "hashed", "a@b.net", 1), columns)
+
+    assert user == UserRow(id=1, email="a@b.net", password="hashed", confirmed=True)
+
+
+@pytest.mark.anyio
+async def test_fetch_one_fast_path_not_found(mocker, use_fast_path):
+    database = FakeAsyncpgDatabase(mocker, [])
+
+    post = await fastread.fetch_one(
+        ReplicaRouter(database, []), query_post_and_likes_by_id, post_id=1
+    )
+
+    assert post is None
+
+
+@pytest.mark.anyio
+async def test_fetch_all_falls_back_to_databases(db, registered_user: dict):
+    # NOTE: tests run on SQLite -> `databases` path
+    await db.execute(
+        post_table.insert().values(body="Test Post", user_id=registered_user["id"])
+    )
+
+    posts = await fastread.fetch_all(
+        ReplicaRouter(db, []), query_post_and_likes_by_id, post_id=1
+    )
+
+    assert [(post.body, post.likes) for post in posts] == [("Test Post", 0)]
@@ -0,0 +1,12 @@
+from benchmarks.bench_importtime import IMPORT_BUDGET_MS, MODULE, import_once
+
+# NOTE: generous (CI machines vary) -> catches a heavy import creeping back in, not small regressions
+BUDGET_MS = 2 * IMPORT_BUDGET_MS
+
+
+def test_main_defers_heavy_imports():
+    # NOTE: fresh interpreter -> modules imported by other tests don't count
+    cumulative, imported = import_once()
+
+    assert imported == []
+    assert cumulative[MODULE] / 1000 < BUDGET_MS
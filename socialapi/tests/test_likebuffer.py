@@ -0,0 +1,99 @@
+import pytest
+from sqlalchemy import func, select
+
+from socialapi import ranking
+from socialapi.database import like_table, post_table, user_stats_table
+from socialapi.events import encode_event, event_broker
+from socialapi.likebuffer import LikeBuffer
+
+
+async def count_likes(db, post_id: int) -> int:
+    return await db.fetch_val(
+        select(func.count()).where(like_table.c.post_id == post_id)
+    )
+
+
+async def hot_score(db, post_id: int) -> float:
+    return await db.fetch_val(
+        select(post_table.c.hot_score).where(post_table.c.id == post_id)
+    )
+
+
+@pytest.fixture()
+async def post_id(db, registered_user: dict) -> int:
+    return await db.execute(
+        post_table.insert().values(body="Test", user_id=registered_user["id"])
+    )
+
+
+@pytest.mark.anyio
+async def test_add_deduplicates(db):
+    buffer = LikeBuffer(db, max_pending=2)
+
+    assert buffer.add(1, 1) is True
+    assert buffer.add(1, 1) is False
+    assert buffer.add(2, 1) is True
+
+    assert len(buffer) == 2
+    assert buffer.full
+
+
+@pytest.mark.anyio
+async def test_flush(db, post_id: int):
+    buffer = LikeBuffer(db)
+    for user_id in (1, 2, 3):
+        buffer.add(user_id, post_id)
+
+    assert await buffer.flush() == 3
+    assert await buffer.flush() == 0
+
+    assert await count_likes(db, post_id) == 3
+    # NOTE: one UPDATE w/ the summed weights
+    assert await hot_score(db, post_id) == 3 * ranking.LIKE_WEIGHT
+    stats = await db.fetch_one(user_stats_table.select())
+    assert (stats.posts, stats.likes_received) == (0, 3)
+    assert len(buffer) == 0
+
+
+@pytest.mark.anyio
+async def test_flush_publishes_events_after_writing(db, post_id: int):
+    buffer = LikeBuffer(db)
+    subscriber = event_broker.subscribe()
+    try:
+        buffer.add(1, post_id)
+        # NOTE: nothing is published while the like is only buffered
+        assert subscriber.queue.empty()
+
+        await buffer.flush()
+    finally:
+        event_broker.unsubscribe(subscriber)
+
+    assert subscriber.queue.get_nowait() == encode_event(
+        "post_liked", {"post_id": post_id, "user_id": 1}
+    )
+
+
+@pytest.mark.anyio
+async def test_flush_failure_keeps_likes(db, post_id: int, mocker):
+    buffer = LikeBuffer(db)
+    buffer.add(1, post_id)
+    mocker.patch.object(buffer, "_write", side_effect=OSError)
+
+    with pytest.raises(OSError):
+        await buffer.flush()
+
+    assert len(buffer) == 1
+    # NOTE: the same like can't be added twice while it waits for the retry
+    assert buffer.add(1, post_id) is False
+
+
+@pytest.mark.anyio
+async def test_stop_flushes_pending_likes(db, post_id: int):
+    buffer = LikeBuffer(db, flush_interval=60)
+    buffer.start()
+    buffer.add(1, post_id)
+
+    await buffer.stop()
+
+    assert await count_likes(db, post_id) == 1
+    assert buffer._task is None
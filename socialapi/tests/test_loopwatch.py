@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+import pytest
+from asgi_correlation_id.context import correlation_id
+
+from socialapi.loopwatch import (
+    LoopWatchdog,
+    RouteContextMiddleware,
+    loop_lag,
+    loop_stalls,
+)
+
+
+@pytest.mark.anyio
+async def test_watchdog_reports_blocking_call(mocker):
+    warning = mocker.patch("socialapi.loopwatch.logger.warning")
+    stalls = loop_stalls.value()
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.05)
+    watchdog.start()
+
+    async def slow_endpoint(scope, receive, send):
+        time.sleep(0.3)  # blocks the loop
+
+    correlation_id.set("request-1")
+    app = RouteContextMiddleware(slow_endpoint)
+    await asyncio.create_task(
+        app({"type": "http", "method": "GET", "path": "/slow"}, None, None)
+    )
+    await watchdog.stop()
+
+    # NOTE: one report per stall, w/ the stack of the blocking call
+    warning.assert_called_once()
+    message = warning.call_args.args[0]
+    assert "route GET /slow" in message
+    assert "request request-1" in message
+    assert "time.sleep(0.3)" in message
+    assert loop_stalls.value() == stalls + 1
+    assert loop_lag.count() > 0
+
+
+@pytest.mark.anyio
+async def test_watchdog_ignores_short_lag(mocker):
+    warning = mocker.patch("socialapi.loopwatch.logger.warning")
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.2)
+    watchdog.start()
+
+    await asyncio.sleep(0.1)
+    time.sleep(0.02)
+    await watchdog.stop()
+
+    warning.assert_not_called()
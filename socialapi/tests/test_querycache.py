@@ -0,0 +1,96 @@
+import databases
+import pytest
+from databases.backends.postgres import PostgresBackend
+from databases.backends.sqlite import SQLiteBackend
+from sqlalchemy import bindparam
+
+from socialapi.database import post_table
+from socialapi.querycache import CachedQuery
+from socialapi.routers.post import query_post_and_likes_by_id
+
+
+@pytest.fixture()
+def query_post_by_id() -> CachedQuery:
+    return CachedQuery(
+        post_table.select().where(post_table.c.id == bindparam("post_id"))
+    )
+
+
+def test_compiles_statement_once_per_dialect(query_post_by_id: CachedQuery, mocker):
+    spy = mocker.spy(query_post_by_id.statement, "compile")
+    connection = PostgresBackend("postgresql://localhost/db").connection()
+
+    first_sql, first_args, _ = connection._compile(query_post_by_id(post_id=1))
+    second_sql, second_args, _ = connection._compile(query_post_by_id(post_id=2))
+
+    assert spy.call_count == 1
+    # NOTE: same SQL string -> asyncpg reuses the prepared statement
+    assert first_sql == second_sql
+    assert "$1" in first_sql
+    assert first_args == [1]
+    assert second_args == [2]
+
+
+# NOTE: `BoundQuery` stands in for a statement inside the backends' private `_compile`
+#   -> a `databases` upgrade must fail here, not in every cached query of the app
+def test_databases_version_is_pinned():
+    assert databases.__version__ == "0.9.0", (
+        "BoundQuery duck-types the private `_compile` of the databases backends, "
+        "check socialapi.querycache against the new version before changing the pin"
+    )
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [PostgresBackend("postgresql://localhost/db"), SQLiteBackend("sqlite:///db")],
+    ids=["postgres", "sqlite"],
+)
+def test_backends_compile_bound_query_like_statement(
+    query_post_by_id: CachedQuery, backend
+):
+    connection = backend.connection()
+
+    bound = connection._compile(query_post_by_id(post_id=1))
+    plain = connection._compile(query_post_by_id.statement.params(post_id=1))
+
+    # -- SQL, args & result columns
+    assert bound[:3] == plain[:3]
+
+
+def test_keeps_literal_values_of_statement():
+    connection = PostgresBackend("postgresql://localhost/db").connection()
+
+    _, args, _ = connection._compile(query_post_and_likes_by_id(post_id=3))
+
+    assert sorted(map(str, args)) == ["3", "thumbnail", "webp"]
+
+
+def test_missing_value_raises(query_post_by_id: CachedQuery):
+    connection = PostgresBackend("postgresql://localhost/db").connection()
+
+    with pytest.raises(Exception, match="post_id"):
+        connection._compile(query_post_by_id())
+
+
+def test_str_does_not_recompile(query_post_by_id: CachedQuery, mocker):
+    str(query_post_by_id(post_id=1))
+    spy = mocker.spy(type(query_post_by_id.statement), "compile")
+
+    assert "posts.id = :post_id" in str(query_post_by_id(post_id=2))
+    assert spy.call_count == 0
+
+
+@pytest.mark.anyio
+async def test_fetch_with_cached_query(
+    db, registered_user: dict, query_post_by_id: CachedQuery
+):
+    for body in ("first", "second"):
+        await db.execute(
+            post_table.insert().values(body=body, user_id=registered_user["id"])
+        )
+
+    first = await db.fetch_one(query_post_by_id(post_id=1))
+    second = await db.fetch_one(query_post_by_id(post_id=2))
+    missing = await db.fetch_one(query_post_by_id(post_id=3))
+
+    assert (first.body, second.body, missing) == ("first", "second", None)
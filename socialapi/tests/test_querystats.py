@@ -0,0 +1,72 @@
+import pytest
+from httpx import AsyncClient
+
+from socialapi.config import config
+from socialapi.database import user_table
+from socialapi.querystats import collect_queries, log_request_stats
+
+
+def user_by_id(user_id: int):
+    return user_table.select().where(user_table.c.id == user_id)
+
+
+@pytest.mark.anyio
+async def test_collect_queries_groups_statements(db):
+    with collect_queries() as outer:
+        with collect_queries() as inner:
+            for user_id in range(3):
+                await db.fetch_one(user_by_id(user_id))
+        await db.fetch_val("SELECT 1")
+
+    # NOTE: same statement w/ other values -> one group
+    assert inner.count == 3
+    assert [count for count, _ in inner.statements.values()] == [3]
+    assert outer.count == 4
+    assert outer.seconds >= inner.seconds > 0
+
+
+@pytest.mark.anyio
+async def test_repeated_queries_warning(db, mocker):
+    mocker.patch.object(config, "DB_REPEATED_QUERY_WARNING", 3)
+    warning = mocker.patch("socialapi.querystats.logger.warning")
+
+    with collect_queries() as stats:
+        for user_id in range(3):
+            await db.fetch_one(user_by_id(user_id))
+    log_request_stats(stats)
+
+    warning.assert_called_once()
+    assert "ran 3 times" in warning.call_args.args[0]
+    assert "FROM users" in warning.call_args.kwargs["extra"]["sql"]
+
+
+@pytest.mark.anyio
+async def test_slow_query_log(db, mocker):
+    mocker.patch.object(config, "DB_SLOW_QUERY_SECONDS", 0)
+    warning = mocker.patch("socialapi.querystats.logger.warning")
+
+    await db.fetch_one(user_by_id(1))
+
+    extra = warning.call_args.kwargs["extra"]
+    assert extra["sql"].startswith("SELECT users.id")
+    assert extra["duration_ms"] >= 0
+
+
+@pytest.mark.anyio
+async def test_server_timing_header(async_client: AsyncClient, created_post: dict):
+    response = await async_client.get(f"/post/{created_post['id']}")
+
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert response.headers["server-timing"].endswith('desc="2 queries"')
+
+
+@pytest.mark.anyio
+async def test_server_timing_header_disabled(
+    async_client: AsyncClient, created_post: dict, mocker
+):
+    # NOTE: off by default in production
+    mocker.patch.object(config, "DB_SERVER_TIMING", False)
+
+    response = await async_client.get(f"/post/{created_post['id']}")
+
+    assert "server-timing" not in response.headers
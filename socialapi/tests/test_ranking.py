@@ -0,0 +1,43 @@
+import pytest
+
+from socialapi import ranking
+from socialapi.config import config
+from socialapi.database import post_table
+
+
+def test_decay_factor():
+    assert ranking.decay_factor(3600, 3600) == 0.5
+    assert ranking.decay_factor(0, 3600) == 1
+
+
+@pytest.mark.anyio
+async def test_decay_hot_scores(db, registered_user: dict):
+    for score in (8.0, 0.015, 0.0):
+        await db.execute(
+            post_table.insert().values(
+                body="Test", user_id=registered_user["id"], hot_score=score
+            )
+        )
+
+    await ranking.decay_hot_scores(config.HOT_SCORE_HALF_LIFE_HOURS * 3600)
+
+    rows = await db.fetch_all(post_table.select().order_by(post_table.c.id))
+    # NOTE: scores below the floor drop to 0
+    assert [row.hot_score for row in rows] == [4.0, 0.0, 0.0]
+
+
+@pytest.mark.anyio
+async def test_bump_hot_score(db, registered_user: dict):
+    post_id = await db.execute(
+        post_table.insert().values(body="Test", user_id=registered_user["id"])
+    )
+
+    await db.execute(ranking.bump_hot_score(post_id, ranking.LIKE_WEIGHT))
+    await db.execute(ranking.bump_hot_score(post_id, ranking.COMMENT_WEIGHT))
+
+    score = await db.fetch_val(
+        post_table.select()
+        .with_only_columns(post_table.c.hot_score)
+        .where(post_table.c.id == post_id)
+    )
+    assert score == ranking.LIKE_WEIGHT + ranking.COMMENT_WEIGHT
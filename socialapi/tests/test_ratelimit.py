@@ -0,0 +1,80 @@
+import pytest
+from fastapi import HTTPException, status
+
+from socialapi import ratelimit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture()
+def memory_backend(mocker, clock: FakeClock) -> ratelimit.InMemoryBackend:
+    backend = ratelimit.InMemoryBackend(clock=clock)
+    mocker.patch("socialapi.ratelimit.backend", backend)
+    return backend
+
+
+@pytest.mark.anyio
+async def test_in_memory_backend_allows_burst_up_to_capacity(
+    memory_backend: ratelimit.InMemoryBackend,
+):
+    results = [await memory_backend.consume("key", 3, 1.0) for _ in range(4)]
+
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert results[-1][1] == pytest.approx(1.0)
+
+
+@pytest.mark.anyio
+async def test_in_memory_backend_refills_over_time(
+    memory_backend: ratelimit.InMemoryBackend, clock: FakeClock
+):
+    for _ in range(2):
+        await memory_backend.consume("key", 2, 0.5)
+    assert (await memory_backend.consume("key", 2, 0.5))[0] is False
+
+    clock.now += 2  # -- 0.5 tokens/sec -> one token
+    assert (await memory_backend.consume("key", 2, 0.5))[0] is True
+    assert (await memory_backend.consume("key", 2, 0.5))[0] is False
+
+
+@pytest.mark.anyio
+async def test_in_memory_backend_keys_are_independent(
+    memory_backend: ratelimit.InMemoryBackend,
+):
+    await memory_backend.consume("a", 1, 1.0)
+
+    assert (await memory_backend.consume("a", 1, 1.0))[0] is False
+    assert (await memory_backend.consume("b", 1, 1.0))[0] is True
+
+
+@pytest.mark.anyio
+async def test_rate_limiter_rejects_by_email(memory_backend: ratelimit.InMemoryBackend):
+    limiter = ratelimit.RateLimiter("test", capacity=1, per_seconds=60)
+    await limiter.check("1.1.1.1", "Bob@example.net")
+
+    with pytest.raises(HTTPException) as exc_info:
+        # NOTE: different IP, same (normalized) email
+        await limiter.check("2.2.2.2", "bob@example.net ")
+
+    assert exc_info.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert exc_info.value.headers["Retry-After"] == "60"
+    assert ratelimit.rate_limit_rejections.value(scope="test", key_type="email") >= 1
+
+
+@pytest.mark.anyio
+async def test_rate_limiter_disabled(memory_backend: ratelimit.InMemoryBackend, mocker):
+    mocker.patch("socialapi.ratelimit.config.RATE_LIMIT_ENABLED", False)
+    limiter = ratelimit.RateLimiter("test", capacity=1, per_seconds=60)
+
+    for _ in range(3):
+        await limiter.check("1.1.1.1", "bob@example.net")
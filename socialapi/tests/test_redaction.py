@@ -0,0 +1,97 @@
+import logging
+
+import pytest
+
+from socialapi.logging_conf import JsonFormatter
+from socialapi.redaction import RedactionFilter, Redactor
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Sending email to bob@example.net", "Sending email to bo*@example.net"),
+        (
+            "GET /confirm/eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOiJib2IifQ.c2ln HTTP/1.1",
+            "GET /confirm/[REDACTED] HTTP/1.1",
+        ),
+        ("Authorization: Bearer abc.def-123", "Authorization: Bearer [REDACTED]"),
+        ("password=1234&next=/", "password=[REDACTED]&next=/"),
+        ('{"api_key": "secret-key", "n": 1}', '{"api_key": "[REDACTED]", "n": 1}'),
+        ("Creating access token", "Creating access token"),
+        # NOTE: redacting twice changes nothing
+        ("bo*@example.net", "bo*@example.net"),
+    ],
+)
+def test_redact(text: str, expected: str):
+    assert Redactor(email_visible_chars=2).redact(text) == expected
+
+
+@pytest.fixture()
+def records(mocker):
+    """logger w/ 2 handlers sharing one redaction filter -> the records they got"""
+    logger = logging.getLogger("socialapi.tests.redaction")
+    redaction = RedactionFilter()
+    handled = []
+    handlers = [logging.Handler(), logging.Handler()]
+    for handler in handlers:
+        handler.emit = handled.append
+        handler.addFilter(redaction)
+    mocker.patch.object(logger, "handlers", handlers)
+    mocker.patch.object(logger, "propagate", False)
+    logger.setLevel(logging.DEBUG)
+    redact_record = mocker.spy(redaction.redactor, "redact_record")
+    return logger, handled, redact_record
+
+
+def test_filter_redacts_each_record_once(records):
+    logger, handled, redact_record = records
+
+    logger.info(
+        "Sending email to %s",
+        "bob@example.net",
+        extra={"email": "bob@example.net", "upload_token": "abc", "count": 3},
+    )
+
+    first, second = handled
+    assert first is second
+    redact_record.assert_called_once()
+    assert first.getMessage() == "Sending email to ***@example.net"
+    assert first.email == "***@example.net"
+    assert first.upload_token == "[REDACTED]"
+    assert first.count == 3
+
+
+def test_filter_redacts_interleaved_records_once(records):
+    logger, handled, redact_record = records
+    first = logger.makeRecord(
+        logger.name, logging.INFO, "", 0, "from %s", ("bob@example.net",), None
+    )
+    second = logger.makeRecord(logger.name, logging.INFO, "", 0, "other", (), None)
+    (redaction,) = logger.handlers[0].filters
+
+    # NOTE: ex. another thread's record between the handlers of the first one
+    for record in (first, second, first, second):
+        redaction.filter(record)
+
+    assert redact_record.call_count == 2
+    assert first.getMessage() == "from ***@example.net"
+
+
+def test_filter_redacts_tracebacks(records):
+    logger, handled, _ = records
+
+    try:
+        raise ValueError("Sending to bob@example.net failed")
+    except ValueError:
+        logger.exception("Sending email failed", stack_info=True)
+    try:
+        raise ValueError("api_key=secret-key")
+    except ValueError:
+        logger.exception("Calling the API failed")
+
+    record = handled[0]
+    assert "***@example.net failed" in record.exc_text
+    assert "bob@example.net" not in logging.Formatter().format(record)
+    assert "bob@example.net" not in JsonFormatter().format(record)
+    assert "api_key=[REDACTED]" in handled[-1].exc_text
+    assert "secret-key" not in JsonFormatter().format(handled[-1])
@@ -0,0 +1,149 @@
+import pathlib
+
+import pytest
+from databases import Database
+from sqlalchemy import create_engine
+from starlette.requests import Request
+
+from socialapi.database import metadata, post_table, user_table
+from socialapi.replicas import (
+    STICKY_COOKIE,
+    ReadYourWritesMiddleware,
+    ReplicaRouter,
+    _read_from_primary,
+    mark_write,
+)
+
+# NOTE: every database is a separate SQLite file -> "replicas" that never replicate,
+# so the content of a row tells which database served the query
+
+
+async def create_database(path: pathlib.Path, post_body: str) -> Database:
+    metadata.create_all(create_engine(f"sqlite:///{path}"))
+    database = Database(f"sqlite:///{path}")
+    await database.connect()
+    await database.execute(user_table.insert().values(id=1, email="a@example.net"))
+    await database.execute(post_table.insert().values(body=post_body, user_id=1))
+    return database
+
+
+@pytest.fixture()
+async def router(tmp_path: pathlib.Path):
+    primary = await create_database(tmp_path / "primary.db", "primary")
+    replicas = [
+        await create_database(tmp_path / f"replica{i}.db", f"replica{i}")
+        for i in range(2)
+    ]
+    yield ReplicaRouter(primary, replicas, cooldown=30)
+    for database in (primary, *replicas):
+        await database.disconnect()
+
+
+async def read_body(router: ReplicaRouter) -> str:
+    return (await router.fetch_one(post_table.select())).body
+
+
+@pytest.mark.anyio
+async def test_reads_rotate_over_replicas(router: ReplicaRouter):
+    bodies = [await read_body(router) for _ in range(4)]
+
+    assert bodies == ["replica0", "replica1", "replica0", "replica1"]
+
+
+@pytest.mark.anyio
+async def test_reads_without_replicas_use_primary(router: ReplicaRouter):
+    router = ReplicaRouter(router.primary, [])
+
+    assert await read_body(router) == "primary"
+
+
+@pytest.mark.anyio
+async def test_unhealthy_replica_is_skipped(router: ReplicaRouter, mocker):
+    mocker.patch.object(
+        router.replicas[0], "fetch_one", side_effect=OSError("connection refused")
+    )
+
+    # NOTE: failed query is retried on the primary, then replica0 is skipped
+    bodies = [await read_body(router) for _ in range(3)]
+
+    assert bodies == ["primary", "replica1", "replica1"]
+
+
+@pytest.mark.anyio
+async def test_read_your_writes_uses_primary(router: ReplicaRouter):
+    token = _read_from_primary.set(True)
+    try:
+        assert await read_body(router) == "primary"
+    finally:
+        _read_from_primary.reset(token)
+
+
+# ----- middleware ----- #
+async def call_middleware(
+    router: ReplicaRouter, method: str, client: str = "1.2.3.4", headers=()
+):
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["primary"] = _read_from_primary.get()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "client": (client, 1234),
+        "headers": list(headers),
+    }
+    await ReadYourWritesMiddleware(app, router)(scope, None, send)
+    return seen["primary"], sent[0]["headers"]
+
+
+@pytest.mark.anyio
+async def test_middleware_sticks_to_primary_after_write(router: ReplicaRouter):
+    assert (await call_middleware(router, "GET"))[0] is False
+
+    _, headers = await call_middleware(router, "POST")
+    assert any(value.startswith(STICKY_COOKIE.encode()) for _, value in headers)
+
+    assert (await call_middleware(router, "GET"))[0] is True
+    assert (await call_middleware(router, "GET", client="5.6.7.8"))[0] is False
+
+
+@pytest.mark.anyio
+async def test_middleware_sticky_cookie(router: ReplicaRouter):
+    primary, _ = await call_middleware(
+        router, "GET", headers=[(b"cookie", f"{STICKY_COOKIE}=1".encode())]
+    )
+
+    assert primary is True
+
+
+@pytest.mark.anyio
+async def test_middleware_get_marked_as_write(router: ReplicaRouter):
+    async def confirm(scope, receive, send):
+        # NOTE: like `Depends(mark_write)` of `GET /confirm/{token}`
+        await mark_write(Request(scope))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "client": ("1.2.3.4", 1234),
+        "headers": [],
+    }
+    await ReadYourWritesMiddleware(confirm, router)(scope, None, send)
+
+    assert any(
+        value.startswith(STICKY_COOKIE.encode()) for _, value in sent[0]["headers"]
+    )
+    assert (await call_middleware(router, "GET"))[0] is True
@@ -0,0 +1,32 @@
+from fastapi.responses import ORJSONResponse
+
+from socialapi.config import config
+from socialapi.models.post import Comment
+from socialapi.responses import row_as, rows_as, trusted_response
+
+
+def test_rows_as_keeps_model_fields_only():
+    row = {
+        "id": 1,
+        "body": "Test",
+        "post_id": 2,
+        "parent_id": None,
+        "user_id": 3,
+        "secret": "x",
+    }
+
+    assert rows_as(Comment, [row]) == [
+        {"body": "Test", "post_id": 2, "parent_id": None, "id": 1, "user_id": 3}
+    ]
+    assert row_as(Comment, row) == rows_as(Comment, [row])[0]
+    assert row_as(Comment, None) is None
+
+
+def test_trusted_response(mocker):
+    response = trusted_response([{"id": 1}])
+
+    assert isinstance(response, ORJSONResponse)
+    assert response.body == b'[{"id":1}]'
+
+    mocker.patch.object(config, "TRUSTED_RESPONSES", False)
+    assert trusted_response([{"id": 1}]) == [{"id": 1}]
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from socialapi.scheduler import PeriodicJob, Scheduler, claim_run
+
+
+@pytest.mark.anyio
+async def test_claim_run(db):
+    # first claim only starts counting
+    assert await claim_run(db, "job", 60, now=1000) is None
+    assert await claim_run(db, "job", 60, now=1030) is None
+
+    assert await claim_run(db, "job", 60, now=1090) == 90
+    # NOTE: e.g. another worker at the same time -> already claimed
+    assert await claim_run(db, "job", 60, now=1090) is None
+
+
+@pytest.mark.anyio
+async def test_run_once(db, mocker):
+    func = mocker.AsyncMock()
+    job = PeriodicJob("job", 0, func)
+    scheduler = Scheduler(db)
+
+    await scheduler.run_once(job)  # first claim
+    assert await scheduler.run_once(job) is True
+
+    func.assert_awaited()
+    assert func.await_args.args[0] >= 0
+
+
+@pytest.mark.anyio
+async def test_start_and_stop(db, mocker):
+    scheduler = Scheduler(db)
+    run_once = mocker.patch.object(scheduler, "run_once", side_effect=OSError)
+    scheduler.add_job("job", 0.01, mocker.AsyncMock())
+
+    scheduler.start()
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if run_once.call_count >= 2:
+            break
+    await scheduler.stop()
+
+    # NOTE: a failing run is logged, the loop goes on
+    assert run_once.call_count >= 2
+    assert scheduler._tasks == []
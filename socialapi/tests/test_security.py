@@ -150,3 +150,19 @@ async def test_get_current_user_wrong_type_token(registered_user: dict):
 
     with pytest.raises(security.HTTPException):
         await security.get_current_user(token)
+
+
+def test_create_upload_token():
+    token = security.create_upload_token("123", {"sha256": "abc", "size": 1})
+
+    assert {"sub": "123", "type": "upload", "sha256": "abc", "size": 1}.items() <= (
+        security.get_payload_for_token_type(token, "upload").items()
+    )
+
+
+def test_upload_token_is_not_access_token():
+    token = security.create_upload_token("123", {"sha256": "abc", "size": 1})
+
+    with pytest.raises(security.HTTPException) as exc_info:
+        security.get_subject_for_token_type(token, "access")
+    assert "Token has incorrect type, expected 'access'" == exc_info.value.detail
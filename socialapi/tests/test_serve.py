@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from socialapi import serve
+from socialapi.config import config
+from socialapi.database import pool_size
+
+
+def test_available_cores_cgroup_quota(mocker):
+    mocker.patch("os.sched_getaffinity", return_value={0, 1, 2, 3, 4, 5, 6, 7})
+    mocker.patch("socialapi.serve._cgroup_cpu_quota", return_value=2.5)
+
+    # NOTE: a container w/ 2.5 CPUs on an 8-core host -> 3 workers, not 8
+    assert serve.available_cores() == 3
+
+
+def test_default_workers_from_env(mocker):
+    mocker.patch.dict(os.environ, {"WEB_CONCURRENCY": "5"})
+
+    assert serve.default_workers() == 5
+
+
+def test_build_config():
+    args = serve.build_parser().parse_args(
+        ["--workers", "4", "--backlog", "512", "--keep-alive", "30"]
+    )
+
+    uvicorn_config = serve.build_config(args)
+
+    assert uvicorn_config.workers == 4
+    assert uvicorn_config.backlog == 512
+    assert uvicorn_config.timeout_keep_alive == 30
+    assert uvicorn_config.loop == "uvloop"
+    assert uvicorn_config.http == "httptools"
+
+
+@pytest.mark.parametrize(
+    "max_connections, workers, backplane, expected",
+    [
+        (0, 4, False, config.DB_POOL_SIZE),  # no budget -> fixed pool per worker
+        (20, 4, False, 5),
+        (20, 4, True, 4),  # one per worker is the backplane's
+        (4, 4, False, 1),
+    ],
+)
+def test_pool_size(mocker, max_connections, workers, backplane, expected):
+    mocker.patch.object(config, "DB_MAX_CONNECTIONS", max_connections)
+    mocker.patch.object(config, "WORKERS", workers)
+    mocker.patch.object(config, "EVENTS_BACKPLANE", backplane)
+
+    assert pool_size() == expected
+
+
+@pytest.mark.parametrize("backplane", [False, True])
+def test_pool_size_over_budget(mocker, backplane):
+    mocker.patch.object(config, "DB_MAX_CONNECTIONS", 4)
+    mocker.patch.object(config, "WORKERS", 4 if backplane else 5)
+    mocker.patch.object(config, "EVENTS_BACKPLANE", backplane)
+
+    # NOTE: never silently more connections than DB_MAX_CONNECTIONS
+    with pytest.raises(ValueError, match="too small"):
+        pool_size()
+
+
+@pytest.mark.parametrize(
+    "max_connections, backplane, expected",
+    [(0, False, 8), (20, False, 8), (6, False, 6), (6, True, 3)],
+)
+def test_cap_workers(mocker, max_connections, backplane, expected):
+    mocker.patch.object(config, "DB_MAX_CONNECTIONS", max_connections)
+    mocker.patch.object(config, "EVENTS_BACKPLANE", backplane)
+
+    assert serve.cap_workers(8) == expected
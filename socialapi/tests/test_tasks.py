@@ -1,15 +1,38 @@
+import asyncio
+
 import httpx
 import pytest
 from databases import Database
 from fastapi import status
 
-from socialapi.database import post_table
+from socialapi import imagegen
+from socialapi.database import post_image_table, post_table
+from socialapi.libs.imaging import render_variants
 from socialapi.tasks import (
     APIResponseError,
     _generate_cute_creature_api,
     generate_and_add_to_post,
+    process_image_variants,
     send_simple_email,
 )
+from socialapi.tests.helpers import make_image
+
+
+@pytest.fixture(autouse=True)
+def reset_image_generator(mocker):
+    # NOTE: don't wait for backoff in tests & start every test with a closed circuit
+    mocker.patch("socialapi.imagegen.BACKOFF_BASE_SECONDS", 0)
+    imagegen.image_generator.breaker.reset()
+    yield
+    imagegen.image_generator.breaker.reset()
+
+
+def api_response(status_code: int, json_data: dict | None = None) -> httpx.Response:
+    return httpx.Response(
+        status_code=status_code,
+        json=json_data,
+        request=httpx.Request("POST", "//"),
+    )
 
 
 # ----- email ----- #
@@ -101,3 +124,212 @@ async def test_generate_and_add_to_post_success(
         query
     )  #  when select, db.fetch_all() / db.fecth_one()
     assert updated_post.image_url == json_data["output_url"]
+
+
+@pytest.mark.anyio
+async def test_generate_and_add_to_post_emails_before_variants(
+    mock_httpx_client, created_post: dict, confirmed_user: dict, db: Database, mocker
+):
+    mock_httpx_client.post.return_value = httpx.Response(
+        status_code=status.HTTP_200_OK,
+        json={"output_url": "https://example.com/image.jpg"},
+        request=httpx.Request("POST", "//"),
+    )
+    emailed_first = []
+
+    async def process_image_variants(database, source_url):
+        called_urls = [call.args[0] for call in mock_httpx_client.post.call_args_list]
+        emailed_first.append(any("mailgun" in url for url in called_urls))
+
+    mocker.patch("socialapi.tasks.process_image_variants", process_image_variants)
+
+    await generate_and_add_to_post(
+        confirmed_user["email"], created_post["id"], "/post/1", db, "A cat"
+    )
+
+    # NOTE: the user is notified w/o waiting for the variants
+    assert emailed_first == [True]
+
+
+@pytest.mark.anyio
+async def test_generate_and_add_to_post_reuses_cached_prompt(
+    mock_httpx_client, created_post: dict, confirmed_user: dict, db: Database
+):
+    json_data = {"output_url": "https://example.com/image.jpg"}
+    mock_httpx_client.post.return_value = api_response(status.HTTP_200_OK, json_data)
+
+    await generate_and_add_to_post(
+        confirmed_user["email"], created_post["id"], "/post/1", db, "A cat"
+    )
+    mock_httpx_client.post.reset_mock()
+
+    # NOTE: same prompt (except case & whitespace) -> no DeepAI call, only the email
+    await generate_and_add_to_post(
+        confirmed_user["email"], created_post["id"], "/post/1", db, " a  CAT"
+    )
+
+    called_urls = [call.args[0] for call in mock_httpx_client.post.call_args_list]
+    assert not any("deepai" in url for url in called_urls)
+    query = post_table.select().where(post_table.c.id == created_post["id"])
+    updated_post = await db.fetch_one(query)
+    assert updated_post.image_url == json_data["output_url"]
+    assert updated_post.image_status == "completed"
+
+
+@pytest.mark.anyio
+async def test_generate_and_add_to_post_retries_server_error(
+    mock_httpx_client, created_post: dict, confirmed_user: dict, db: Database
+):
+    json_data = {"output_url": "https://example.com/image.jpg"}
+    mock_httpx_client.post.side_effect = [
+        api_response(status.HTTP_503_SERVICE_UNAVAILABLE),
+        api_response(status.HTTP_200_OK, json_data),
+        api_response(status.HTTP_200_OK),  # -- email
+    ]
+
+    result = await generate_and_add_to_post(
+        confirmed_user["email"], created_post["id"], "/post/1", db, "A cat"
+    )
+
+    assert result == json_data
+
+
+@pytest.mark.anyio
+async def test_generate_and_add_to_post_failure(
+    mock_httpx_client, created_post: dict, confirmed_user: dict, db: Database
+):
+    mock_httpx_client.post.side_effect = [
+        api_response(status.HTTP_400_BAD_REQUEST),
+        api_response(status.HTTP_200_OK),  # -- error email
+    ]
+
+    await generate_and_add_to_post(
+        confirmed_user["email"], created_post["id"], "/post/1", db, "A cat"
+    )
+
+    # NOTE: 4xx isn't retried -> one API call (+ one error email)
+    called_urls = [call.args[0] for call in mock_httpx_client.post.call_args_list]
+    assert len([url for url in called_urls if "deepai" in url]) == 1
+    query = post_table.select().where(post_table.c.id == created_post["id"])
+    updated_post = await db.fetch_one(query)
+    assert updated_post.image_url is None
+    assert updated_post.image_status == "failed"
+
+
+# ----- image generation internals ----- #
+def test_circuit_breaker_opens_and_half_opens():
+    now = [0.0]
+    breaker = imagegen.CircuitBreaker(
+        failure_threshold=2, reset_timeout=10, clock=lambda: now[0]
+    )
+
+    breaker.record_failure()
+    breaker.before_call()  # -- still closed
+    breaker.record_failure()
+    with pytest.raises(imagegen.CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 10
+    breaker.before_call()  # -- half-open: one trial call is allowed
+    with pytest.raises(imagegen.CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+@pytest.mark.anyio
+async def test_rejected_prompts_do_not_open_circuit_breaker():
+    breaker = imagegen.CircuitBreaker(failure_threshold=2)
+
+    async def reject():
+        raise APIResponseError("API request failed with status code 400")
+
+    for _ in range(3):
+        with pytest.raises(APIResponseError):
+            await imagegen.call_with_retries(reject, lambda err: False, breaker)
+
+    assert breaker.state == "closed"
+
+
+@pytest.mark.anyio
+async def test_cancelled_trial_call_frees_circuit_breaker():
+    now = [0.0]
+    breaker = imagegen.CircuitBreaker(
+        failure_threshold=1, reset_timeout=10, clock=lambda: now[0]
+    )
+    breaker.record_failure()
+    now[0] = 10
+
+    async def cancelled():
+        raise asyncio.CancelledError
+
+    with pytest.raises(asyncio.CancelledError):
+        await imagegen.call_with_retries(cancelled, lambda err: True, breaker)
+
+    breaker.before_call()  # -- half-open again: the next trial call is allowed
+
+
+def test_prompt_hash_normalizes_prompt():
+    assert imagegen.prompt_hash("A  cat ") == imagegen.prompt_hash("a cat")
+    assert imagegen.prompt_hash("a cat") != imagegen.prompt_hash("a dog")
+
+
+# ----- image variants ----- #
+@pytest.fixture()
+def mock_image_processing(mocker, mock_httpx_client):
+    mock_httpx_client.get = mocker.AsyncMock(
+        return_value=httpx.Response(
+            status_code=status.HTTP_200_OK,
+            content=make_image((800, 400)),
+            request=httpx.Request("GET", "//"),
+        )
+    )
+
+    # NOTE: render in this process (no process pool in tests) & don't upload anywhere
+    async def render_in_process(data: bytes):
+        return render_variants(data)
+
+    mocker.patch(
+        "socialapi.libs.imaging.render_variants_in_pool", side_effect=render_in_process
+    )
+    return mocker.patch(
+        "socialapi.libs.b2.b2_upload_bytes",
+        side_effect=lambda data, file_name, content_type: f"https://cdn/{file_name}",
+    )
+
+
+@pytest.mark.anyio
+async def test_process_image_variants(mock_image_processing, db: Database):
+    await process_image_variants(db, "https://example.com/image.jpg")
+
+    rows = await db.fetch_all(post_image_table.select())
+    thumbnail = next(
+        row for row in rows if (row.variant, row.format) == ("thumbnail", "webp")
+    )
+    assert (thumbnail.width, thumbnail.height) == (320, 160)
+    assert thumbnail.source_url == "https://example.com/image.jpg"
+    assert thumbnail.url.startswith("https://cdn/variants/")
+
+
+@pytest.mark.anyio
+async def test_process_image_variants_only_once(mock_image_processing, db: Database):
+    await process_image_variants(db, "https://example.com/image.jpg")
+    upload_count = mock_image_processing.call_count
+
+    await process_image_variants(db, "https://example.com/image.jpg")
+
+    assert mock_image_processing.call_count == upload_count
+
+
+@pytest.mark.anyio
+async def test_process_image_variants_download_error(
+    mock_image_processing, mock_httpx_client, db: Database
+):
+    mock_httpx_client.get.return_value = httpx.Response(
+        status_code=status.HTTP_404_NOT_FOUND, request=httpx.Request("GET", "//")
+    )
+
+    await process_image_variants(db, "https://example.com/image.jpg")
+
+    assert await db.fetch_all(post_image_table.select()) == []
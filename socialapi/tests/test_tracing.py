@@ -0,0 +1,152 @@
+import json
+import time
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from socialapi import tracing
+from socialapi.config import config
+from socialapi.main import app
+
+# NOTE: optional dependency (`poetry install -E tracing`)
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (  # noqa: E402
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import set_span_in_context  # noqa: E402
+
+from socialapi.tailsampling import (  # noqa: E402
+    FileSpanExporter,
+    TailSamplingProcessor,
+)
+
+
+@pytest.fixture()
+def exporter(mocker):
+    mocker.patch.object(config, "TRACING_ENABLED", True)
+    mocker.patch.object(config, "TRACING_SAMPLE_RATE", 1.0)
+    exporter = InMemorySpanExporter()
+    tracing.configure_tracing(exporter)
+    yield exporter
+    tracing.shutdown_tracing()
+
+
+@pytest.fixture()
+async def traced_client(exporter) -> AsyncClient:
+    async with AsyncClient(
+        transport=ASGITransport(app=tracing.TracingMiddleware(app)),
+        base_url="http://test",
+    ) as client:
+        yield client
+
+
+def finished_spans(exporter) -> dict:
+    tracing._provider.force_flush()
+    return {span.name: span for span in exporter.get_finished_spans()}
+
+
+def sampled_tracer(exporter, slow_seconds: float = 0.05, sample_rate: float = 0.0):
+    provider = TracerProvider()
+    provider.add_span_processor(
+        TailSamplingProcessor(
+            SimpleSpanProcessor(exporter), slow_seconds, sample_rate=sample_rate
+        )
+    )
+    return provider.get_tracer("test")
+
+
+def test_file_exporter(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = FileSpanExporter(str(path))
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+    with provider.get_tracer("test").start_as_current_span("first"):
+        pass
+    provider.shutdown()
+
+    assert exporter.out.closed
+    (line,) = path.read_text().splitlines()
+    assert json.loads(line)["name"] == "first"
+
+
+def test_tail_sampling_keeps_slow_and_failed_traces():
+    exporter = InMemorySpanExporter()
+    tracer = sampled_tracer(exporter)
+
+    with tracer.start_as_current_span("fast"):
+        with tracer.start_as_current_span("fast child"):
+            pass
+    with tracer.start_as_current_span("slow"):
+        with tracer.start_as_current_span("slow child"):
+            time.sleep(0.06)
+    with pytest.raises(ValueError):
+        with tracer.start_as_current_span("failed"):
+            with tracer.start_as_current_span("failed child"):
+                raise ValueError
+
+    names = {span.name for span in exporter.get_finished_spans()}
+    assert names == {"slow", "slow child", "failed", "failed child"}
+
+
+def test_tail_sampling_late_spans_follow_their_trace():
+    exporter = InMemorySpanExporter()
+    tracer = sampled_tracer(exporter, slow_seconds=0)  # -- every trace is kept
+
+    root = tracer.start_span("request")
+    with tracer.start_as_current_span(
+        "task", context=set_span_in_context(root)
+    ) as task:
+        root.end()  # -- the root ends first, ex. a task outliving the request
+    assert task.end_time is not None
+
+    names = [span.name for span in exporter.get_finished_spans()]
+    assert names == ["request", "task"]
+
+
+@pytest.mark.anyio
+async def test_request_and_database_spans(
+    exporter, traced_client: AsyncClient, created_post: dict
+):
+    exporter.clear()
+
+    await traced_client.get(f"/post/{created_post['id']}")
+
+    spans = finished_spans(exporter)
+    request = spans["GET /post/{post_id}"]
+    assert request.attributes["http.response.status_code"] == 200
+    assert [event.name for event in request.events] == ["response.sent"]
+    select = spans["SELECT"]
+    assert select.parent.span_id == request.context.span_id
+    assert select.attributes["db.system"] == "sqlite"
+
+
+@pytest.mark.anyio
+async def test_request_continues_incoming_trace(exporter, traced_client: AsyncClient):
+    trace_id = "0af7651916cd43dd8448eb211c80319c"
+
+    await traced_client.get(
+        "/post", headers={"traceparent": f"00-{trace_id}-b7ad6b7169203331-01"}
+    )
+
+    request = finished_spans(exporter)["GET /post"]
+    assert f"{request.context.trace_id:032x}" == trace_id
+
+
+@pytest.mark.anyio
+async def test_background_task_spans_in_request_trace(
+    exporter, traced_client: AsyncClient
+):
+    await traced_client.post(
+        "/register", json={"email": "test@example.net", "password": "1234"}
+    )
+
+    spans = finished_spans(exporter)
+    request = spans["POST /register"]
+    # NOTE: confirmation email is sent by a background task
+    email = spans["POST api.mailgun.net"]
+    assert email.context.trace_id == request.context.trace_id
+    assert email.attributes["http.response.status_code"] == 200
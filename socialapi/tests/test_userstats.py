@@ -0,0 +1,38 @@
+import pytest
+
+from socialapi.database import like_table, post_table, user_stats_table
+from socialapi.userstats import bump_user_stats, rebuild_user_stats
+
+
+async def user_stats(db, user_id: int) -> tuple[int, int]:
+    row = await db.fetch_one(
+        user_stats_table.select().where(user_stats_table.c.user_id == user_id)
+    )
+    return row.posts, row.likes_received
+
+
+@pytest.mark.anyio
+async def test_bump_user_stats(db, registered_user: dict):
+    user_id = registered_user["id"]
+
+    # NOTE: first bump inserts the row, the next ones add to it
+    await db.execute(bump_user_stats(user_id, posts=1))
+    await db.execute(bump_user_stats(user_id, posts=1, likes_received=3))
+
+    assert await user_stats(db, user_id) == (2, 3)
+
+
+@pytest.mark.anyio
+async def test_rebuild_user_stats(db, registered_user: dict):
+    user_id = registered_user["id"]
+    for _ in range(2):
+        post_id = await db.execute(
+            post_table.insert().values(body="Test", user_id=user_id)
+        )
+    await db.execute(like_table.insert().values(post_id=post_id, user_id=user_id))
+    await db.execute(bump_user_stats(user_id, posts=100))  # out of date
+
+    for statement in rebuild_user_stats():
+        await db.execute(statement)
+
+    assert await user_stats(db, user_id) == (2, 1)
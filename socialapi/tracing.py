@@ -0,0 +1,160 @@
+import functools
+import logging
+from contextlib import contextmanager
+
+from asgi_correlation_id.context import correlation_id
+
+from socialapi.config import config
+
+logger = logging.getLogger(__name__)
+
+"""
+[ tracing (OpenTelemetry) ]
+TRACING_ENABLED=true (+ `poetry install -E tracing`) -> spans of
+    request (`TracingMiddleware`) > DB statements (`querystats.timed_query`) / outbound HTTP (`tasks`)
+    / B2 uploads (`libs.b2`) / background tasks (`traced`)
+- background tasks run in the request's context -> their spans are children of the request span
+    - NOTE: Starlette runs them before the ASGI call returns -> the request span ends after them,
+      its `response.sent` event marks the moment the client got the response
+- incoming `traceparent` headers continue the caller's trace
+- tail sampling & exporters (OTLP / JSON lines file) -> `socialapi.tailsampling` (OpenTelemetry SDK)
+- disabled -> `span()` is a no-op, OpenTelemetry isn't even imported
+"""
+
+TRACER_NAME = "socialapi"
+
+_provider = None  # -- `TracerProvider` of `configure_tracing()`
+
+
+class _NoSpan:
+    """stands in for a span when tracing is disabled"""
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def add_event(self, name: str, attributes: dict | None = None) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+    def set_status(self, status) -> None:
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+def _tracer():
+    from opentelemetry import trace
+
+    if _provider is not None:
+        return _provider.get_tracer(TRACER_NAME)
+    return trace.get_tracer(TRACER_NAME)
+
+
+@contextmanager
+def span(
+    name: str, kind: str = "internal", attributes: dict | None = None, context=None
+):
+    """
+    child span of the current span (-> current span inside the block)
+        - an exception -> recorded on the span, status ERROR
+    """
+    if not config.TRACING_ENABLED:
+        yield NO_SPAN
+        return
+
+    from opentelemetry.trace import SpanKind
+
+    with _tracer().start_as_current_span(
+        name, context=context, kind=SpanKind[kind.upper()], attributes=attributes
+    ) as current:
+        yield current
+
+
+def traced(name: str):
+    """span around an async function (ex. a background task)"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def configure_tracing(exporter=None) -> None:
+    """tracer provider w/ tail sampling & the configured exporter (`exporter` -> instead of it, ex. in tests)"""
+    global _provider
+    from socialapi.tailsampling import build_tracer_provider
+
+    _provider = build_tracer_provider(exporter)
+    logger.info(f"Tracing enabled, exporting to {config.TRACING_EXPORTER}")
+
+
+def shutdown_tracing() -> None:
+    """export the remaining spans"""
+    global _provider
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+class TracingMiddleware:
+    """
+    pure ASGI middleware -> one server span per request
+        - NOTE: inside CorrelationIdMiddleware (-> the span has the request's correlation id)
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        from opentelemetry.propagate import extract
+        from opentelemetry.trace import Status, StatusCode
+
+        headers = {
+            name.decode("latin-1"): value.decode("latin-1")
+            for name, value in scope["headers"]
+        }
+        with span(
+            f"{scope['method']} {scope['path']}",
+            "server",
+            {
+                "http.request.method": scope["method"],
+                "url.path": scope["path"],
+                "socialapi.correlation_id": correlation_id.get() or "",
+            },
+            context=extract(headers),
+        ) as current:
+
+            async def send_traced(message):
+                if message["type"] == "http.response.start":
+                    current.set_attribute(
+                        "http.response.status_code", message["status"]
+                    )
+                    if message["status"] >= 500:
+                        current.set_status(Status(StatusCode.ERROR))
+                elif message["type"] == "http.response.body" and not message.get(
+                    "more_body", False
+                ):
+                    await send(message)
+                    current.add_event("response.sent")
+                    return
+                await send(message)
+
+            try:
+                return await self.app(scope, receive, send_traced)
+            finally:
+                # NOTE: the route template is known after routing (ex. `/post/{post_id}`)
+                route = scope.get("route")
+                if route is not None:
+                    current.set_attribute("http.route", route.path)
+                    current.update_name(f"{scope['method']} {route.path}")
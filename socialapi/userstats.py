@@ -0,0 +1,62 @@
+from sqlalchemy import func, select
+
+from socialapi.database import (
+    dialect_insert,
+    like_table,
+    post_table,
+    user_stats_table,
+    user_table,
+)
+
+"""
+[ user stats rollup ]
+`user_stats` = one row of counts per user (posts, likes received by the user's posts)
+    - new post / like -> `+ 1` in the same transaction as the write (relative update, no recount)
+    - upsert -> users w/o a row yet (ex. registered before the table existed) get one on their first write
+    - rows written around the API (bulk load, `python -m socialapi`) -> `rebuild_user_stats()` recounts all
+"""
+
+
+def bump_user_stats(user_id: int, posts: int = 0, likes_received: int = 0):
+    stats = user_stats_table.c
+    insert = dialect_insert(user_stats_table).values(
+        user_id=user_id, posts=posts, likes_received=likes_received
+    )
+    # NOTE: `excluded` = the values of the INSERT that conflicted
+    return insert.on_conflict_do_update(
+        index_elements=[stats.user_id],
+        set_={
+            "posts": stats.posts + insert.excluded.posts,
+            "likes_received": stats.likes_received + insert.excluded.likes_received,
+        },
+    )
+
+
+def rebuild_user_stats() -> list:
+    """statements that recount `user_stats` from the posts & likes tables (run them in one transaction)"""
+    posts = (
+        select(post_table.c.user_id, func.count().label("count"))
+        .group_by(post_table.c.user_id)
+        .subquery()
+    )
+    likes = (
+        select(post_table.c.user_id, func.count().label("count"))
+        .select_from(like_table.join(post_table))
+        .group_by(post_table.c.user_id)
+        .subquery()
+    )
+    counts = select(
+        user_table.c.id,
+        func.coalesce(posts.c.count, 0),
+        func.coalesce(likes.c.count, 0),
+    ).select_from(
+        user_table.outerjoin(posts, posts.c.user_id == user_table.c.id).outerjoin(
+            likes, likes.c.user_id == user_table.c.id
+        )
+    )
+    return [
+        user_stats_table.delete(),
+        user_stats_table.insert().from_select(
+            ["user_id", "posts", "likes_received"], counts
+        ),
+    ]